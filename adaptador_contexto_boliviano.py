@@ -1,5 +1,5 @@
 import re
-from typing import Dict, List
+from typing import Any, Dict, List
 
 
 class NormalizadorOracion:
@@ -164,53 +164,110 @@ class NormalizadorOracion:
             "pasito a pasito": "progresivamente",
         }
         
-    def normalizar_oracion(self, texto: str) -> str:
+        # Compilar una sola vez el buscador de modismos
+        self.recompilar()
+        
+    def recompilar(self):
+        """
+        Compila los modismos en una única expresión regular (alternación ordenada
+        de más larga a más corta) para normalizar en una sola pasada.
+        Debe llamarse de nuevo si se modifica self.modismos.
+        """
+        # Mismo orden que el reemplazo secuencial: frases más largas primero
+        frases_ordenadas = sorted(self.modismos.keys(), key=len, reverse=True)
+        
+        # El reemplazo secuencial vuelve a aplicar los modismos posteriores sobre el
+        # texto ya reemplazado (p. ej. "ropa americana" -> "ropa usada importada" ->
+        # "ropa de segunda mano importada"). Se precalcula ese resultado final.
+        self._reemplazos_finales = {}
+        for i, modismo in enumerate(frases_ordenadas):
+            reemplazo = self.modismos[modismo]
+            for posterior in frases_ordenadas[i + 1:]:
+                patron = r'\b' + re.escape(posterior) + r'\b'
+                reemplazo = re.sub(patron, self.modismos[posterior], reemplazo)
+            self._reemplazos_finales[modismo] = reemplazo
+        
+        alternacion = r'\b(?:' + '|'.join(re.escape(m) for m in frases_ordenadas) + r')\b'
+        self._patron_modismos = re.compile(alternacion)
+        # Variante sin distinguir mayúsculas para normalizar conservando el resto del texto
+        self._patron_modismos_mayusculas = re.compile(alternacion, re.IGNORECASE)
+        self._reemplazos_sin_caso = {m.lower(): r for m, r in self._reemplazos_finales.items()}
+        
+    def _reemplazar(self, coincidencia) -> str:
+        return self._reemplazos_finales[coincidencia.group(0)]
+        
+    def _reemplazar_sin_caso(self, coincidencia) -> str:
+        return self._reemplazos_sin_caso[coincidencia.group(0).lower()]
+        
+    def normalizar_oracion(self, texto: str, conservar_mayusculas: bool = False) -> str:
             """
             Normaliza una oración reemplazando modismos bolivianos por términos estándar.
             
             Args:
                 texto (str): La oración a normalizar
+                conservar_mayusculas (bool): Reemplaza los modismos sin pasar el resto
+                    del texto a minúsculas (p. ej. para calcular embeddings)
                 
             Returns:
                 str: La oración normalizada
             """
-            # Convertir a minúsculas para hacer la búsqueda insensible a mayúsculas
-            texto_normalizado = texto.lower()
-            
-            # Ordenar las frases por longitud (más largas primero) para evitar reemplazos parciales
-            frases_ordenadas = sorted(self.modismos.keys(), key=len, reverse=True)
-            
-            # Reemplazar cada modismo encontrado
-            for modismo in frases_ordenadas:
-                # Usar regex con word boundaries para evitar reemplazos parciales
-                patron = r'\b' + re.escape(modismo) + r'\b'
-                texto_normalizado = re.sub(patron, self.modismos[modismo], texto_normalizado)
+            if conservar_mayusculas:
+                return self._patron_modismos_mayusculas.sub(self._reemplazar_sin_caso, texto)
+            # Convertir a minúsculas y reemplazar todos los modismos en una sola pasada
+            return self._patron_modismos.sub(self._reemplazar, texto.lower())
+
+    def normalizar_lote(self, textos: List[str]) -> List[str]:
+        """
+        Normaliza varias oraciones con una sola llamada al buscador de modismos.
+        
+        Args:
+            textos (List[str]): Oraciones a normalizar
             
-            return texto_normalizado
+        Returns:
+            List[str]: Oraciones normalizadas, en el mismo orden
+        """
+        separador = "\x00"
+        if any(separador in texto for texto in textos):
+            return [self.normalizar_oracion(texto) for texto in textos]
+        
+        # El separador no es carácter de palabra, así que respeta los límites \b
+        unido = self.normalizar_oracion(separador.join(textos))
+        return unido.split(separador) if textos else []
 
-    def normalizar_con_detalles(self, texto: str) -> Dict[str, str]:
+    def normalizar_con_detalles(self, texto: str) -> Dict[str, Any]:
         """
         Normaliza una oración y devuelve tanto el texto original como el normalizado
         junto con los reemplazos realizados.
+        Los reemplazos se registran durante la misma pasada que normaliza el texto.
         
         Args:
             texto (str): La oración a normalizar
             
         Returns:
-            Dict[str, str]: Diccionario con texto original, normalizado y reemplazos
+            Dict[str, Any]: Diccionario con texto original, normalizado y reemplazos.
+                Cada reemplazo incluye "inicio" y "fin" (posición en el texto en
+                minúsculas), "original" (modismo encontrado) y "reemplazo".
         """
         texto_original = texto
-        texto_normalizado = self.normalizar_oracion(texto)
-        
-        # Encontrar los reemplazos realizados
         reemplazos = []
-        if texto_original.lower() != texto_normalizado:
-            reemplazos.append("Se realizaron normalizaciones")
+        
+        def registrar(coincidencia):
+            reemplazo = self._reemplazos_finales[coincidencia.group(0)]
+            reemplazos.append({
+                "inicio": coincidencia.start(),
+                "fin": coincidencia.end(),
+                "original": coincidencia.group(0),
+                "reemplazo": reemplazo
+            })
+            return reemplazo
+        
+        texto_normalizado = self._patron_modismos.sub(registrar, texto_original.lower())
         
         return {
             "original": texto_original,
             "normalizado": texto_normalizado,
-            "hay_cambios": texto_original.lower() != texto_normalizado
+            "hay_cambios": texto_original.lower() != texto_normalizado,
+            "reemplazos": reemplazos
         }
 
     def ejemplos_de_uso(self):
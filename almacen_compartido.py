@@ -0,0 +1,111 @@
+import json
+import numpy as np
+from pathlib import Path
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+# Archivos del almacén compartido dentro del directorio de un snapshot
+ARCHIVO_TEXTOS = 'textos.bin'
+ARCHIVO_METADATOS = 'metadatos.bin'
+ARCHIVO_DESPLAZAMIENTOS = 'desplazamientos.npy'
+ARCHIVO_IDS = 'ids.json'
+
+ARCHIVOS_ALMACEN = (ARCHIVO_TEXTOS, ARCHIVO_METADATOS, ARCHIVO_DESPLAZAMIENTOS, ARCHIVO_IDS)
+
+
+def escribir_almacen(directorio, registros):
+    """
+    Escribe los fragmentos en archivos planos que cada worker abre memory-mapped.
+
+    Args:
+        directorio (Path): Directorio del snapshot
+        registros (list): [(posición en el índice FAISS, Document con id)]
+    """
+    directorio = Path(directorio)
+
+    # Textos y metadatos concatenados en UTF-8; desplazamientos[i] marca el inicio del fragmento i
+    desplazamientos = np.zeros((len(registros) + 1, 2), dtype=np.int64)
+    with open(directorio / ARCHIVO_TEXTOS, 'wb') as textos, open(directorio / ARCHIVO_METADATOS, 'wb') as metadatos:
+        for orden, (_, documento) in enumerate(registros):
+            texto = documento.page_content.encode('utf-8')
+            metadata = json.dumps(documento.metadata or {}, ensure_ascii=False).encode('utf-8')
+            textos.write(texto)
+            metadatos.write(metadata)
+            desplazamientos[orden + 1] = desplazamientos[orden] + (len(texto), len(metadata))
+    np.save(directorio / ARCHIVO_DESPLAZAMIENTOS, desplazamientos)
+
+    with open(directorio / ARCHIVO_IDS, 'w', encoding='utf-8') as archivo:
+        json.dump([[int(posicion), documento.id] for posicion, documento in registros], archivo)
+
+
+def existe_almacen(directorio):
+    return all((Path(directorio) / nombre).exists() for nombre in ARCHIVOS_ALMACEN)
+
+
+def _mapear_bytes(ruta):
+    """Archivo como array uint8 memory-mapped (vacío si el archivo no tiene bytes)"""
+    if ruta.stat().st_size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(ruta, dtype=np.uint8, mode='r')
+
+
+def abrir_almacen(directorio):
+    """
+    Abre los fragmentos de un snapshot en modo solo lectura y memory-mapped: todos los
+    workers comparten las mismas páginas de la caché del sistema operativo.
+
+    Returns:
+        tuple: (DocstoreCompartido, index_to_docstore_id)
+    """
+    directorio = Path(directorio)
+    desplazamientos = np.load(directorio / ARCHIVO_DESPLAZAMIENTOS, mmap_mode='r')
+    with open(directorio / ARCHIVO_IDS, 'r', encoding='utf-8') as archivo:
+        registros = json.load(archivo)
+
+    if len(registros) != desplazamientos.shape[0] - 1:
+        raise ValueError(f"Almacén compartido inconsistente en {directorio}")
+
+    docstore = DocstoreCompartido(
+        directorio, [id_doc for _, id_doc in registros], _mapear_bytes(directorio / ARCHIVO_TEXTOS),
+        _mapear_bytes(directorio / ARCHIVO_METADATOS), desplazamientos
+    )
+    return docstore, {posicion: id_doc for posicion, id_doc in registros}
+
+
+class DocstoreCompartido(Docstore):
+    """
+    Docstore de solo lectura que decodifica cada fragmento bajo demanda desde los
+    archivos memory-mapped del snapshot, en lugar de tener todos los Documents en memoria.
+    """
+
+    def __init__(self, directorio, ids, textos, metadatos, desplazamientos):
+        self.directorio = Path(directorio)
+        self.ids = ids
+        self._ordenes = {id_doc: orden for orden, id_doc in enumerate(ids)}
+        self._textos = textos
+        self._metadatos = metadatos
+        self._desplazamientos = desplazamientos
+
+    def __len__(self):
+        return len(self.ids)
+
+    def documento(self, orden):
+        """Fragmento por su orden en el almacén (0..len-1)"""
+        (texto_inicio, metadata_inicio), (texto_fin, metadata_fin) = self._desplazamientos[orden:orden + 2]
+        return Document(
+            id=self.ids[orden],
+            page_content=bytes(self._textos[texto_inicio:texto_fin]).decode('utf-8'),
+            metadata=json.loads(bytes(self._metadatos[metadata_inicio:metadata_fin]).decode('utf-8'))
+        )
+
+    def search(self, search):
+        orden = self._ordenes.get(search)
+        if orden is None:
+            return f"ID {search} not found."
+        return self.documento(orden)
+
+    def add(self, texts):
+        raise NotImplementedError("El docstore compartido es de solo lectura")
+
+    def delete(self, ids):
+        raise NotImplementedError("El docstore compartido es de solo lectura")
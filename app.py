@@ -1,32 +1,65 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+import os
 import json
+from functools import partial
 from adaptador_contexto_boliviano import NormalizadorOracion
 from gestor_bd import GestorBaseDatos
-from modelo_consulta import AgenteIA
+from modelo_consulta import AgenteIA, CONFIG_RETRIEVER_MMR
+from cache_respuestas import CacheRespuestas
+from procesador_lotes import ProcesadorLotes
+from cola_trabajos import ColaTrabajos, llm_simulado
+from clasificador_reglas import ClasificadorReglas
+from arranque import ArranqueDiferido
 
 # Crear la aplicación Flask
 app = Flask(__name__)
 CORS(app)
 
-# Instanciar módulos personalizados
+# Arranque diferido (por defecto): el servidor atiende /salud de inmediato y la
+# inicialización pesada (PostgreSQL, corpus, FAISS) corre en segundo plano.
+# ARRANQUE_DIFERIDO=0 conserva el arranque bloqueante.
+ARRANQUE_DIFERIDO = os.getenv('ARRANQUE_DIFERIDO', '1') == '1'
+
+# Instanciar módulos personalizados (sin conectar todavía a PostgreSQL)
 normalizacion_pregunta = NormalizadorOracion() 
-bd = GestorBaseDatos()
-agenteIA = AgenteIA(bd)
+bd = GestorBaseDatos(inicializar=False)
+agenteIA = AgenteIA(bd, normalizacion_pregunta, inicializar=False)
+cache_respuestas = CacheRespuestas(normalizacion_pregunta, vectores=bd.obtener_embeddings())
+
+# Recuperación RAG por endpoint: los prompts estructurados de designación y retos
+# no usan el contexto legal, así que por defecto van directo al LLM (sin embedding ni MMR)
+RECUPERACION_POR_ENDPOINT = {
+    "consulta_general": True,
+    "consulta_designacion": os.getenv('RECUPERACION_DESIGNACION', '0') == '1',
+    "consulta_retos": os.getenv('RECUPERACION_RETOS', '0') == '1',
+}
 
 # CORRECCIÓN 2: Función llamar_gpt que estaba faltante
-def llamar_gpt(prompt):
+def llamar_gpt(prompt, endpoint=None, max_tokens=None):
     """
     Función para llamar al modelo usando el agente IA existente
     """
     try:
         # Usar el método consultar_con_contexto del agente
-        resultado = agenteIA.consultar_con_contexto(prompt, "")
+        resultado = agenteIA.consultar_con_contexto(
+            prompt, "", usar_recuperacion=RECUPERACION_POR_ENDPOINT.get(endpoint, True), max_tokens=max_tokens
+        )
         return resultado
     except Exception as e:
         print(f"Error en llamar_gpt: {e}")
         return f"Error: {str(e)}"
 
+llamar_designacion = partial(llamar_gpt, endpoint="consulta_designacion")
+llamar_retos = partial(llamar_gpt, endpoint="consulta_retos")
+
+# Tokens de respuesta por perfil en los prompts agrupados (el LLM compartido responde con 250)
+MAX_TOKENS_POR_PERFIL = int(os.getenv('MAX_TOKENS_POR_PERFIL', '300'))
+
+def llamar_designacion_agrupada(prompt, cantidad):
+    """Prompt con varios perfiles: el límite de respuesta crece con el grupo para que la lista JSON no se corte"""
+    return llamar_gpt(prompt, endpoint="consulta_designacion", max_tokens=MAX_TOKENS_POR_PERFIL * cantidad)
+
 PROMPT_ANALISIS_CLASIFICACION = """
 # ===== IDENTIDAD DEL AGENTE =====
 Eres "IncubaBot", un especialista en análisis empresarial y psicológico para clasificar emprendedores jóvenes bolivianos en rutas de aprendizaje personalizadas.
@@ -108,6 +141,272 @@ PREGUNTA_LIBRE: {pregunta}
 CONTEXTO: {contexto}
 """
 
+# Campos requeridos por endpoint
+CAMPOS_DESIGNACION = [
+    'nombre', 'edad', 'ciudad', 'educacion', 'descripcion_negocio', 
+    'tiempo_funcionamiento', 'ingresos_mensuales', 'numero_clientes', 
+    'productos_servicios', 'conocimiento_finanzas', 'conocimiento_marketing',
+    'conocimiento_ventas', 'conocimiento_modelo_negocio', 'conocimiento_tecnologia',
+    'resilencia', 'motivacion', 'gestion_estres', 'comunicacion', 'autoestima',
+    'liderazgo', 'rubro', 'zona_operacion', 'apoyo_familiar', 'acceso_internet',
+    'tiempo_disponible'
+]
+
+CAMPOS_RETOS = ['nombre', 'ciudad', 'tipo_negocio', 'nivel', 'ingresos_actuales']
+
+def campo_faltante(datos, campos):
+    """Devuelve el primer campo requerido que falta en datos, o None"""
+    for campo in campos:
+        if campo not in datos:
+            return campo
+    return None
+
+def parsear_salida_json(salida):
+    """Intenta interpretar la salida del LLM como JSON"""
+    try:
+        return json.loads(salida)
+    except:
+        return {"raw": salida}
+
+# Partes del prompt de clasificación para agrupar varios perfiles en una sola llamada
+_ENCABEZADO_CLASIFICACION, _DATOS_CLASIFICACION = PROMPT_ANALISIS_CLASIFICACION.split("# ===== DATOS DE ENTRADA =====")
+PLANTILLA_PERFIL_CLASIFICACION = _DATOS_CLASIFICACION.split("Responde ÚNICAMENTE")[0]
+
+def armar_prompt_clasificacion_agrupado(perfiles):
+    """Prompt de clasificación con varios perfiles; se pide una lista JSON en el mismo orden"""
+    bloques = [
+        f"# ===== PERFIL {numero} =====" + PLANTILLA_PERFIL_CLASIFICACION.format(**perfil)
+        for numero, perfil in enumerate(perfiles, 1)
+    ]
+    return (
+        _ENCABEZADO_CLASIFICACION
+        + "# ===== DATOS DE ENTRADA =====\n"
+        + "\n".join(bloques)
+        + f"\nResponde ÚNICAMENTE con una lista JSON válida de {len(perfiles)} objetos, "
+          "uno por perfil y en el mismo orden, con la clasificación y análisis detallado.\n"
+    )
+
+procesador_designacion = ProcesadorLotes(
+    CAMPOS_DESIGNACION,
+    armar_prompt=lambda datos: PROMPT_ANALISIS_CLASIFICACION.format(**datos),
+    parsear_salida=parsear_salida_json,
+    armar_prompt_agrupado=armar_prompt_clasificacion_agrupado,
+    concurrencia=8,
+    max_elementos=500
+)
+
+procesador_retos = ProcesadorLotes(
+    CAMPOS_RETOS,
+    armar_prompt=lambda datos: PROMPT_GENERADOR_RETOS.format(**datos),
+    parsear_salida=parsear_salida_json
+)
+
+# Trabajos en segundo plano (miles de perfiles); LLM_SIMULADO=1 para ejecutar en local sin OpenAI
+MAX_ELEMENTOS_TRABAJO = int(os.getenv('COLA_MAX_ELEMENTOS', '20000'))
+cola_trabajos = ColaTrabajos(
+    bd,
+    {"designacion": procesador_designacion, "retos": procesador_retos},
+    llm_simulado if os.getenv('LLM_SIMULADO') == '1' else {"designacion": llamar_designacion, "retos": llamar_retos},
+    trabajadores=int(os.getenv('COLA_TRABAJADORES', '4')),
+    reintentos=int(os.getenv('COLA_REINTENTOS', '3')),
+    max_intentos=int(os.getenv('COLA_MAX_INTENTOS', '3'))
+)
+
+# Pasos de la inicialización pesada, en orden
+arranque = ArranqueDiferido([
+    ("base_datos", bd._inicializar_bd),
+    ("base_conocimiento", agenteIA.inicializar_sistema),
+    ("cola_trabajos", cola_trabajos.iniciar),
+], espera_reintento=float(os.getenv('ARRANQUE_ESPERA_REINTENTO', '10')))
+
+def iniciar_servicio():
+    """
+    Lanza la inicialización pesada (en segundo plano con ARRANQUE_DIFERIDO=1).
+    No se ejecuta al importar el módulo: los procesos "spawn" de la ingesta vuelven a
+    importar el script principal y no deben conectarse, cargar la base ni arrancar la cola.
+    """
+    if ARRANQUE_DIFERIDO:
+        arranque.iniciar()
+    else:
+        arranque.ejecutar()
+
+def crear_app():
+    """Fábrica para servidores WSGI (p. ej. gunicorn 'app:crear_app()'): inicia el servicio y devuelve la app"""
+    iniciar_servicio()
+    return app
+
+# Endpoints que no dependen de la inicialización pesada
+RUTAS_SIN_ARRANQUE = {'/salud', '/listo', '/consulta_designacion/puntajes'}
+
+def respuesta_no_listo():
+    """Cuerpo de la respuesta 503 mientras el servicio se inicializa"""
+    return {
+        "estado": "error",
+        "mensaje": "El servicio se está inicializando, reintenta en unos segundos",
+        "data": arranque.estado()
+    }
+
+@app.before_request
+def verificar_arranque():
+    if not arranque.listo and request.path not in RUTAS_SIN_ARRANQUE and request.method != 'OPTIONS':
+        return jsonify(respuesta_no_listo()), 503, {'Retry-After': '5'}
+
+def validar_solicitud_trabajo(datos):
+    """
+    Valida el cuerpo de una petición a /trabajos.
+    
+    Returns:
+        tuple: (tipo, perfiles, mensaje_error)
+    """
+    tipo = datos.get("tipo")
+    if tipo not in cola_trabajos.procesadores:
+        return None, None, f"El campo 'tipo' debe ser uno de: {', '.join(cola_trabajos.procesadores)}"
+    perfiles = datos.get("perfiles")
+    if not isinstance(perfiles, list) or not perfiles:
+        return None, None, "El campo 'perfiles' debe ser una lista no vacía"
+    if len(perfiles) > MAX_ELEMENTOS_TRABAJO:
+        return None, None, f"El trabajo supera el máximo de {MAX_ELEMENTOS_TRABAJO} perfiles"
+    return tipo, perfiles, None
+
+def leer_paginacion(argumentos):
+    """Lee 'desde' y 'limite' de la query string (limite máximo 1000)"""
+    desde = max(0, int(argumentos.get("desde", 0)))
+    limite = min(1000, max(1, int(argumentos.get("limite", 100))))
+    return desde, limite
+
+def validar_solicitud_lote(datos, procesador):
+    """
+    Valida el cuerpo de una petición por lotes.
+    
+    Returns:
+        tuple: (perfiles, perfiles_por_prompt, mensaje_error)
+    """
+    perfiles = datos.get("perfiles")
+    if not isinstance(perfiles, list) or not perfiles:
+        return None, None, "El campo 'perfiles' debe ser una lista no vacía"
+    if len(perfiles) > procesador.max_elementos:
+        return None, None, f"El lote supera el máximo de {procesador.max_elementos} perfiles"
+    try:
+        por_prompt = max(1, int(datos.get("perfiles_por_prompt", 1)))
+    except (TypeError, ValueError):
+        return None, None, "El campo 'perfiles_por_prompt' debe ser un número entero"
+    return perfiles, por_prompt, None
+
+# Clasificación local con reglas: el LLM solo se usa para perfiles dudosos o para el análisis narrativo
+clasificador_designacion = ClasificadorReglas()
+
+def analisis_narrativo_solicitado(datos):
+    """El análisis completo del LLM para casos claros solo se pide explícitamente ("analisis_narrativo": true)"""
+    return datos.get("analisis_narrativo", False) is True
+
+def prompt_designacion(datos, clasificacion_reglas):
+    """Prompt de clasificación; si las reglas ya decidieron, el LLM se centra en el análisis"""
+    prompt = PROMPT_ANALISIS_CLASIFICACION.format(**datos)
+    if clasificacion_reglas["decidido"]:
+        prompt += (
+            f"\nCLASIFICACIÓN YA CALCULADA: {clasificacion_reglas['clasificacion']} "
+            f"(puntaje {clasificacion_reglas['puntaje']}). Usa esta clasificación y "
+            "concéntrate en el análisis y las recomendaciones.\n"
+        )
+    return prompt
+
+def separar_por_reglas(perfiles, narrativo=False):
+    """
+    Clasifica con reglas los perfiles completos; los de resultado claro no pasan por el LLM
+    salvo que se pida el análisis narrativo.
+
+    Args:
+        perfiles (list): Perfiles de la cohorte
+        narrativo (bool): Si es True todos los perfiles van al LLM
+
+    Returns:
+        tuple: (resueltos, pendientes, clasificaciones) donde resueltos es un dict indice -> resultado,
+               pendientes la lista de índices que deben ir al LLM y clasificaciones un dict
+               indice -> clasificación por reglas de cada perfil completo
+    """
+    completos = [
+        indice for indice, perfil in enumerate(perfiles)
+        if isinstance(perfil, dict) and campo_faltante(perfil, CAMPOS_DESIGNACION) is None
+    ]
+    clasificaciones = clasificador_designacion.resultados(
+        clasificador_designacion.puntuar_lote([perfiles[i] for i in completos])
+    )
+    clasificaciones = dict(zip(completos, clasificaciones))
+    resueltos = {} if narrativo else {
+        indice: {"indice": indice, "estado": "success", "data": clasificacion}
+        for indice, clasificacion in clasificaciones.items() if clasificacion["decidido"]
+    }
+    pendientes = [indice for indice in range(len(perfiles)) if indice not in resueltos]
+    return resueltos, pendientes, clasificaciones
+
+def unir_resumen(total, resueltos, pendientes, resumen_llm, clasificaciones):
+    """
+    Combina los resultados de las reglas con los del LLM (índices de pendientes) en el orden original;
+    los resultados del LLM llevan además la clasificación por reglas del perfil.
+    """
+    resultados = dict(resueltos)
+    for resultado in resumen_llm["resultados"]:
+        indice = pendientes[resultado["indice"]]
+        resultados[indice] = {**resultado, "indice": indice}
+        if indice in clasificaciones:
+            resultados[indice]["clasificacion_reglas"] = clasificaciones[indice]
+    ordenados = [resultados[i] for i in range(total)]
+    exitosos = sum(1 for r in ordenados if r["estado"] == "success")
+    return {
+        "total": total,
+        "exitosos": exitosos,
+        "errores": total - exitosos,
+        "resueltos_por_reglas": len(resueltos),
+        "resultados": ordenados
+    }
+
+def validar_solicitud_puntajes(datos):
+    """
+    Returns:
+        tuple: (perfiles, mensaje_error)
+    """
+    perfiles = datos.get("perfiles")
+    if not isinstance(perfiles, list) or not perfiles:
+        return None, "El campo 'perfiles' debe ser una lista no vacía"
+    if len(perfiles) > MAX_ELEMENTOS_TRABAJO:
+        return None, f"La cohorte supera el máximo de {MAX_ELEMENTOS_TRABAJO} perfiles"
+    return [perfil if isinstance(perfil, dict) else {} for perfil in perfiles], None
+
+def validar_solicitud_recuperacion(datos):
+    """
+    Valida el cuerpo de /recuperacion.
+    
+    Returns:
+        tuple: (consulta, search_type, search_kwargs, mensaje_error)
+    """
+    consulta = (datos.get("consulta") or "").strip()
+    if not consulta:
+        return None, None, None, "El campo 'consulta' es obligatorio"
+    search_type = datos.get("tipo_busqueda", "mmr")
+    if search_type not in ("mmr", "similarity"):
+        return None, None, None, "El campo 'tipo_busqueda' debe ser 'mmr' o 'similarity'"
+    search_kwargs = dict(CONFIG_RETRIEVER_MMR)
+    try:
+        if "k" in datos:
+            search_kwargs["k"] = max(1, min(50, int(datos["k"])))
+            search_kwargs["fetch_k"] = max(search_kwargs["fetch_k"], search_kwargs["k"])
+    except (TypeError, ValueError):
+        return None, None, None, "El campo 'k' debe ser un número entero"
+    return consulta, search_type, search_kwargs, None
+
+def formato_sse(datos, evento=None):
+    """Serializa un evento Server-Sent Events"""
+    linea_evento = f"event: {evento}\n" if evento else ""
+    return f"{linea_evento}data: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+def frame_final_general(respuesta, uso_tokens=None):
+    """Último evento del stream: mismo sobre estado/data (con uso_tokens) que /consulta_general"""
+    return formato_sse({
+        "estado": "success",
+        "mensaje": "Consulta general procesada",
+        "data": {"respuesta": respuesta, "uso_tokens": uso_tokens}
+    }, evento="fin")
+
 @app.route('/consulta_general', methods=['POST'])
 def consulta_general():
     try:
@@ -121,24 +420,115 @@ def consulta_general():
         if not pregunta:
             return jsonify({"estado": "error", "mensaje": "El campo 'pregunta' es obligatorio"}), 400
 
+        # Caché de respuestas: exacta y luego semántica. Si BM25 ya es decisivo no se
+        # calcula ningún embedding (ni para la caché semántica ni para la recuperación)
+        decisiva = agenteIA.consulta_lexica_decisiva(pregunta)
+        consulta_cache = cache_respuestas.buscar(pregunta, contexto, semantica=not decisiva)
+        if consulta_cache["respuesta"] is not None:
+            return jsonify({
+                "estado": "success",
+                "mensaje": "Consulta general procesada",
+                "data": {"respuesta": consulta_cache["respuesta"]}
+            }), 200
+
         # Crear prompt con los datos
         prompt = PROMPT_GENERAL_EMPRENDEDORES.format(
             pregunta=pregunta,
             contexto=contexto
         )
 
-        # Llamar al agente IA
-        respuesta = llamar_gpt(prompt)
+        # Llamar al agente IA reutilizando el embedding de la pregunta para la recuperación
+        resultado = agenteIA.procesar_consulta_con_contexto(
+            prompt, "", embedding_consulta=consulta_cache["embedding"], consulta_lexica=pregunta
+        )
+        if resultado["estado"] == "success":
+            respuesta = resultado["data"]
+            cache_respuestas.guardar(consulta_cache, respuesta)
+        else:
+            respuesta = f"❌ Error: {resultado['mensaje']}"
 
         return jsonify({
             "estado": "success",
             "mensaje": "Consulta general procesada",
-            "data": {"respuesta": respuesta}
+            "data": {"respuesta": respuesta, "uso_tokens": resultado.get("uso_tokens")}
         }), 200
         
     except Exception as e:
         return jsonify({"estado": "error", "mensaje": "Error interno", "detalle": str(e)}), 500
 
+@app.route('/consulta_general/stream', methods=['POST'])
+def consulta_general_stream():
+    """
+    Variante en streaming de /consulta_general (Server-Sent Events).
+    Emite eventos "token" con cada fragmento del LLM y un evento final "fin"
+    con el mismo sobre estado/mensaje/data que /consulta_general.
+    """
+    if not request.is_json:
+        return jsonify({"estado": "error", "mensaje": "El contenido debe ser JSON"}), 400
+
+    datos = request.get_json() or {}
+    pregunta = (datos.get("pregunta") or "").strip()
+    contexto = (datos.get("contexto") or "").strip()
+
+    if not pregunta:
+        return jsonify({"estado": "error", "mensaje": "El campo 'pregunta' es obligatorio"}), 400
+
+    def generar():
+        try:
+            decisiva = agenteIA.consulta_lexica_decisiva(pregunta)
+            consulta_cache = cache_respuestas.buscar(pregunta, contexto, semantica=not decisiva)
+            if consulta_cache["respuesta"] is not None:
+                yield frame_final_general(consulta_cache["respuesta"])
+                return
+
+            prompt = PROMPT_GENERAL_EMPRENDEDORES.format(pregunta=pregunta, contexto=contexto)
+
+            for evento in agenteIA.transmitir_consulta(prompt, "", embedding_consulta=consulta_cache["embedding"], consulta_lexica=pregunta):
+                if "token" in evento:
+                    yield formato_sse({"token": evento["token"]}, evento="token")
+                elif evento["estado"] == "success":
+                    cache_respuestas.guardar(consulta_cache, evento["data"])
+                    yield frame_final_general(evento["data"], evento.get("uso_tokens"))
+                else:
+                    yield frame_final_general(f"❌ Error: {evento['mensaje']}")
+        except Exception as e:
+            yield formato_sse({"estado": "error", "mensaje": "Error interno", "detalle": str(e)}, evento="fin")
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/recuperacion', methods=['POST'])
+def recuperacion():
+    """
+    Solo la etapa de recuperación: ids y scores (distancia L2) de los fragmentos, sin LLM.
+    Cuerpo: {"consulta": "...", "k": 12, "tipo_busqueda": "mmr" | "similarity"}
+    """
+    try:
+        if not request.is_json:
+            return jsonify({"estado": "error", "mensaje": "El contenido debe ser JSON"}), 400
+
+        consulta, search_type, search_kwargs, error = validar_solicitud_recuperacion(request.get_json() or {})
+        if error:
+            return jsonify({"estado": "error", "mensaje": error}), 400
+
+        documentos = agenteIA.recuperar(consulta, search_type, search_kwargs)
+
+        return jsonify({
+            "estado": "success",
+            "mensaje": f"{len(documentos)} fragmentos recuperados",
+            "data": {"documentos": documentos}
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno en recuperacion",
+            "detalle": str(e)
+        }), 500
+
 @app.route('/consulta_designacion', methods=['POST'])
 def consulta_designacion():
     try:
@@ -148,34 +538,32 @@ def consulta_designacion():
         datos = request.get_json() or {}
 
         # Verificar campos requeridos
-        campos_requeridos = [
-            'nombre', 'edad', 'ciudad', 'educacion', 'descripcion_negocio', 
-            'tiempo_funcionamiento', 'ingresos_mensuales', 'numero_clientes', 
-            'productos_servicios', 'conocimiento_finanzas', 'conocimiento_marketing',
-            'conocimiento_ventas', 'conocimiento_modelo_negocio', 'conocimiento_tecnologia',
-            'resilencia', 'motivacion', 'gestion_estres', 'comunicacion', 'autoestima',
-            'liderazgo', 'rubro', 'zona_operacion', 'apoyo_familiar', 'acceso_internet',
-            'tiempo_disponible'
-        ]
-        
-        for campo in campos_requeridos:
-            if campo not in datos:
-                return jsonify({
-                    "estado": "error",
-                    "mensaje": f"Falta el campo requerido: {campo}"
-                }), 400
-
-        # Formatear prompt
-        prompt = PROMPT_ANALISIS_CLASIFICACION.format(**datos)
+        campo = campo_faltante(datos, CAMPOS_DESIGNACION)
+        if campo:
+            return jsonify({
+                "estado": "error",
+                "mensaje": f"Falta el campo requerido: {campo}"
+            }), 400
+
+        # Casos claros sin LLM salvo que se pida explícitamente el análisis narrativo
+        clasificacion_reglas = clasificador_designacion.clasificar(datos)
+        if clasificacion_reglas["decidido"] and not analisis_narrativo_solicitado(datos):
+            return jsonify({
+                "estado": "success",
+                "mensaje": "Clasificación generada",
+                "data": clasificacion_reglas
+            }), 200
+
+        # Formatear prompt (con la clasificación por reglas si ya es clara)
+        prompt = prompt_designacion(datos, clasificacion_reglas)
         
         # Llamar al agente IA
-        salida = llamar_gpt(prompt)
+        salida = llamar_designacion(prompt)
 
         # Intentar parsear JSON
-        try:
-            json_salida = json.loads(salida)
-        except:
-            json_salida = {"raw": salida}
+        json_salida = parsear_salida_json(salida)
+        if isinstance(json_salida, dict):
+            json_salida["clasificacion_reglas"] = clasificacion_reglas
 
         return jsonify({
             "estado": "success",
@@ -190,6 +578,71 @@ def consulta_designacion():
             "detalle": str(e)
         }), 500
 
+@app.route('/consulta_designacion/lote', methods=['POST'])
+def consulta_designacion_lote():
+    """
+    Clasifica una cohorte de emprendedores en una sola llamada.
+    Cuerpo: {"perfiles": [...], "perfiles_por_prompt": 1, "analisis_narrativo": false}
+    """
+    try:
+        if not request.is_json:
+            return jsonify({"estado": "error", "mensaje": "El contenido debe ser JSON"}), 400
+
+        datos = request.get_json() or {}
+        perfiles, por_prompt, error = validar_solicitud_lote(datos, procesador_designacion)
+        if error:
+            return jsonify({"estado": "error", "mensaje": error}), 400
+
+        # Sin análisis narrativo solo los perfiles dudosos (o incompletos) pasan por el LLM
+        resueltos, pendientes, clasificaciones = separar_por_reglas(perfiles, analisis_narrativo_solicitado(datos))
+        resumen_llm = procesador_designacion.procesar(
+            [perfiles[i] for i in pendientes], llamar_designacion, por_prompt=por_prompt,
+            llamar_agrupado=llamar_designacion_agrupada
+        )
+        resumen = unir_resumen(len(perfiles), resueltos, pendientes, resumen_llm, clasificaciones)
+
+        return jsonify({
+            "estado": "success",
+            "mensaje": f"Lote procesado: {resumen['exitosos']} de {resumen['total']} clasificaciones generadas",
+            "data": resumen
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno en consulta_designacion_lote",
+            "detalle": str(e)
+        }), 500
+
+@app.route('/consulta_designacion/puntajes', methods=['POST'])
+def consulta_designacion_puntajes():
+    """
+    Puntúa una cohorte completa solo con reglas (sin LLM).
+    Devuelve los resultados por columnas: una lista por métrica, en el orden de los perfiles.
+    """
+    try:
+        if not request.is_json:
+            return jsonify({"estado": "error", "mensaje": "El contenido debe ser JSON"}), 400
+
+        perfiles, error = validar_solicitud_puntajes(request.get_json() or {})
+        if error:
+            return jsonify({"estado": "error", "mensaje": error}), 400
+
+        puntajes = clasificador_designacion.puntuar_lote(perfiles)
+
+        return jsonify({
+            "estado": "success",
+            "mensaje": "Puntajes calculados",
+            "data": clasificador_designacion.columnas(puntajes)
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno en consulta_designacion_puntajes",
+            "detalle": str(e)
+        }), 500
+
 @app.route('/consulta_retos', methods=['POST'])
 def consulta_retos():
     try:
@@ -199,21 +652,16 @@ def consulta_retos():
         datos = request.get_json() or {}
         
         # Verificar campos básicos
-        campos_basicos = ['nombre', 'ciudad', 'tipo_negocio', 'nivel', 'ingresos_actuales']
-        for campo in campos_basicos:
-            if campo not in datos:
-                return jsonify({
-                    "estado": "error",
-                    "mensaje": f"Falta el campo requerido: {campo}"
-                }), 400
+        campo = campo_faltante(datos, CAMPOS_RETOS)
+        if campo:
+            return jsonify({
+                "estado": "error",
+                "mensaje": f"Falta el campo requerido: {campo}"
+            }), 400
 
         prompt = PROMPT_GENERADOR_RETOS.format(**datos)
-        salida = llamar_gpt(prompt)
-
-        try:
-            json_salida = json.loads(salida)
-        except:
-            json_salida = {"raw": salida}
+        salida = llamar_retos(prompt)
+        json_salida = parsear_salida_json(salida)
 
         return jsonify({
             "estado": "success",
@@ -228,10 +676,90 @@ def consulta_retos():
             "detalle": str(e)
         }), 500
 
+@app.route('/trabajos', methods=['POST'])
+def crear_trabajo():
+    """
+    Registra un trabajo en segundo plano y responde de inmediato con su id.
+    Cuerpo: {"tipo": "designacion" | "retos", "perfiles": [...]}
+    """
+    try:
+        if not request.is_json:
+            return jsonify({"estado": "error", "mensaje": "El contenido debe ser JSON"}), 400
+
+        datos = request.get_json() or {}
+        tipo, perfiles, error = validar_solicitud_trabajo(datos)
+        if error:
+            return jsonify({"estado": "error", "mensaje": error}), 400
+
+        trabajo_id = cola_trabajos.enviar(tipo, perfiles)
+
+        return jsonify({
+            "estado": "success",
+            "mensaje": "Trabajo registrado",
+            "data": {"trabajo_id": trabajo_id, "total": len(perfiles)}
+        }), 202
+
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno en crear_trabajo",
+            "detalle": str(e)
+        }), 500
+
+@app.route('/trabajos/<trabajo_id>', methods=['GET'])
+def estado_trabajo(trabajo_id):
+    try:
+        estado = cola_trabajos.estado(trabajo_id)
+        if estado is None:
+            return jsonify({"estado": "error", "mensaje": "Trabajo no encontrado", "data": None}), 404
+
+        return jsonify({
+            "estado": "success",
+            "mensaje": "Estado del trabajo obtenido",
+            "data": estado
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno en estado_trabajo",
+            "detalle": str(e)
+        }), 500
+
+@app.route('/trabajos/<trabajo_id>/resultados', methods=['GET'])
+def resultados_trabajo(trabajo_id):
+    """Resultados paginados: ?desde=0&limite=100"""
+    try:
+        try:
+            desde, limite = leer_paginacion(request.args)
+        except ValueError:
+            return jsonify({"estado": "error", "mensaje": "'desde' y 'limite' deben ser enteros"}), 400
+
+        estado = cola_trabajos.estado(trabajo_id)
+        if estado is None:
+            return jsonify({"estado": "error", "mensaje": "Trabajo no encontrado", "data": None}), 404
+
+        return jsonify({
+            "estado": "success",
+            "mensaje": "Resultados del trabajo obtenidos",
+            "data": {
+                "trabajo": estado,
+                "resultados": cola_trabajos.resultados(trabajo_id, desde, limite)
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno en resultados_trabajo",
+            "detalle": str(e)
+        }), 500
+
 @app.route('/estado', methods=['GET'])
 def verificar_estado():
     try:
         estado = agenteIA.estado_sistema()
+        estado["cache_respuestas"] = cache_respuestas.estadisticas()
         return jsonify({
             "estado": "success",
             "mensaje": "Estado del sistema obtenido",
@@ -247,22 +775,20 @@ def verificar_estado():
 
 @app.route('/reinicializar', methods=['POST'])
 def reinicializar_sistema():
+    """
+    Reconstruye la base de conocimiento en segundo plano y la publica de forma atómica:
+    las consultas en curso terminan con la versión anterior. Responde de inmediato con
+    el id de la recarga (GET /reinicializar/<id> para ver su estado).
+    """
     try:
-        # CORRECCIÓN 3: Usar inicializar_sistema() en lugar de reinicializar()
-        resultado = agenteIA.inicializar_sistema()
+        # Las respuestas guardadas pueden no corresponder a la nueva base
+        recarga_id, nueva = agenteIA.iniciar_recarga(al_terminar=cache_respuestas.invalidar)
         
-        if resultado:
-            return jsonify({
-                "estado": "success",
-                "mensaje": "Sistema reinicializado correctamente",
-                "data": None
-            }), 200
-        else:
-            return jsonify({
-                "estado": "error",
-                "mensaje": "Error reinicializando el sistema",
-                "data": None
-            }), 500
+        return jsonify({
+            "estado": "success",
+            "mensaje": "Reinicialización iniciada" if nueva else "Ya hay una reinicialización en curso",
+            "data": {"trabajo_id": recarga_id}
+        }), 202
     except Exception as e:
         return jsonify({
             "estado": "error",
@@ -271,17 +797,92 @@ def reinicializar_sistema():
             "error_details": str(e)
         }), 500
 
+@app.route('/reinicializar/<recarga_id>', methods=['GET'])
+def estado_reinicializacion(recarga_id):
+    try:
+        estado = agenteIA.estado_recarga(recarga_id)
+        if estado is None:
+            return jsonify({"estado": "error", "mensaje": "Reinicialización no encontrada", "data": None}), 404
+        
+        return jsonify({
+            "estado": "success",
+            "mensaje": "Estado de la reinicialización obtenido",
+            "data": estado
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno en estado_reinicializacion",
+            "detalle": str(e)
+        }), 500
+
+@app.route('/reindexar', methods=['POST'])
+def reindexar():
+    """
+    Reindexación incremental del corpus (solo fragmentos nuevos, modificados o eliminados)
+    en segundo plano. Responde de inmediato con el id de la reindexación
+    (GET /reindexar/<id> para ver su estado y el resumen).
+    """
+    try:
+        # Las respuestas guardadas se invalidan solo si cambió el corpus
+        reindexacion_id, nueva = agenteIA.iniciar_reindexacion(al_cambiar=cache_respuestas.invalidar)
+        
+        return jsonify({
+            "estado": "success",
+            "mensaje": "Reindexación iniciada" if nueva else "Ya hay una reindexación en curso",
+            "data": {"trabajo_id": reindexacion_id}
+        }), 202
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno al reindexar",
+            "data": None,
+            "error_details": str(e)
+        }), 500
+
+@app.route('/reindexar/<reindexacion_id>', methods=['GET'])
+def estado_reindexacion(reindexacion_id):
+    try:
+        estado = agenteIA.estado_reindexacion(reindexacion_id)
+        if estado is None:
+            return jsonify({"estado": "error", "mensaje": "Reindexación no encontrada", "data": None}), 404
+        
+        return jsonify({
+            "estado": "success",
+            "mensaje": "Estado de la reindexación obtenido",
+            "data": estado
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "estado": "error",
+            "mensaje": "Error interno en estado_reindexacion",
+            "detalle": str(e)
+        }), 500
+
 @app.route('/salud', methods=['GET'])
 def check_salud():
+    """Liveness: responde siempre que el proceso esté vivo, aunque siga inicializándose"""
     return jsonify({
         "estado": "success",
         "mensaje": "Servicio funcionando correctamente",
         "data": {
             "servicio": "Agente IA Emprendedores Bolivia",
-            "version": "1.0.0"
+            "version": "1.0.0",
+            "listo": arranque.listo
         }
     }), 200
 
+@app.route('/listo', methods=['GET'])
+def check_listo():
+    """Readiness: 200 solo cuando terminó la inicialización pesada"""
+    if not arranque.listo:
+        return jsonify(respuesta_no_listo()), 503
+    return jsonify({
+        "estado": "success",
+        "mensaje": "Servicio listo",
+        "data": arranque.estado()
+    }), 200
+
 @app.errorhandler(404)
 def no_encontrado(error):
     return jsonify({
@@ -302,10 +903,22 @@ if __name__ == '__main__':
     print("🚀 Iniciando servidor Flask...")
     print("📍 Endpoints disponibles:")
     print("   POST /consulta_general - Consultas generales de emprendimiento")
+    print("   POST /consulta_general/stream - Consulta general con tokens en streaming (SSE)")
+    print("   POST /recuperacion - Solo recuperación de fragmentos (ids y scores)")
     print("   POST /consulta_designacion - Análisis y clasificación de emprendedores")
+    print("   POST /consulta_designacion/lote - Clasificación de una cohorte completa")
+    print("   POST /consulta_designacion/puntajes - Puntajes por reglas de una cohorte (sin LLM)")
     print("   POST /consulta_retos - Generador de retos personalizados")
+    print("   POST /trabajos - Registrar trabajo masivo (designacion o retos)")
+    print("   GET  /trabajos/<id> - Estado y progreso de un trabajo")
+    print("   GET  /trabajos/<id>/resultados - Resultados paginados de un trabajo")
     print("   GET  /estado - Verificar estado del sistema")
-    print("   POST /reinicializar - Reinicializar sistema")
-    print("   GET  /salud - Check de salud")
+    print("   POST /reinicializar - Reinicializar sistema en segundo plano (devuelve id)")
+    print("   GET  /reinicializar/<id> - Estado de una reinicialización")
+    print("   POST /reindexar - Reindexación incremental del corpus (en segundo plano)")
+    print("   GET  /reindexar/<id> - Estado de una reindexación")
+    print("   GET  /salud - Check de salud (liveness)")
+    print("   GET  /listo - Servicio inicializado (readiness)")
     
+    iniciar_servicio()
     app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,546 @@
+import json
+import asyncio
+from functools import partial
+from aiohttp import web
+from app import (
+    agenteIA,
+    cache_respuestas,
+    RECUPERACION_POR_ENDPOINT,
+    PROMPT_GENERADOR_RETOS,
+    PROMPT_GENERAL_EMPRENDEDORES,
+    CAMPOS_DESIGNACION,
+    CAMPOS_RETOS,
+    campo_faltante,
+    parsear_salida_json,
+    formato_sse,
+    frame_final_general,
+    procesador_designacion,
+    validar_solicitud_lote,
+    cola_trabajos,
+    validar_solicitud_trabajo,
+    leer_paginacion,
+    clasificador_designacion,
+    analisis_narrativo_solicitado,
+    prompt_designacion,
+    separar_por_reglas,
+    unir_resumen,
+    validar_solicitud_puntajes,
+    validar_solicitud_recuperacion,
+    arranque,
+    iniciar_servicio,
+    MAX_TOKENS_POR_PERFIL,
+    RUTAS_SIN_ARRANQUE,
+    respuesta_no_listo,
+)
+
+# Modo de servicio asíncrono: mismos endpoints y respuestas que app.py, pero cada
+# consulta al LLM se espera con ainvoke, sin bloquear un worker por petición.
+# El modo síncrono (python app.py) sigue disponible.
+
+CABECERAS_CORS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS'
+}
+
+def respuesta_json(cuerpo, status=200):
+    return web.json_response(cuerpo, status=status, dumps=_dumps)
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+async def leer_json(request):
+    """Devuelve el cuerpo JSON o None si el contenido no es JSON"""
+    if request.content_type != 'application/json':
+        return None
+    try:
+        return await request.json() or {}
+    except Exception:
+        return None
+
+async def allamar_gpt(prompt, endpoint=None, max_tokens=None):
+    """
+    Versión asíncrona de llamar_gpt
+    """
+    try:
+        return await agenteIA.aconsultar_con_contexto(
+            prompt, "", usar_recuperacion=RECUPERACION_POR_ENDPOINT.get(endpoint, True), max_tokens=max_tokens
+        )
+    except Exception as e:
+        print(f"Error en allamar_gpt: {e}")
+        return f"Error: {str(e)}"
+
+allamar_designacion = partial(allamar_gpt, endpoint="consulta_designacion")
+allamar_retos = partial(allamar_gpt, endpoint="consulta_retos")
+
+async def allamar_designacion_agrupada(prompt, cantidad):
+    """Versión asíncrona de llamar_designacion_agrupada"""
+    return await allamar_gpt(prompt, endpoint="consulta_designacion", max_tokens=MAX_TOKENS_POR_PERFIL * cantidad)
+
+async def consulta_general(request):
+    try:
+        datos = await leer_json(request)
+        if datos is None:
+            return respuesta_json({"estado": "error", "mensaje": "El contenido debe ser JSON"}, 400)
+
+        pregunta = (datos.get("pregunta") or "").strip()
+        contexto = (datos.get("contexto") or "").strip()
+
+        if not pregunta:
+            return respuesta_json({"estado": "error", "mensaje": "El campo 'pregunta' es obligatorio"}, 400)
+
+        decisiva = await asyncio.to_thread(agenteIA.consulta_lexica_decisiva, pregunta)
+        consulta_cache = await cache_respuestas.abuscar(pregunta, contexto, semantica=not decisiva)
+        if consulta_cache["respuesta"] is not None:
+            return respuesta_json({
+                "estado": "success",
+                "mensaje": "Consulta general procesada",
+                "data": {"respuesta": consulta_cache["respuesta"]}
+            })
+
+        prompt = PROMPT_GENERAL_EMPRENDEDORES.format(
+            pregunta=pregunta,
+            contexto=contexto
+        )
+
+        resultado = await agenteIA.aprocesar_consulta_con_contexto(
+            prompt, "", embedding_consulta=consulta_cache["embedding"], consulta_lexica=pregunta
+        )
+        if resultado["estado"] == "success":
+            respuesta = resultado["data"]
+            cache_respuestas.guardar(consulta_cache, respuesta)
+        else:
+            respuesta = f"❌ Error: {resultado['mensaje']}"
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Consulta general procesada",
+            "data": {"respuesta": respuesta, "uso_tokens": resultado.get("uso_tokens")}
+        })
+
+    except Exception as e:
+        return respuesta_json({"estado": "error", "mensaje": "Error interno", "detalle": str(e)}, 500)
+
+async def consulta_general_stream(request):
+    """Variante en streaming (SSE) de /consulta_general"""
+    datos = await leer_json(request)
+    if datos is None:
+        return respuesta_json({"estado": "error", "mensaje": "El contenido debe ser JSON"}, 400)
+
+    pregunta = (datos.get("pregunta") or "").strip()
+    contexto = (datos.get("contexto") or "").strip()
+
+    if not pregunta:
+        return respuesta_json({"estado": "error", "mensaje": "El campo 'pregunta' es obligatorio"}, 400)
+
+    respuesta = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        **CABECERAS_CORS
+    })
+    await respuesta.prepare(request)
+
+    async def enviar(texto):
+        await respuesta.write(texto.encode('utf-8'))
+
+    try:
+        decisiva = await asyncio.to_thread(agenteIA.consulta_lexica_decisiva, pregunta)
+        consulta_cache = await cache_respuestas.abuscar(pregunta, contexto, semantica=not decisiva)
+        if consulta_cache["respuesta"] is not None:
+            await enviar(frame_final_general(consulta_cache["respuesta"]))
+        else:
+            prompt = PROMPT_GENERAL_EMPRENDEDORES.format(pregunta=pregunta, contexto=contexto)
+
+            async for evento in agenteIA.atransmitir_consulta(prompt, "", embedding_consulta=consulta_cache["embedding"], consulta_lexica=pregunta):
+                if "token" in evento:
+                    await enviar(formato_sse({"token": evento["token"]}, evento="token"))
+                elif evento["estado"] == "success":
+                    cache_respuestas.guardar(consulta_cache, evento["data"])
+                    await enviar(frame_final_general(evento["data"], evento.get("uso_tokens")))
+                else:
+                    await enviar(frame_final_general(f"❌ Error: {evento['mensaje']}"))
+    except Exception as e:
+        await enviar(formato_sse({"estado": "error", "mensaje": "Error interno", "detalle": str(e)}, evento="fin"))
+
+    await respuesta.write_eof()
+    return respuesta
+
+async def recuperacion(request):
+    try:
+        datos = await leer_json(request)
+        if datos is None:
+            return respuesta_json({"estado": "error", "mensaje": "El contenido debe ser JSON"}, 400)
+
+        consulta, search_type, search_kwargs, error = validar_solicitud_recuperacion(datos)
+        if error:
+            return respuesta_json({"estado": "error", "mensaje": error}, 400)
+
+        documentos = await agenteIA.arecuperar(consulta, search_type, search_kwargs)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": f"{len(documentos)} fragmentos recuperados",
+            "data": {"documentos": documentos}
+        })
+
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en recuperacion",
+            "detalle": str(e)
+        }, 500)
+
+async def consulta_designacion(request):
+    try:
+        datos = await leer_json(request)
+        if datos is None:
+            return respuesta_json({"estado": "error", "mensaje": "El contenido debe ser JSON"}, 400)
+
+        campo = campo_faltante(datos, CAMPOS_DESIGNACION)
+        if campo:
+            return respuesta_json({
+                "estado": "error",
+                "mensaje": f"Falta el campo requerido: {campo}"
+            }, 400)
+
+        clasificacion_reglas = clasificador_designacion.clasificar(datos)
+        if clasificacion_reglas["decidido"] and not analisis_narrativo_solicitado(datos):
+            return respuesta_json({
+                "estado": "success",
+                "mensaje": "Clasificación generada",
+                "data": clasificacion_reglas
+            })
+
+        salida = await allamar_designacion(prompt_designacion(datos, clasificacion_reglas))
+        json_salida = parsear_salida_json(salida)
+        if isinstance(json_salida, dict):
+            json_salida["clasificacion_reglas"] = clasificacion_reglas
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Clasificación generada",
+            "data": json_salida
+        })
+
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en consulta_designacion",
+            "detalle": str(e)
+        }, 500)
+
+async def consulta_designacion_lote(request):
+    try:
+        datos = await leer_json(request)
+        if datos is None:
+            return respuesta_json({"estado": "error", "mensaje": "El contenido debe ser JSON"}, 400)
+
+        perfiles, por_prompt, error = validar_solicitud_lote(datos, procesador_designacion)
+        if error:
+            return respuesta_json({"estado": "error", "mensaje": error}, 400)
+
+        resueltos, pendientes, clasificaciones = separar_por_reglas(perfiles, analisis_narrativo_solicitado(datos))
+        resumen_llm = await procesador_designacion.aprocesar(
+            [perfiles[i] for i in pendientes], allamar_designacion, por_prompt=por_prompt,
+            allamar_agrupado=allamar_designacion_agrupada
+        )
+        resumen = unir_resumen(len(perfiles), resueltos, pendientes, resumen_llm, clasificaciones)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": f"Lote procesado: {resumen['exitosos']} de {resumen['total']} clasificaciones generadas",
+            "data": resumen
+        })
+
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en consulta_designacion_lote",
+            "detalle": str(e)
+        }, 500)
+
+async def consulta_designacion_puntajes(request):
+    try:
+        datos = await leer_json(request)
+        if datos is None:
+            return respuesta_json({"estado": "error", "mensaje": "El contenido debe ser JSON"}, 400)
+
+        perfiles, error = validar_solicitud_puntajes(datos)
+        if error:
+            return respuesta_json({"estado": "error", "mensaje": error}, 400)
+
+        puntajes = clasificador_designacion.puntuar_lote(perfiles)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Puntajes calculados",
+            "data": clasificador_designacion.columnas(puntajes)
+        })
+
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en consulta_designacion_puntajes",
+            "detalle": str(e)
+        }, 500)
+
+async def consulta_retos(request):
+    try:
+        datos = await leer_json(request)
+        if datos is None:
+            return respuesta_json({"estado": "error", "mensaje": "El contenido debe ser JSON"}, 400)
+
+        campo = campo_faltante(datos, CAMPOS_RETOS)
+        if campo:
+            return respuesta_json({
+                "estado": "error",
+                "mensaje": f"Falta el campo requerido: {campo}"
+            }, 400)
+
+        prompt = PROMPT_GENERADOR_RETOS.format(**datos)
+        salida = await allamar_retos(prompt)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Retos generados",
+            "data": parsear_salida_json(salida)
+        })
+
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en consulta_retos",
+            "detalle": str(e)
+        }, 500)
+
+async def crear_trabajo(request):
+    try:
+        datos = await leer_json(request)
+        if datos is None:
+            return respuesta_json({"estado": "error", "mensaje": "El contenido debe ser JSON"}, 400)
+
+        tipo, perfiles, error = validar_solicitud_trabajo(datos)
+        if error:
+            return respuesta_json({"estado": "error", "mensaje": error}, 400)
+
+        trabajo_id = await asyncio.to_thread(cola_trabajos.enviar, tipo, perfiles)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Trabajo registrado",
+            "data": {"trabajo_id": trabajo_id, "total": len(perfiles)}
+        }, 202)
+
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en crear_trabajo",
+            "detalle": str(e)
+        }, 500)
+
+async def estado_trabajo(request):
+    try:
+        estado = await asyncio.to_thread(cola_trabajos.estado, request.match_info['trabajo_id'])
+        if estado is None:
+            return respuesta_json({"estado": "error", "mensaje": "Trabajo no encontrado", "data": None}, 404)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Estado del trabajo obtenido",
+            "data": estado
+        })
+
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en estado_trabajo",
+            "detalle": str(e)
+        }, 500)
+
+async def resultados_trabajo(request):
+    try:
+        try:
+            desde, limite = leer_paginacion(request.query)
+        except ValueError:
+            return respuesta_json({"estado": "error", "mensaje": "'desde' y 'limite' deben ser enteros"}, 400)
+
+        trabajo_id = request.match_info['trabajo_id']
+        estado = await asyncio.to_thread(cola_trabajos.estado, trabajo_id)
+        if estado is None:
+            return respuesta_json({"estado": "error", "mensaje": "Trabajo no encontrado", "data": None}, 404)
+
+        resultados = await asyncio.to_thread(cola_trabajos.resultados, trabajo_id, desde, limite)
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Resultados del trabajo obtenidos",
+            "data": {"trabajo": estado, "resultados": resultados}
+        })
+
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en resultados_trabajo",
+            "detalle": str(e)
+        }, 500)
+
+async def verificar_estado(request):
+    try:
+        # Consulta a PostgreSQL en un hilo para no bloquear el event loop
+        estado = await asyncio.to_thread(agenteIA.estado_sistema)
+        estado["cache_respuestas"] = cache_respuestas.estadisticas()
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Estado del sistema obtenido",
+            "data": estado
+        })
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error obteniendo estado del sistema",
+            "data": None,
+            "error_details": str(e)
+        }, 500)
+
+async def reinicializar_sistema(request):
+    """Reinicialización en segundo plano con publicación atómica; responde con el id de la recarga"""
+    try:
+        recarga_id, nueva = agenteIA.iniciar_recarga(al_terminar=cache_respuestas.invalidar)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Reinicialización iniciada" if nueva else "Ya hay una reinicialización en curso",
+            "data": {"trabajo_id": recarga_id}
+        }, 202)
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno al reinicializar",
+            "data": None,
+            "error_details": str(e)
+        }, 500)
+
+async def estado_reinicializacion(request):
+    try:
+        estado = agenteIA.estado_recarga(request.match_info['recarga_id'])
+        if estado is None:
+            return respuesta_json({"estado": "error", "mensaje": "Reinicialización no encontrada", "data": None}, 404)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Estado de la reinicialización obtenido",
+            "data": estado
+        })
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en estado_reinicializacion",
+            "detalle": str(e)
+        }, 500)
+
+async def reindexar(request):
+    """Reindexación incremental en segundo plano; responde con el id de la reindexación"""
+    try:
+        reindexacion_id, nueva = agenteIA.iniciar_reindexacion(al_cambiar=cache_respuestas.invalidar)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Reindexación iniciada" if nueva else "Ya hay una reindexación en curso",
+            "data": {"trabajo_id": reindexacion_id}
+        }, 202)
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno al reindexar",
+            "data": None,
+            "error_details": str(e)
+        }, 500)
+
+async def estado_reindexacion(request):
+    try:
+        estado = agenteIA.estado_reindexacion(request.match_info['reindexacion_id'])
+        if estado is None:
+            return respuesta_json({"estado": "error", "mensaje": "Reindexación no encontrada", "data": None}, 404)
+
+        return respuesta_json({
+            "estado": "success",
+            "mensaje": "Estado de la reindexación obtenido",
+            "data": estado
+        })
+    except Exception as e:
+        return respuesta_json({
+            "estado": "error",
+            "mensaje": "Error interno en estado_reindexacion",
+            "detalle": str(e)
+        }, 500)
+
+async def check_salud(request):
+    """Liveness: responde siempre que el proceso esté vivo, aunque siga inicializándose"""
+    return respuesta_json({
+        "estado": "success",
+        "mensaje": "Servicio funcionando correctamente",
+        "data": {
+            "servicio": "Agente IA Emprendedores Bolivia",
+            "version": "1.0.0",
+            "modo": "async",
+            "listo": arranque.listo
+        }
+    })
+
+async def check_listo(request):
+    """Readiness: 200 solo cuando terminó la inicialización pesada"""
+    if not arranque.listo:
+        return respuesta_json(respuesta_no_listo(), 503)
+    return respuesta_json({
+        "estado": "success",
+        "mensaje": "Servicio listo",
+        "data": arranque.estado()
+    })
+
+@web.middleware
+async def middleware_errores_y_cors(request, handler):
+    """Respuestas 404/405/503 (servicio iniciándose) con el mismo formato que app.py y cabeceras CORS"""
+    if request.method == 'OPTIONS':
+        respuesta = web.Response(status=200)
+    elif not arranque.listo and request.path not in RUTAS_SIN_ARRANQUE:
+        respuesta = respuesta_json(respuesta_no_listo(), 503)
+        respuesta.headers['Retry-After'] = '5'
+    else:
+        try:
+            respuesta = await handler(request)
+        except web.HTTPNotFound:
+            respuesta = respuesta_json({"estado": "error", "mensaje": "Endpoint no encontrado", "data": None}, 404)
+        except web.HTTPMethodNotAllowed:
+            respuesta = respuesta_json({"estado": "error", "mensaje": "Método no permitido para este endpoint", "data": None}, 405)
+
+    # Las respuestas en streaming ya enviaron sus cabeceras
+    if not respuesta.prepared:
+        respuesta.headers.update(CABECERAS_CORS)
+    return respuesta
+
+def crear_app():
+    """Crea la aplicación aiohttp con los mismos endpoints que app.py e inicia el servicio"""
+    iniciar_servicio()
+    app = web.Application(middlewares=[middleware_errores_y_cors])
+    app.router.add_post('/consulta_general', consulta_general)
+    app.router.add_post('/consulta_general/stream', consulta_general_stream)
+    app.router.add_post('/recuperacion', recuperacion)
+    app.router.add_post('/consulta_designacion', consulta_designacion)
+    app.router.add_post('/consulta_designacion/lote', consulta_designacion_lote)
+    app.router.add_post('/consulta_designacion/puntajes', consulta_designacion_puntajes)
+    app.router.add_post('/consulta_retos', consulta_retos)
+    app.router.add_post('/trabajos', crear_trabajo)
+    app.router.add_get('/trabajos/{trabajo_id}', estado_trabajo)
+    app.router.add_get('/trabajos/{trabajo_id}/resultados', resultados_trabajo)
+    app.router.add_get('/estado', verificar_estado)
+    app.router.add_post('/reinicializar', reinicializar_sistema)
+    app.router.add_get('/reinicializar/{recarga_id}', estado_reinicializacion)
+    app.router.add_post('/reindexar', reindexar)
+    app.router.add_get('/reindexar/{reindexacion_id}', estado_reindexacion)
+    app.router.add_get('/salud', check_salud)
+    app.router.add_get('/listo', check_listo)
+    return app
+
+if __name__ == '__main__':
+    print("🚀 Iniciando servidor asíncrono (aiohttp)...")
+    web.run_app(crear_app(), host='0.0.0.0', port=5000)
@@ -0,0 +1,101 @@
+import threading
+import time
+from datetime import datetime
+
+
+class ArranqueDiferido:
+    """
+    Inicialización pesada del servicio (PostgreSQL, corpus, FAISS, cola de trabajos)
+    ejecutada por pasos en un hilo en segundo plano, para que el servidor HTTP atienda
+    de inmediato. Separa liveness (el proceso responde) de readiness (todos los pasos
+    terminaron). Si un paso falla se reintenta tras una espera, sin repetir los ya hechos.
+    """
+
+    def __init__(self, pasos, espera_reintento=10.0):
+        """
+        Args:
+            pasos (list): [(nombre, callable)]; un paso falla si lanza excepción o devuelve False
+            espera_reintento (float): Segundos antes de reintentar tras un paso fallido
+        """
+        self.pasos = list(pasos)
+        self.espera_reintento = espera_reintento
+
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._listo = threading.Event()
+        self._estado = {
+            "estado": "pendiente",
+            "pasos": {nombre: "pendiente" for nombre, _ in self.pasos},
+            "intentos": 0,
+            "inicio": None,
+            "fin": None,
+            "error": None
+        }
+
+    @property
+    def listo(self):
+        return self._listo.is_set()
+
+    def iniciar(self):
+        """Lanza la inicialización en segundo plano (idempotente)"""
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self.ejecutar, name="arranque", daemon=True)
+            self._hilo.start()
+
+    def esperar(self, timeout=None):
+        """
+        Returns:
+            bool: True si el servicio quedó listo dentro del timeout
+        """
+        return self._listo.wait(timeout)
+
+    def _marcar(self, **cambios):
+        with self._lock:
+            self._estado.update(cambios)
+
+    def _marcar_paso(self, nombre, estado):
+        with self._lock:
+            self._estado["pasos"][nombre] = estado
+
+    def ejecutar(self):
+        """Ejecuta los pasos pendientes hasta completarlos todos (bloqueante)"""
+        self._marcar(estado="iniciando", inicio=datetime.now().isoformat())
+        inicio = time.perf_counter()
+
+        while not self.listo:
+            with self._lock:
+                self._estado["intentos"] += 1
+            try:
+                for nombre, paso in self.pasos:
+                    if self._estado["pasos"][nombre] == "listo":
+                        continue
+                    self._marcar_paso(nombre, "en_proceso")
+                    if paso() is False:
+                        raise RuntimeError(f"El paso '{nombre}' no se completó")
+                    self._marcar_paso(nombre, "listo")
+
+                self._marcar(estado="listo", fin=datetime.now().isoformat(), error=None)
+                self._listo.set()
+                print(f"🟢 Servicio listo en {time.perf_counter() - inicio:.1f} s")
+
+            except Exception as e:
+                fallido = next((n for n, estado in self._estado["pasos"].items() if estado == "en_proceso"), None)
+                if fallido:
+                    self._marcar_paso(fallido, "error")
+                self._marcar(estado="error", error=str(e))
+                print(f"❌ Arranque incompleto ({e}), reintentando en {self.espera_reintento:.0f} s...")
+                time.sleep(self.espera_reintento)
+                self._marcar(estado="iniciando")
+
+    def estado(self):
+        """
+        Returns:
+            dict: listo, estado general, estado de cada paso, intentos y error
+        """
+        with self._lock:
+            estado = dict(self._estado)
+            estado["pasos"] = dict(self._estado["pasos"])
+        estado["listo"] = self.listo
+        return estado
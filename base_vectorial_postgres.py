@@ -0,0 +1,274 @@
+import json
+import threading
+import numpy as np
+from psycopg2.extras import execute_values
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+# Formato binario de los embeddings en la columna BYTEA (float32 little-endian)
+FORMATO_FLOAT32 = np.dtype('<f4')
+
+
+class BaseVectorialPostgres(VectorStore):
+    """
+    Vectorstore de LangChain que busca directamente en fragmentos_leyes_bolivianas,
+    sin copiar los fragmentos a la memoria del proceso: los workers arrancan sin cargar
+    nada y el tamaño del corpus no depende de su RAM. Se usa como la base FAISS
+    (as_retriever, MMR y similitud con score).
+
+    Con la extensión pgvector la búsqueda la resuelve PostgreSQL con una columna
+    vector(d) y un índice HNSW (distancia L2). Sin pgvector se usa un sustituto local:
+    un recorrido por lotes con cursor del lado del servidor que calcula las distancias
+    con NumPy y conserva solo los mejores candidatos (memoria constante, búsqueda exacta).
+    """
+
+    def __init__(self, gestor_bd, usar_pgvector=True, ef_search=40, tamano_lote=2000):
+        """
+        Args:
+            gestor_bd (GestorBaseDatos): Pool de conexiones, modelo y proveedor de embeddings
+            usar_pgvector (bool): Usar pgvector si la extensión está disponible
+            ef_search (int): hnsw.ef_search de pgvector por consulta
+            tamano_lote (int): Filas por lote en el recorrido sin pgvector
+        """
+        self.gestor_bd = gestor_bd
+        self.usar_pgvector = usar_pgvector
+        self.ef_search = ef_search
+        self.tamano_lote = tamano_lote
+        self.pgvector = False
+        self.dimension = None
+
+        self._lock = threading.Lock()
+        self._estadisticas = {"busquedas": 0}
+
+    @property
+    def embeddings(self):
+        return self.gestor_bd.obtener_embeddings()
+
+    def preparar(self):
+        """
+        Detecta pgvector y, si está disponible, completa la columna embedding_vector de
+        los fragmentos que aún no la tienen y crea el índice HNSW. Es idempotente: tras
+        una reindexación solo convierte las filas nuevas.
+
+        Returns:
+            BaseVectorialPostgres: La propia base
+        """
+        modelo = self.gestor_bd.modelo_embeddings()
+        with self.gestor_bd.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT dimension FROM fragmentos_leyes_bolivianas "
+                "WHERE formato_embedding = 'float32' AND modelo_embedding = %s AND embedding IS NOT NULL LIMIT 1",
+                (modelo,)
+            )
+            fila = cursor.fetchone()
+            if fila is None:
+                raise ValueError(f"No hay fragmentos con embeddings del modelo {modelo}")
+            self.dimension = fila[0]
+
+            if self.usar_pgvector:
+                try:
+                    cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+                    conn.commit()
+                    self.pgvector = True
+                except Exception as e:
+                    conn.rollback()
+                    print(f"ℹ️ pgvector no disponible ({e}), se buscará por recorrido en PostgreSQL")
+
+            if self.pgvector:
+                self._completar_vectores(conn, modelo)
+
+        print(f"🐘 Base vectorial PostgreSQL lista ({'pgvector HNSW' if self.pgvector else 'recorrido por lotes'}, "
+              f"dimensión {self.dimension})")
+        return self
+
+    def _completar_vectores(self, conn, modelo):
+        """Copia los embeddings BYTEA a la columna vector(d) y crea el índice HNSW"""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"ALTER TABLE fragmentos_leyes_bolivianas ADD COLUMN IF NOT EXISTS embedding_vector vector({self.dimension})"
+        )
+        conn.commit()
+
+        convertidos = 0
+        while True:
+            cursor.execute(
+                """
+                SELECT id, embedding FROM fragmentos_leyes_bolivianas
+                WHERE embedding_vector IS NULL AND formato_embedding = 'float32'
+                  AND modelo_embedding = %s AND dimension = %s AND embedding IS NOT NULL
+                LIMIT %s
+                """,
+                (modelo, self.dimension, self.tamano_lote)
+            )
+            filas = cursor.fetchall()
+            if not filas:
+                break
+            execute_values(
+                cursor,
+                """
+                UPDATE fragmentos_leyes_bolivianas AS f SET embedding_vector = v.vector::vector
+                FROM (VALUES %s) AS v(id, vector) WHERE f.id = v.id
+                """,
+                [(id_frag, self._literal(np.frombuffer(bytes(embedding), dtype=FORMATO_FLOAT32)))
+                 for id_frag, embedding in filas]
+            )
+            conn.commit()
+            convertidos += len(filas)
+
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_fragmentos_leyes_bolivianas_hnsw "
+            "ON fragmentos_leyes_bolivianas USING hnsw (embedding_vector vector_l2_ops)"
+        )
+        conn.commit()
+        if convertidos:
+            print(f"🐘 {convertidos} embeddings copiados a la columna vector de pgvector")
+
+    @staticmethod
+    def _literal(vector):
+        return "[" + ",".join(repr(float(v)) for v in vector) + "]"
+
+    @staticmethod
+    def _documento(id_frag, contenido, metadata, hash_contenido):
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata)
+        id_doc = hash_contenido or f"fila-{id_frag}"
+        return Document(id=id_doc, page_content=contenido, metadata=metadata or {})
+
+    def _candidatos(self, vector, k):
+        """
+        Returns:
+            list: [(Document, distancia L2 al cuadrado, embedding)] de los k más cercanos
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        modelo = self.gestor_bd.modelo_embeddings()
+        with self._lock:
+            self._estadisticas["busquedas"] += 1
+
+        with self.gestor_bd.conexion() as conn:
+            if self.pgvector:
+                cursor = conn.cursor()
+                cursor.execute("SET LOCAL hnsw.ef_search = %s", (max(self.ef_search, k),))
+                literal = self._literal(vector)
+                cursor.execute(
+                    """
+                    SELECT id, contenido, metadata, hash_contenido, embedding,
+                           embedding_vector <-> %s::vector AS distancia
+                    FROM fragmentos_leyes_bolivianas
+                    WHERE embedding_vector IS NOT NULL AND modelo_embedding = %s
+                    ORDER BY embedding_vector <-> %s::vector
+                    LIMIT %s
+                    """,
+                    (literal, modelo, literal, k)
+                )
+                return [
+                    (self._documento(id_frag, contenido, metadata, hash_contenido), float(distancia) ** 2,
+                     np.frombuffer(bytes(embedding), dtype=FORMATO_FLOAT32))
+                    for id_frag, contenido, metadata, hash_contenido, embedding, distancia in cursor.fetchall()
+                ]
+
+            # Sustituto sin pgvector: recorrido por lotes con top-k acumulado
+            cursor = conn.cursor(name="busqueda_vectorial")
+            cursor.itersize = self.tamano_lote
+            cursor.execute(
+                """
+                SELECT id, embedding FROM fragmentos_leyes_bolivianas
+                WHERE formato_embedding = 'float32' AND modelo_embedding = %s
+                  AND dimension = %s AND embedding IS NOT NULL
+                """,
+                (modelo, len(vector))
+            )
+            mejores_ids = np.zeros(0, dtype=np.int64)
+            mejores_distancias = np.zeros(0, dtype=np.float32)
+            while True:
+                filas = cursor.fetchmany(self.tamano_lote)
+                if not filas:
+                    break
+                matriz = np.frombuffer(
+                    b''.join(bytes(embedding) for _, embedding in filas), dtype=FORMATO_FLOAT32
+                ).reshape(len(filas), len(vector))
+                distancias = ((matriz - vector) ** 2).sum(axis=1)
+                mejores_ids = np.concatenate([mejores_ids, np.array([f[0] for f in filas], dtype=np.int64)])
+                mejores_distancias = np.concatenate([mejores_distancias, distancias])
+                if len(mejores_ids) > k:
+                    seleccion = np.argpartition(mejores_distancias, k - 1)[:k]
+                    mejores_ids, mejores_distancias = mejores_ids[seleccion], mejores_distancias[seleccion]
+            cursor.close()
+
+            if not len(mejores_ids):
+                return []
+            orden = np.argsort(mejores_distancias, kind="stable")
+            mejores_ids, mejores_distancias = mejores_ids[orden], mejores_distancias[orden]
+
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, contenido, metadata, hash_contenido, embedding "
+                "FROM fragmentos_leyes_bolivianas WHERE id = ANY(%s)",
+                ([int(i) for i in mejores_ids],)
+            )
+            filas = {fila[0]: fila for fila in cursor.fetchall()}
+
+        return [
+            (self._documento(*filas[i][:4]), float(distancia), np.frombuffer(bytes(filas[i][4]), dtype=FORMATO_FLOAT32))
+            for i, distancia in zip(mejores_ids.tolist(), mejores_distancias.tolist()) if i in filas
+        ]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        """
+        Returns:
+            list: [(Document, score)] con score = distancia L2 al cuadrado (como IndexFlatL2)
+        """
+        return [(documento, distancia) for documento, distancia, _ in self._candidatos(embedding, k)]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [documento for documento, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    def max_marginal_relevance_search_with_score_by_vector(self, embedding, *, k=4, fetch_k=20, lambda_mult=0.5,
+                                                            **kwargs):
+        candidatos = self._candidatos(embedding, fetch_k)
+        if not candidatos:
+            return []
+        elegidos = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32),
+            [vector for _, _, vector in candidatos],
+            lambda_mult=lambda_mult,
+            k=k
+        )
+        return [(candidatos[i][0], candidatos[i][1]) for i in elegidos]
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, **kwargs):
+        return [
+            documento for documento, _ in self.max_marginal_relevance_search_with_score_by_vector(
+                embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+            )
+        ]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, **kwargs):
+        return self.max_marginal_relevance_search_by_vector(
+            self.embeddings.embed_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+        )
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Los fragmentos se ingieren con GestorBaseDatos.procesar_y_guardar_documentos")
+
+    def estadisticas(self):
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+        estadisticas.update(
+            tipo="postgres",
+            busqueda="pgvector_hnsw" if self.pgvector else "recorrido_por_lotes",
+            dimension=self.dimension,
+            ef_search=self.ef_search if self.pgvector else None
+        )
+        return estadisticas
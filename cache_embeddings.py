@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List
+import numpy as np
+from psycopg2.extras import execute_values
+from langchain_core.embeddings import Embeddings
+
+# Mismo formato binario que los fragmentos (float32 little-endian)
+FORMATO_FLOAT32 = np.dtype('<f4')
+
+
+class EmbeddingsConCache(Embeddings):
+    """
+    Envuelve un proveedor de embeddings con una caché persistente de dos niveles para
+    los embeddings de consultas (retriever, caché semántica):
+    1. Memoria: LRU por proceso.
+    2. PostgreSQL: tabla cache_embeddings compartida entre procesos y reinicios.
+    La clave es el modelo más el hash del texto normalizado. Los fragmentos de la ingesta
+    (embed_documents) no pasan por la caché: ya se guardan en fragmentos_leyes_bolivianas
+    y la reindexación solo embebe los nuevos o modificados.
+    """
+
+    def __init__(self, base, gestor_bd=None, max_memoria=5000, reintento_tabla=60):
+        """
+        Args:
+            base (Embeddings): Proveedor real (OpenAIEmbeddings, EmbeddingsLocales...)
+            gestor_bd (GestorBaseDatos): Acceso al pool para el nivel PostgreSQL (None = solo memoria)
+            max_memoria (int): Máximo de vectores en el nivel de memoria
+            reintento_tabla (float): Segundos de espera antes de reintentar crear la tabla tras un fallo
+        """
+        self.base = base
+        self.gestor_bd = gestor_bd
+        self.max_memoria = max_memoria
+        self.model = getattr(base, 'model', None) or type(base).__name__
+
+        self._lock = threading.Lock()
+        self._memoria = OrderedDict()
+        self._estadisticas = {"aciertos_memoria": 0, "aciertos_bd": 0, "calculados": 0, "errores_bd": 0}
+        # La tabla se crea en el primer acceso, no al construir (el arranque no espera a PostgreSQL)
+        self._tabla_lista = False
+        self._lock_tabla = threading.Lock()
+        self.reintento_tabla = reintento_tabla
+        self._reintentar_tabla_en = 0.0
+        self._error_tabla = None
+
+    def _inicializar_tabla(self):
+        """
+        Crea la tabla en el primer acceso. Si falla, la caché sigue solo en memoria
+        y se reintenta pasados reintento_tabla segundos.
+
+        Returns:
+            bool: True si el nivel PostgreSQL está disponible
+        """
+        if self._tabla_lista or self.gestor_bd is None:
+            return self._tabla_lista
+        if time.monotonic() < self._reintentar_tabla_en:
+            return False
+        with self._lock_tabla:
+            if not self._tabla_lista and time.monotonic() >= self._reintentar_tabla_en:
+                self._crear_tabla()
+        return self._tabla_lista
+
+    def _crear_tabla(self):
+        try:
+            with self.gestor_bd.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS cache_embeddings (
+                        clave TEXT PRIMARY KEY,
+                        modelo TEXT NOT NULL,
+                        dimension INTEGER NOT NULL,
+                        embedding BYTEA NOT NULL,
+                        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+                """)
+                conn.commit()
+            self._tabla_lista = True
+            self._error_tabla = None
+        except Exception as e:
+            print(f"⚠️ Caché de embeddings sin nivel PostgreSQL, se reintentará en {self.reintento_tabla}s: {e}")
+            self._error_tabla = str(e)
+            self._reintentar_tabla_en = time.monotonic() + self.reintento_tabla
+
+    @staticmethod
+    def normalizar(texto):
+        """
+        Normalización de la clave: Unicode NFC y espacios colapsados. Se conservan las
+        mayúsculas porque el proveedor devuelve embeddings distintos para cada variante.
+        """
+        return " ".join(unicodedata.normalize("NFC", texto or "").split())
+
+    def clave(self, texto):
+        return hashlib.sha256(f"{self.model}\x00{self.normalizar(texto)}".encode('utf-8')).hexdigest()
+
+    def _buscar_memoria(self, claves):
+        encontrados = {}
+        with self._lock:
+            for clave in claves:
+                vector = self._memoria.get(clave)
+                if vector is not None:
+                    self._memoria.move_to_end(clave)
+                    encontrados[clave] = vector
+            self._estadisticas["aciertos_memoria"] += len(encontrados)
+        return encontrados
+
+    def _guardar_memoria(self, vectores):
+        with self._lock:
+            for clave, vector in vectores.items():
+                self._memoria[clave] = vector
+                self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+
+    def _buscar_bd(self, claves):
+        if not claves or not self._inicializar_tabla():
+            return {}
+        try:
+            with self.gestor_bd.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT clave, embedding FROM cache_embeddings WHERE clave = ANY(%s)",
+                    (list(claves),)
+                )
+                filas = cursor.fetchall()
+        except Exception as e:
+            print(f"⚠️ Error leyendo caché de embeddings: {e}")
+            with self._lock:
+                self._estadisticas["errores_bd"] += 1
+            return {}
+
+        encontrados = {clave: np.frombuffer(bytes(buffer), dtype=FORMATO_FLOAT32) for clave, buffer in filas}
+        with self._lock:
+            self._estadisticas["aciertos_bd"] += len(encontrados)
+        return encontrados
+
+    def _guardar_bd(self, vectores):
+        if not vectores or not self._inicializar_tabla():
+            return
+        try:
+            with self.gestor_bd.conexion() as conn:
+                cursor = conn.cursor()
+                execute_values(
+                    cursor,
+                    """
+                    INSERT INTO cache_embeddings (clave, modelo, dimension, embedding)
+                    VALUES %s ON CONFLICT (clave) DO NOTHING
+                    """,
+                    [(clave, self.model, len(vector), vector.astype(FORMATO_FLOAT32).tobytes())
+                     for clave, vector in vectores.items()]
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ Error guardando caché de embeddings: {e}")
+            with self._lock:
+                self._estadisticas["errores_bd"] += 1
+
+    def _pendientes(self, textos):
+        """
+        Resuelve los textos desde memoria y PostgreSQL.
+
+        Returns:
+            tuple: (claves, encontrados, faltantes) donde faltantes es un dict clave -> texto
+        """
+        claves = [self.clave(texto) for texto in textos]
+        encontrados = self._buscar_memoria(set(claves))
+        desde_bd = self._buscar_bd(set(claves) - set(encontrados))
+        self._guardar_memoria(desde_bd)
+        encontrados.update(desde_bd)
+
+        faltantes = {}
+        for clave, texto in zip(claves, textos):
+            if clave not in encontrados:
+                faltantes.setdefault(clave, texto)
+        return claves, encontrados, faltantes
+
+    def _registrar(self, faltantes, calculados, encontrados):
+        nuevos = {clave: np.asarray(vector, dtype=np.float32) for clave, vector in zip(faltantes, calculados)}
+        with self._lock:
+            self._estadisticas["calculados"] += len(nuevos)
+        self._guardar_memoria(nuevos)
+        self._guardar_bd(nuevos)
+        encontrados.update(nuevos)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        claves, encontrados, faltantes = self._pendientes([text])
+        if faltantes:
+            self._registrar(faltantes, [self.base.embed_query(text)], encontrados)
+        return encontrados[claves[0]].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.base.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        claves, encontrados, faltantes = await asyncio.to_thread(self._pendientes, [text])
+        if faltantes:
+            calculado = await self.base.aembed_query(text)
+            await asyncio.to_thread(self._registrar, faltantes, [calculado], encontrados)
+        return encontrados[claves[0]].tolist()
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Aciertos por nivel, vectores calculados, tamaño del nivel de memoria
+                  y estado del nivel PostgreSQL (con el último error si está desactivado)
+        """
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+            estadisticas["en_memoria"] = len(self._memoria)
+        consultados = estadisticas["aciertos_memoria"] + estadisticas["aciertos_bd"] + estadisticas["calculados"]
+        estadisticas["tasa_aciertos"] = round(
+            (estadisticas["aciertos_memoria"] + estadisticas["aciertos_bd"]) / consultados, 4
+        ) if consultados else 0.0
+        estadisticas["modelo"] = self.model
+        estadisticas["nivel_bd"] = self.gestor_bd is not None and self._error_tabla is None
+        estadisticas["error_nivel_bd"] = self._error_tabla
+        return estadisticas
@@ -0,0 +1,69 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class CacheRecuperacion:
+    """
+    Caché LRU de la etapa de recuperación (búsqueda MMR / similitud en FAISS).
+    La clave es el embedding de la consulta (float32) más la configuración de búsqueda,
+    así que preguntas repetidas no vuelven a pagar el trabajo por pares de MMR.
+    """
+
+    def __init__(self, max_entradas=2000):
+        """
+        Args:
+            max_entradas (int): Máximo de búsquedas guardadas (LRU)
+        """
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._estadisticas = {"aciertos": 0, "fallos": 0, "desalojados": 0, "invalidaciones": 0}
+
+    @staticmethod
+    def clave(vector, search_type, search_kwargs, version=None):
+        """Clave de la búsqueda: hash del embedding float32, de la configuración y de la versión del índice"""
+        digest = hashlib.sha1(np.asarray(vector, dtype=np.float32).tobytes())
+        digest.update(repr((search_type, tuple(sorted(search_kwargs.items())), version)).encode('utf-8'))
+        return digest.hexdigest()
+
+    def obtener(self, clave):
+        """
+        Returns:
+            list: Resultados [(Document, score)] guardados o None si no hay acierto
+        """
+        with self._lock:
+            resultados = self._entradas.get(clave)
+            if resultados is None:
+                self._estadisticas["fallos"] += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self._estadisticas["aciertos"] += 1
+            return list(resultados)
+
+    def guardar(self, clave, resultados):
+        with self._lock:
+            self._entradas[clave] = tuple(resultados)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self._estadisticas["desalojados"] += 1
+
+    def invalidar(self):
+        """Vacía la caché (los resultados apuntan a la base de conocimiento anterior)"""
+        with self._lock:
+            self._entradas = OrderedDict()
+            self._estadisticas["invalidaciones"] += 1
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Contadores de aciertos/fallos, tasa de acierto y tamaño actual
+        """
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+            estadisticas["entradas"] = len(self._entradas)
+        consultas = estadisticas["aciertos"] + estadisticas["fallos"]
+        estadisticas["tasa_aciertos"] = round(estadisticas["aciertos"] / consultas, 4) if consultas else 0.0
+        return estadisticas
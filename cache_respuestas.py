@@ -0,0 +1,236 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import faiss
+
+
+class CacheRespuestas:
+    """
+    Caché de respuestas del LLM en dos niveles:
+    1. Exacto: hash del prompt normalizado con NormalizadorOracion.
+    2. Semántico: similitud coseno entre el embedding de la pregunta y las preguntas
+       ya respondidas (índice FAISS pequeño), a partir de un umbral.
+    Con expiración por TTL, desalojo LRU y contadores de aciertos/fallos.
+    """
+
+    def __init__(self, normalizador, vectores=None, max_entradas=1000, ttl_segundos=3600,
+                 umbral_similitud=0.95, vecinos_semanticos=5):
+        """
+        Args:
+            normalizador (NormalizadorOracion): Normalizador de modismos para la clave exacta
+            vectores: Objeto de embeddings con embed_query (None = solo nivel exacto)
+            max_entradas (int): Máximo de respuestas guardadas (LRU)
+            ttl_segundos (float): Vida máxima de cada respuesta
+            umbral_similitud (float): Similitud coseno mínima para un acierto semántico
+            vecinos_semanticos (int): Candidatos revisados en el índice semántico
+        """
+        self.normalizador = normalizador
+        self.vectores = vectores
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.umbral_similitud = umbral_similitud
+        self.vecinos_semanticos = vecinos_semanticos
+
+        self._lock = threading.Lock()
+        self._estadisticas = {
+            "aciertos_exactos": 0,
+            "aciertos_semanticos": 0,
+            "fallos": 0,
+            "expirados": 0,
+            "desalojados": 0,
+            "invalidaciones": 0
+        }
+        self._reiniciar()
+
+    def _reiniciar(self):
+        # clave -> {"respuesta", "contexto", "creado", "id_vector"}
+        self._entradas = OrderedDict()
+        self._clave_por_id = {}
+        self._siguiente_id = 0
+        self._indice = None
+
+    @staticmethod
+    def _hash(texto):
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+    def _normalizar(self, texto):
+        return " ".join(self.normalizador.normalizar_oracion(texto or "").split())
+
+    def _embedding(self, pregunta_normalizada):
+        """Embedding normalizado (norma 1) de la pregunta, o None si no hay proveedor"""
+        if self.vectores is None:
+            return None
+        try:
+            vector = np.asarray(self.vectores.embed_query(pregunta_normalizada), dtype=np.float32)
+            norma = np.linalg.norm(vector)
+            return vector / norma if norma else vector
+        except Exception as e:
+            print(f"⚠️ Caché semántica sin embedding: {e}")
+            return None
+
+    async def _aembedding(self, pregunta_normalizada):
+        if self.vectores is None:
+            return None
+        try:
+            vector = np.asarray(await self.vectores.aembed_query(pregunta_normalizada), dtype=np.float32)
+            norma = np.linalg.norm(vector)
+            return vector / norma if norma else vector
+        except Exception as e:
+            print(f"⚠️ Caché semántica sin embedding: {e}")
+            return None
+
+    def _eliminar(self, clave):
+        """Elimina una entrada de ambos niveles (llamar con el lock tomado)"""
+        entrada = self._entradas.pop(clave, None)
+        if entrada and entrada["id_vector"] is not None and self._indice is not None:
+            self._indice.remove_ids(np.array([entrada["id_vector"]], dtype=np.int64))
+            self._clave_por_id.pop(entrada["id_vector"], None)
+
+    def _vigente(self, clave, entrada, ahora):
+        if ahora - entrada["creado"] <= self.ttl_segundos:
+            return True
+        self._eliminar(clave)
+        self._estadisticas["expirados"] += 1
+        return False
+
+    def _preparar(self, pregunta, contexto):
+        """
+        Returns:
+            tuple: (texto a embeber, consulta). La clave exacta usa la pregunta normalizada
+                   en minúsculas; el embedding, la pregunta normalizada con sus mayúsculas
+                   originales (es el mismo que se reutiliza en la recuperación)
+        """
+        pregunta_normalizada = self._normalizar(pregunta)
+        contexto_hash = self._hash(self._normalizar(contexto))
+        clave = self._hash(pregunta_normalizada + "\x00" + contexto_hash)
+        consulta = {"respuesta": None, "tipo": None, "clave": clave, "contexto": contexto_hash, "embedding": None}
+        texto_embedding = " ".join(self.normalizador.normalizar_oracion(pregunta or "", conservar_mayusculas=True).split())
+        return texto_embedding, consulta
+
+    def _buscar_exacto(self, consulta):
+        with self._lock:
+            entrada = self._entradas.get(consulta["clave"])
+            if entrada and self._vigente(consulta["clave"], entrada, time.time()):
+                self._entradas.move_to_end(consulta["clave"])
+                self._estadisticas["aciertos_exactos"] += 1
+                consulta.update(respuesta=entrada["respuesta"], tipo="exacto")
+                return True
+        return False
+
+    def _contar_fallo(self, consulta):
+        if consulta["respuesta"] is None:
+            with self._lock:
+                self._estadisticas["fallos"] += 1
+        return consulta
+
+    def _buscar_semantico(self, consulta, embedding):
+        consulta["embedding"] = embedding
+        ahora = time.time()
+
+        with self._lock:
+            if embedding is not None and self._indice is not None and self._indice.ntotal > 0:
+                similitudes, ids = self._indice.search(
+                    embedding.reshape(1, -1), min(self.vecinos_semanticos, self._indice.ntotal)
+                )
+                for similitud, id_vector in zip(similitudes[0], ids[0]):
+                    if id_vector < 0 or similitud < self.umbral_similitud:
+                        break
+                    clave_similar = self._clave_por_id.get(int(id_vector))
+                    entrada = self._entradas.get(clave_similar)
+                    # Solo se reutiliza si la pregunta se hizo con el mismo contexto
+                    if entrada and entrada["contexto"] == consulta["contexto"] and self._vigente(clave_similar, entrada, ahora):
+                        self._entradas.move_to_end(clave_similar)
+                        self._estadisticas["aciertos_semanticos"] += 1
+                        consulta.update(respuesta=entrada["respuesta"], tipo="semantico")
+                        return consulta
+
+            self._estadisticas["fallos"] += 1
+            return consulta
+
+    def buscar(self, pregunta, contexto="", semantica=True):
+        """
+        Busca una respuesta para la pregunta en el nivel exacto y luego en el semántico.
+
+        Args:
+            pregunta (str): Pregunta del usuario
+            contexto (str): Contexto de la pregunta
+            semantica (bool): False para consultar solo el nivel exacto sin calcular el
+                              embedding (p. ej. si la búsqueda léxica ya es decisiva)
+
+        Returns:
+            dict: "respuesta" (None si no hay acierto), "tipo" ("exacto", "semantico" o None),
+                  y los datos de la consulta ("clave", "contexto", "embedding") para guardar()
+                  y para reutilizar el embedding en la recuperación
+        """
+        texto_embedding, consulta = self._preparar(pregunta, contexto)
+        if self._buscar_exacto(consulta) or not semantica:
+            return self._contar_fallo(consulta)
+
+        # El embedding se calcula fuera del lock (llamada de red)
+        return self._buscar_semantico(consulta, self._embedding(texto_embedding))
+
+    async def abuscar(self, pregunta, contexto="", semantica=True):
+        """Versión asíncrona de buscar(): el embedding se pide con aembed_query"""
+        texto_embedding, consulta = self._preparar(pregunta, contexto)
+        if self._buscar_exacto(consulta) or not semantica:
+            return self._contar_fallo(consulta)
+
+        return self._buscar_semantico(consulta, await self._aembedding(texto_embedding))
+
+    def guardar(self, consulta, respuesta):
+        """
+        Guarda la respuesta de una consulta devuelta por buscar() sin acierto.
+
+        Args:
+            consulta (dict): Resultado de buscar()
+            respuesta (str): Respuesta generada por el LLM
+        """
+        with self._lock:
+            self._eliminar(consulta["clave"])
+
+            id_vector = None
+            embedding = consulta.get("embedding")
+            if embedding is not None:
+                if self._indice is None:
+                    self._indice = faiss.IndexIDMap2(faiss.IndexFlatIP(embedding.shape[0]))
+                id_vector = self._siguiente_id
+                self._siguiente_id += 1
+                self._indice.add_with_ids(embedding.reshape(1, -1), np.array([id_vector], dtype=np.int64))
+                self._clave_por_id[id_vector] = consulta["clave"]
+
+            self._entradas[consulta["clave"]] = {
+                "respuesta": respuesta,
+                "contexto": consulta["contexto"],
+                "creado": time.time(),
+                "id_vector": id_vector
+            }
+
+            # Desalojo LRU
+            while len(self._entradas) > self.max_entradas:
+                clave_antigua = next(iter(self._entradas))
+                self._eliminar(clave_antigua)
+                self._estadisticas["desalojados"] += 1
+
+    def invalidar(self):
+        """Vacía ambos niveles de la caché (p. ej. al reinicializar la base de conocimiento)"""
+        with self._lock:
+            self._reiniciar()
+            self._estadisticas["invalidaciones"] += 1
+        print("🧹 Caché de respuestas invalidada")
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Contadores de aciertos/fallos, tasa de acierto y tamaño actual
+        """
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+            estadisticas["entradas"] = len(self._entradas)
+            estadisticas["vectores_semanticos"] = self._indice.ntotal if self._indice is not None else 0
+        consultas = estadisticas["aciertos_exactos"] + estadisticas["aciertos_semanticos"] + estadisticas["fallos"]
+        estadisticas["tasa_aciertos"] = round(
+            (estadisticas["aciertos_exactos"] + estadisticas["aciertos_semanticos"]) / consultas, 4
+        ) if consultas else 0.0
+        return estadisticas
@@ -0,0 +1,230 @@
+import re
+import numpy as np
+
+# Escalas 1-5 del formulario de designación, agrupadas por subpuntaje
+CAMPOS_CONOCIMIENTOS = [
+    'conocimiento_finanzas', 'conocimiento_marketing', 'conocimiento_ventas',
+    'conocimiento_modelo_negocio', 'conocimiento_tecnologia'
+]
+CAMPOS_PSICOLOGICOS = ['resilencia', 'motivacion', 'gestion_estres', 'comunicacion', 'autoestima', 'liderazgo']
+
+# Valores a partir de los cuales la métrica del negocio cuenta como "madura" (escala logarítmica)
+REFERENCIAS_NEGOCIO = {
+    "meses_funcionamiento": 12,
+    "ingresos_mensuales": 3000,   # Bs/mes
+    "numero_clientes": 30
+}
+
+CONFIG_CLASIFICADOR = {
+    "pesos": {"negocio": 0.45, "conocimientos": 0.35, "psicologico": 0.20},
+    "umbral_incubadora": 0.55,
+    "margen_dudoso": 0.08,
+    "meses_minimos": 3   # Con menos meses o sin ingresos es PRE-INCUBADORA sin importar el resto
+}
+
+_PATRON_NUMERO = re.compile(r"\d+(?:[.,]\d+)*")
+_PATRON_MILES = re.compile(r"\d{1,3}(?:([.,])\d{3})(?:\1\d{3})*")
+_PALABRAS_CERO = ("ninguno", "ninguna", "nada", "sin ", "todavía no", "aun no", "aún no")
+_PATRON_DURACION = re.compile(r"(\d+(?:[.,]\d+)?)\s*(años?|anos?|mes|sem|d[ií]as?)")
+_MESES_POR_UNIDAD = {"a": 12.0, "m": 1.0, "s": 0.25, "d": 1 / 30}
+
+
+def _interpretar_numero(cadena):
+    """
+    Número con separadores de miles y decimales en cualquiera de las dos convenciones:
+    "1.500" y "1,500" son miles; "1.500,50" y "1,500.50" usan el último separador como decimal.
+    """
+    if _PATRON_MILES.fullmatch(cadena):
+        return float(re.sub(r"[.,]", "", cadena))
+    separadores = re.findall(r"[.,]", cadena)
+    if not separadores:
+        return float(cadena)
+    entero, decimal = cadena.rsplit(separadores[-1], 1)
+    return float(re.sub(r"[.,]", "", entero) + "." + decimal)
+
+
+def _a_numero(valor):
+    """
+    Interpreta un número escrito libremente ("1.500 Bs", "entre 20 y 30", "2 mil").
+    Si hay varios números (rangos) devuelve su promedio; NaN si no se reconoce.
+    """
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    texto = str(valor or "").lower()
+    numeros = []
+    for coincidencia in _PATRON_NUMERO.findall(texto):
+        numeros.append(_interpretar_numero(coincidencia))
+    if not numeros:
+        return 0.0 if any(palabra in texto for palabra in _PALABRAS_CERO) else np.nan
+    numero = sum(numeros[:2]) / len(numeros[:2])
+    return numero * 1000 if re.search(r"\bmil\b", texto) else numero
+
+
+def _a_meses(valor):
+    """Tiempo de funcionamiento en meses ("2 años", "1 año y 6 meses", "3 semanas"); sin unidad = meses"""
+    duraciones = _PATRON_DURACION.findall(str(valor or "").lower()) if isinstance(valor, str) else []
+    if duraciones:
+        return sum(float(numero.replace(",", ".")) * _MESES_POR_UNIDAD[unidad[0]] for numero, unidad in duraciones)
+    return _a_numero(valor)
+
+
+class ClasificadorReglas:
+    """
+    Clasificación PRE-INCUBADORA / INCUBADORA con reglas deterministas vectorizadas en NumPy.
+    Resuelve localmente los casos claros y marca como dudosos los que están cerca del
+    umbral o tienen datos que no se pudieron interpretar, para enviarlos al LLM.
+    """
+
+    def __init__(self, configuracion=None, referencias=None):
+        """
+        Args:
+            configuracion (dict): Pesos, umbral y margen (por defecto CONFIG_CLASIFICADOR)
+            referencias (dict): Valores de madurez del negocio (por defecto REFERENCIAS_NEGOCIO)
+        """
+        self.configuracion = {**CONFIG_CLASIFICADOR, **(configuracion or {})}
+        self.referencias = {**REFERENCIAS_NEGOCIO, **(referencias or {})}
+
+    @staticmethod
+    def perfiles_a_matrices(perfiles):
+        """
+        Convierte los perfiles (dicts) en arrays listos para puntuar_matrices().
+
+        Returns:
+            tuple: (escalas_conocimientos (n, 5), escalas_psicologicas (n, 6), negocio (n, 3))
+                   con NaN donde el valor no se pudo interpretar
+        """
+        conocimientos = np.array(
+            [[_a_numero(p.get(campo)) for campo in CAMPOS_CONOCIMIENTOS] for p in perfiles], dtype=np.float64
+        ).reshape(-1, len(CAMPOS_CONOCIMIENTOS))
+        psicologicas = np.array(
+            [[_a_numero(p.get(campo)) for campo in CAMPOS_PSICOLOGICOS] for p in perfiles], dtype=np.float64
+        ).reshape(-1, len(CAMPOS_PSICOLOGICOS))
+        negocio = np.array(
+            [[_a_meses(p.get('tiempo_funcionamiento')),
+              _a_numero(p.get('ingresos_mensuales')),
+              _a_numero(p.get('numero_clientes'))] for p in perfiles], dtype=np.float64
+        ).reshape(-1, 3)
+        return conocimientos, psicologicas, negocio
+
+    def puntuar_matrices(self, conocimientos, psicologicas, negocio):
+        """
+        Puntúa una cohorte completa representada como arrays.
+
+        Returns:
+            dict: arrays de longitud n con "puntaje", "conocimientos", "psicologico",
+                  "negocio", "incubadora" (bool) y "decidido" (bool)
+        """
+        configuracion = self.configuracion
+        pesos = configuracion["pesos"]
+
+        # Escalas 1-5 -> 0-1
+        sub_conocimientos = (np.clip(conocimientos, 1, 5) - 1).mean(axis=1) / 4
+        sub_psicologico = (np.clip(psicologicas, 1, 5) - 1).mean(axis=1) / 4
+
+        # Métricas del negocio en escala logarítmica, saturadas en su referencia
+        referencias = np.array([
+            self.referencias["meses_funcionamiento"],
+            self.referencias["ingresos_mensuales"],
+            self.referencias["numero_clientes"]
+        ], dtype=np.float64)
+        sub_negocio = np.minimum(np.log1p(np.maximum(negocio, 0)) / np.log1p(referencias), 1.0).mean(axis=1)
+
+        puntaje = (pesos["negocio"] * sub_negocio
+                   + pesos["conocimientos"] * sub_conocimientos
+                   + pesos["psicologico"] * sub_psicologico)
+
+        # Sin ventas o recién empezando: PRE-INCUBADORA aunque falten otros datos
+        en_etapa_idea = (negocio[:, 0] < configuracion["meses_minimos"]) | (negocio[:, 1] <= 0)
+        incubadora = (puntaje >= configuracion["umbral_incubadora"]) & ~en_etapa_idea
+
+        completos = ~np.isnan(puntaje)
+        lejos_del_umbral = np.abs(puntaje - configuracion["umbral_incubadora"]) >= configuracion["margen_dudoso"]
+        decidido = en_etapa_idea | (completos & lejos_del_umbral)
+
+        return {
+            "puntaje": puntaje,
+            "conocimientos": sub_conocimientos,
+            "psicologico": sub_psicologico,
+            "negocio": sub_negocio,
+            "incubadora": incubadora,
+            "decidido": decidido
+        }
+
+    def puntuar_lote(self, perfiles):
+        """Puntúa una lista de perfiles (dicts); ver puntuar_matrices()"""
+        return self.puntuar_matrices(*self.perfiles_a_matrices(perfiles))
+
+    @staticmethod
+    def _redondear(valor):
+        return None if np.isnan(valor) else round(float(valor), 4)
+
+    def resultados(self, puntajes):
+        """
+        Convierte la salida de puntuar_matrices() en un dict por perfil.
+
+        Returns:
+            list: {"clasificacion", "puntaje", "subpuntajes", "decidido", "fuente"} por perfil
+        """
+        return [
+            {
+                "clasificacion": "INCUBADORA" if puntajes["incubadora"][i] else "PRE-INCUBADORA",
+                "puntaje": self._redondear(puntajes["puntaje"][i]),
+                "subpuntajes": {
+                    "negocio": self._redondear(puntajes["negocio"][i]),
+                    "conocimientos": self._redondear(puntajes["conocimientos"][i]),
+                    "psicologico": self._redondear(puntajes["psicologico"][i])
+                },
+                "decidido": bool(puntajes["decidido"][i]),
+                "fuente": "reglas"
+            }
+            for i in range(len(puntajes["puntaje"]))
+        ]
+
+    def columnas(self, puntajes):
+        """
+        Salida de puntuar_matrices() en formato columnar serializable a JSON
+        (una lista por métrica, None donde faltan datos), para cohortes grandes.
+        """
+        def lista(valores):
+            redondeados = np.round(valores, 4).astype(object)
+            redondeados[np.isnan(valores)] = None
+            return redondeados.tolist()
+
+        return {
+            "total": int(len(puntajes["puntaje"])),
+            "clasificacion": np.where(puntajes["incubadora"], "INCUBADORA", "PRE-INCUBADORA").tolist(),
+            "puntaje": lista(puntajes["puntaje"]),
+            "subpuntajes": {
+                "negocio": lista(puntajes["negocio"]),
+                "conocimientos": lista(puntajes["conocimientos"]),
+                "psicologico": lista(puntajes["psicologico"])
+            },
+            "decidido": puntajes["decidido"].tolist()
+        }
+
+    def clasificar(self, perfil):
+        """Clasifica un solo perfil"""
+        return self.resultados(self.puntuar_lote([perfil]))[0]
+
+
+if __name__ == "__main__":
+    import time
+
+    clasificador = ClasificadorReglas()
+    perfil = {
+        "tiempo_funcionamiento": "2 años", "ingresos_mensuales": "4.500 Bs", "numero_clientes": "entre 40 y 60",
+        **{campo: 4 for campo in CAMPOS_CONOCIMIENTOS}, **{campo: "4" for campo in CAMPOS_PSICOLOGICOS}
+    }
+    print(clasificador.clasificar(perfil))
+    print(clasificador.clasificar({**perfil, "tiempo_funcionamiento": "1 mes", "ingresos_mensuales": "ninguno"}))
+
+    n = 100_000
+    rng = np.random.default_rng(0)
+    inicio = time.perf_counter()
+    puntajes = clasificador.puntuar_matrices(
+        rng.integers(1, 6, (n, 5)).astype(float),
+        rng.integers(1, 6, (n, 6)).astype(float),
+        np.column_stack([rng.integers(0, 48, n), rng.integers(0, 8000, n), rng.integers(0, 100, n)]).astype(float)
+    )
+    duracion = time.perf_counter() - inicio
+    print(f"⚡ {n} perfiles en {duracion * 1000:.1f} ms; decididos sin LLM: {puntajes['decidido'].mean():.0%}")
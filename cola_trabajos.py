@@ -0,0 +1,364 @@
+import json
+import time
+import uuid
+import threading
+from psycopg2.extras import execute_values, Json
+from ingesta_embeddings import reintentar_con_espera
+
+
+def llm_simulado(prompt):
+    """
+    LLM de prueba para ejecutar la cola en local sin OpenAI (LLM_SIMULADO=1).
+    Devuelve siempre un JSON válido con una pequeña latencia.
+    """
+    time.sleep(0.05)
+    return json.dumps({
+        "simulado": True,
+        "clasificacion": "PRE-INCUBADORA",
+        "retos": ["Registrar ingresos y gastos durante una semana"],
+        "longitud_prompt": len(prompt)
+    }, ensure_ascii=False)
+
+
+class ColaTrabajos:
+    """
+    Cola de trabajos en segundo plano para clasificaciones y retos masivos.
+    El estado de cada trabajo y sus resultados se guardan en PostgreSQL (junto a
+    fragmentos_leyes_bolivianas), así que los trabajos sobreviven a reinicios y
+    varios procesos pueden repartirse los elementos pendientes (FOR UPDATE SKIP LOCKED).
+    """
+
+    def __init__(self, gestor_bd, procesadores, llamar, trabajadores=4, reintentos=3, espera_base=2.0,
+                 timeout_elemento=600, max_intentos=3):
+        """
+        Args:
+            gestor_bd (GestorBaseDatos): Acceso al pool de conexiones
+            procesadores (dict): tipo -> ProcesadorLotes (validación, prompt y parseo)
+            llamar (callable | dict): prompt -> salida del LLM (puede ser un stub local),
+                o un dict tipo -> callable
+            trabajadores (int): Hilos que procesan elementos en paralelo
+            reintentos (int): Reintentos por elemento con espera exponencial
+            espera_base (float): Espera inicial del backoff
+            timeout_elemento (float): Segundos tras los que un elemento "en_proceso" sin
+                terminar (proceso caído) vuelve a poder reclamarse
+            max_intentos (int): Veces que un elemento puede reclamarse; si el proceso cae
+                otras tantas veces con él (p. ej. una entrada que lo tumba) queda en "error"
+        """
+        self.gestor_bd = gestor_bd
+        self.procesadores = procesadores
+        self.llamar = llamar
+        self.trabajadores = trabajadores
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.timeout_elemento = timeout_elemento
+        self.max_intentos = max_intentos
+
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._hilos = []
+        self._tablas_listas = False
+
+    def _inicializar_tablas(self):
+        with self.gestor_bd.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS trabajos_agente (
+                    id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    total INTEGER NOT NULL,
+                    completados INTEGER NOT NULL DEFAULT 0,
+                    fallidos INTEGER NOT NULL DEFAULT 0,
+                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS elementos_trabajos_agente (
+                    id SERIAL PRIMARY KEY,
+                    trabajo_id TEXT NOT NULL REFERENCES trabajos_agente(id) ON DELETE CASCADE,
+                    indice INTEGER NOT NULL,
+                    entrada JSONB NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    resultado JSONB,
+                    error TEXT,
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            # Tablas creadas antes de contar los intentos
+            cursor.execute("""
+                ALTER TABLE elementos_trabajos_agente ADD COLUMN IF NOT EXISTS intentos INTEGER NOT NULL DEFAULT 0;
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_elementos_trabajos_agente_pendientes
+                ON elementos_trabajos_agente(estado, id);
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_elementos_trabajos_agente_trabajo
+                ON elementos_trabajos_agente(trabajo_id, indice);
+            """)
+            conn.commit()
+
+    def iniciar(self):
+        """Crea las tablas (la primera vez) y arranca los hilos trabajadores"""
+        if self._hilos:
+            return
+        if not self._tablas_listas:
+            self._inicializar_tablas()
+            self._tablas_listas = True
+        self._detener.clear()
+        for numero in range(self.trabajadores):
+            hilo = threading.Thread(target=self._bucle_trabajador, name=f"trabajador-{numero}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        # Puede haber elementos pendientes de una ejecución anterior
+        self._hay_trabajo.set()
+        print(f"👷 Cola de trabajos iniciada con {self.trabajadores} trabajadores")
+
+    def detener(self):
+        """Detiene los hilos trabajadores (los elementos en curso terminan)"""
+        self._detener.set()
+        self._hay_trabajo.set()
+        for hilo in self._hilos:
+            hilo.join()
+        self._hilos = []
+
+    def enviar(self, tipo, elementos):
+        """
+        Registra un trabajo nuevo. La validación se hace al enviar: los elementos
+        inválidos quedan como fallidos sin llamar al LLM.
+
+        Returns:
+            str: Identificador del trabajo
+        """
+        if tipo not in self.procesadores:
+            raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+
+        _, errores = self.procesadores[tipo].validar(elementos)
+        trabajo_id = str(uuid.uuid4())
+
+        with self.gestor_bd.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO trabajos_agente (id, tipo, total, fallidos) VALUES (%s, %s, %s, %s)",
+                (trabajo_id, tipo, len(elementos), len(errores))
+            )
+            execute_values(
+                cursor,
+                "INSERT INTO elementos_trabajos_agente (trabajo_id, indice, entrada, estado, error) VALUES %s",
+                [
+                    (
+                        trabajo_id,
+                        indice,
+                        Json(datos if isinstance(datos, dict) else {"valor": datos}),
+                        'fallido' if indice in errores else 'pendiente',
+                        errores.get(indice)
+                    )
+                    for indice, datos in enumerate(elementos)
+                ]
+            )
+            self._actualizar_estado_trabajo(cursor, trabajo_id)
+            conn.commit()
+
+        print(f"📥 Trabajo {trabajo_id} ({tipo}) registrado con {len(elementos)} elementos")
+        self._hay_trabajo.set()
+        return trabajo_id
+
+    def _reclamar_elemento(self):
+        """
+        Toma un elemento pendiente de forma exclusiva entre hilos y procesos.
+        Los elementos abandonados por un proceso caído se recuperan pasado timeout_elemento;
+        los que ya agotaron max_intentos se marcan como "error" en lugar de reclamarse otra vez.
+        """
+        with self.gestor_bd.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE elementos_trabajos_agente
+                SET estado = 'error', error = %s, fecha_actualizacion = CURRENT_TIMESTAMP
+                WHERE id IN (
+                    SELECT id FROM elementos_trabajos_agente
+                    WHERE estado = 'en_proceso' AND intentos >= %s
+                      AND fecha_actualizacion < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING trabajo_id
+            """, (f"Se abandonó {self.max_intentos} veces sin terminar", self.max_intentos, self.timeout_elemento))
+            for trabajo_id in {fila[0] for fila in cursor.fetchall()}:
+                print(f"⚠️ Elemento del trabajo {trabajo_id} marcado como error tras {self.max_intentos} intentos")
+                self._actualizar_estado_trabajo(cursor, trabajo_id)
+
+            cursor.execute("""
+                UPDATE elementos_trabajos_agente AS e
+                SET estado = 'en_proceso', intentos = e.intentos + 1, fecha_actualizacion = CURRENT_TIMESTAMP
+                FROM trabajos_agente AS t
+                WHERE e.id = (
+                    SELECT id FROM elementos_trabajos_agente
+                    WHERE estado = 'pendiente'
+                       OR (estado = 'en_proceso' AND intentos < %s
+                           AND fecha_actualizacion < CURRENT_TIMESTAMP - make_interval(secs => %s))
+                    ORDER BY id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                ) AND t.id = e.trabajo_id
+                RETURNING e.id, e.trabajo_id, t.tipo, e.entrada
+            """, (self.max_intentos, self.timeout_elemento))
+            fila = cursor.fetchone()
+            conn.commit()
+            return fila
+
+    def _llamar_con_error(self, tipo, prompt):
+        llamar = self.llamar[tipo] if isinstance(self.llamar, dict) else self.llamar
+        salida = llamar(prompt)
+        # llamar_gpt devuelve los errores como texto: se convierten en excepción para reintentar
+        if salida.startswith("Error:") or salida.startswith("❌ Error"):
+            raise RuntimeError(salida)
+        return salida
+
+    def _procesar(self, id_elemento, trabajo_id, tipo, entrada):
+        procesador = self.procesadores[tipo]
+        try:
+            prompt = procesador.armar_prompt(entrada)
+            salida = reintentar_con_espera(
+                lambda: self._llamar_con_error(tipo, prompt),
+                reintentos=self.reintentos,
+                espera_base=self.espera_base,
+                descripcion=f"elemento {id_elemento} del trabajo {trabajo_id}"
+            )
+            estado, resultado, error = 'completado', procesador.parsear_salida(salida), None
+        except Exception as e:
+            estado, resultado, error = 'fallido', None, str(e)
+
+        with self.gestor_bd.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE elementos_trabajos_agente
+                SET estado = %s, resultado = %s, error = %s, fecha_actualizacion = CURRENT_TIMESTAMP
+                WHERE id = %s
+                """,
+                (estado, Json(resultado) if resultado is not None else None, error, id_elemento)
+            )
+            self._actualizar_estado_trabajo(cursor, trabajo_id)
+            conn.commit()
+
+    @staticmethod
+    def _actualizar_estado_trabajo(cursor, trabajo_id):
+        """
+        Recalcula los contadores del trabajo. Se bloquea antes la fila del trabajo para que
+        el conteo (sentencia siguiente, snapshot nuevo en READ COMMITTED) vea los elementos
+        que otro trabajador del mismo trabajo ya confirmó.
+        """
+        cursor.execute("SELECT id FROM trabajos_agente WHERE id = %s FOR UPDATE", (trabajo_id,))
+        cursor.execute(
+            """
+            UPDATE trabajos_agente AS t
+            SET completados = c.completados,
+                fallidos = c.fallidos,
+                estado = CASE
+                    WHEN c.completados + c.fallidos >= t.total THEN 'completado'
+                    WHEN c.completados + c.fallidos > 0 THEN 'en_proceso'
+                    ELSE 'pendiente'
+                END,
+                fecha_actualizacion = CURRENT_TIMESTAMP
+            FROM (
+                SELECT COUNT(*) FILTER (WHERE estado = 'completado') AS completados,
+                       COUNT(*) FILTER (WHERE estado IN ('fallido', 'error')) AS fallidos
+                FROM elementos_trabajos_agente WHERE trabajo_id = %s
+            ) AS c
+            WHERE t.id = %s
+            """,
+            (trabajo_id, trabajo_id)
+        )
+
+    def _bucle_trabajador(self):
+        while not self._detener.is_set():
+            try:
+                fila = self._reclamar_elemento()
+            except Exception as e:
+                print(f"⚠️ Error reclamando trabajo: {e}")
+                fila = None
+
+            if fila is None:
+                # Sin pendientes: esperar aviso de un trabajo nuevo (o revisar cada 5 s)
+                self._hay_trabajo.clear()
+                self._hay_trabajo.wait(timeout=5)
+                continue
+
+            try:
+                self._procesar(*fila)
+            except Exception as e:
+                # El elemento queda "en_proceso" y se vuelve a reclamar pasado timeout_elemento
+                print(f"⚠️ Error procesando el elemento {fila[0]} del trabajo {fila[1]}: {e}")
+
+    def estado(self, trabajo_id):
+        """
+        Returns:
+            dict: Estado y progreso del trabajo o None si no existe
+        """
+        with self.gestor_bd.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, tipo, estado, total, completados, fallidos, fecha_creacion, fecha_actualizacion
+                FROM trabajos_agente WHERE id = %s
+                """,
+                (trabajo_id,)
+            )
+            fila = cursor.fetchone()
+
+        if fila is None:
+            return None
+        columnas = ["trabajo_id", "tipo", "estado", "total", "completados", "fallidos",
+                    "fecha_creacion", "fecha_actualizacion"]
+        estado = dict(zip(columnas, fila))
+        estado["progreso"] = round((estado["completados"] + estado["fallidos"]) / estado["total"], 4) if estado["total"] else 1.0
+        return estado
+
+    def resultados(self, trabajo_id, desde=0, limite=100):
+        """
+        Returns:
+            list: Resultados por elemento (indice, estado, data o mensaje de error)
+        """
+        with self.gestor_bd.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT indice, estado, resultado, error, intentos
+                FROM elementos_trabajos_agente
+                WHERE trabajo_id = %s AND indice >= %s
+                ORDER BY indice
+                LIMIT %s
+                """,
+                (trabajo_id, desde, limite)
+            )
+            filas = cursor.fetchall()
+
+        return [
+            {"indice": indice, "estado": estado, "data": resultado, "mensaje": error, "intentos": intentos}
+            for indice, estado, resultado, error, intentos in filas
+        ]
+
+
+if __name__ == "__main__":
+    # Ejecución local con un LLM simulado (solo requiere PostgreSQL)
+    from gestor_bd import GestorBaseDatos
+    from procesador_lotes import ProcesadorLotes
+
+    procesador = ProcesadorLotes(
+        ['nombre', 'ciudad'],
+        armar_prompt=lambda datos: f"Clasifica a {datos['nombre']} de {datos['ciudad']}",
+        parsear_salida=json.loads
+    )
+
+    cola = ColaTrabajos(GestorBaseDatos(), {"designacion": procesador}, llm_simulado, trabajadores=2, espera_base=0.1)
+    cola.iniciar()
+
+    trabajo_id = cola.enviar("designacion", [{"nombre": f"Emprendedor {i}", "ciudad": "Santa Cruz"} for i in range(10)] + [{"nombre": "Sin ciudad"}])
+    while cola.estado(trabajo_id)["estado"] != "completado":
+        print(f"⏳ Progreso: {cola.estado(trabajo_id)['progreso']:.0%}")
+        time.sleep(0.5)
+
+    print("Estado final:", cola.estado(trabajo_id))
+    print("Resultados:", cola.resultados(trabajo_id, limite=3))
+    cola.detener()
@@ -0,0 +1,121 @@
+import re
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Encabezados de módulo: "Módulo 1: crecimiento" o "MÓDULO 1" con el título en la línea siguiente.
+# Las entradas del índice terminan en número de página y no cuentan como encabezado.
+PATRON_MODULO = re.compile(r"^m[óo]dulo\s+(\d+)\s*[:.\-–]?\s*(.*?)\s*$", re.IGNORECASE)
+PATRON_ENTRADA_INDICE = re.compile(r"\s\d+$")
+
+# Líneas que se repiten en cada página y no aportan a la recuperación
+ENCABEZADOS_REPETIDOS = [
+    re.compile(r"^GU[ÍI]A\s*-\s*INCUBADORA DE EMPRENDIMIENTOS$", re.IGNORECASE)
+]
+
+SEPARADORES = ["\n\n", "\n", ". ", "? ", "! ", "; ", ", "]
+
+
+class DivisorEstructural:
+    """
+    Fragmentación que respeta la estructura de las guías: las páginas y los encabezados
+    de módulo son límites duros (ningún fragmento los cruza) y cada fragmento guarda
+    su página y sección en la metadata. Dentro de cada tramo el texto se empaqueta por
+    párrafos/líneas hasta el tamaño máximo, sin el solapamiento fijo de la versión anterior.
+    """
+
+    def __init__(self, tamano=2000, solapamiento=150, minimo=30):
+        """
+        Args:
+            tamano (int): Máximo de caracteres por fragmento
+            solapamiento (int): Solapamiento solo cuando un tramo se debe partir
+            minimo (int): Tramos más cortos se descartan (números de página, restos de encabezados)
+        """
+        self.minimo = minimo
+        self.divisor = RecursiveCharacterTextSplitter(
+            chunk_size=tamano,
+            chunk_overlap=solapamiento,
+            separators=SEPARADORES,
+            length_function=len,
+            is_separator_regex=False
+        )
+
+    @staticmethod
+    def titulo_modulo(lineas, i):
+        """
+        Returns:
+            tuple: (titulo de la sección, líneas que ocupa el encabezado) o (None, 0)
+        """
+        coincidencia = PATRON_MODULO.match(lineas[i].strip())
+        if not coincidencia:
+            return None, 0
+
+        numero, titulo = coincidencia.groups()
+        if PATRON_ENTRADA_INDICE.search(f" {titulo}"):
+            return None, 0
+        ocupadas = 1
+        # "MÓDULO 1" / "CRECIMIENTO": el título viene en la línea siguiente
+        if not titulo and i + 1 < len(lineas):
+            siguiente = lineas[i + 1].strip()
+            if siguiente and len(siguiente) <= 40 and siguiente.isupper():
+                titulo, ocupadas = siguiente, 2
+        return (f"Módulo {numero}: {titulo.capitalize()}" if titulo else f"Módulo {numero}"), ocupadas
+
+    def _limpiar_lineas(self, texto, pagina):
+        lineas = [linea.rstrip() for linea in texto.split("\n")]
+        lineas = [linea for linea in lineas if not any(p.match(linea.strip()) for p in ENCABEZADOS_REPETIDOS)]
+        # Número de página impreso al final
+        while lineas and not lineas[-1].strip():
+            lineas.pop()
+        if lineas and pagina is not None and lineas[-1].strip() == str(pagina):
+            lineas.pop()
+        return lineas
+
+    def tramos(self, texto, pagina, seccion):
+        """
+        Parte una página en tramos delimitados por los encabezados de módulo.
+
+        Returns:
+            tuple: ([(seccion, texto)], sección vigente al final de la página)
+        """
+        tramos = []
+        actual = []
+        lineas = self._limpiar_lineas(texto, pagina)
+        i = 0
+        while i < len(lineas):
+            titulo, ocupadas = self.titulo_modulo(lineas, i)
+            if titulo:
+                tramos.append((seccion, "\n".join(actual)))
+                seccion, actual = titulo, lineas[i:i + ocupadas]
+                i += ocupadas
+                continue
+            actual.append(lineas[i])
+            i += 1
+        tramos.append((seccion, "\n".join(actual)))
+
+        tramos = [(s, re.sub(r"\n{3,}", "\n\n", t).strip()) for s, t in tramos]
+        return [(s, t) for s, t in tramos if len(t) >= self.minimo], seccion
+
+    def dividir(self, paginas):
+        """
+        Divide las páginas (Documents con "archivo" y "pagina" en la metadata, en orden)
+        en fragmentos. La sección se arrastra entre páginas del mismo archivo.
+
+        Args:
+            paginas (iterable): Páginas del corpus (puede ser un generador)
+
+        Yields:
+            Document: Fragmento con metadata de archivo, página y sección
+        """
+        archivo = None
+        seccion = None
+        for pagina in paginas:
+            if pagina.metadata.get("archivo") != archivo:
+                archivo, seccion = pagina.metadata.get("archivo"), None
+
+            tramos, seccion = self.tramos(pagina.page_content, pagina.metadata.get("pagina"), seccion)
+            for seccion_tramo, texto in tramos:
+                for contenido in self.divisor.split_text(texto):
+                    yield Document(
+                        page_content=contenido,
+                        metadata={**pagina.metadata, "seccion": seccion_tramo}
+                    )
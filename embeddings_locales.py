@@ -0,0 +1,36 @@
+import re
+import math
+import hashlib
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingsLocales(Embeddings):
+    """
+    Proveedor de embeddings local y determinista (hashing de palabras).
+    No hace llamadas de red: sirve para pruebas y desarrollo sin clave de OpenAI.
+    """
+
+    def __init__(self, dimension=1536, modelo="local-hashing"):
+        self.dimension = dimension
+        self.model = modelo
+        self.llamadas = 0
+
+    def _vector(self, texto: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for palabra in re.findall(r"\w+", texto.lower()):
+            digest = hashlib.md5(palabra.encode("utf-8")).digest()
+            indice = int.from_bytes(digest[:4], "little") % self.dimension
+            signo = 1.0 if digest[4] % 2 == 0 else -1.0
+            vector[indice] += signo
+
+        norma = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norma for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.llamadas += 1
+        return [self._vector(texto) for texto in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.llamadas += 1
+        return self._vector(text)
@@ -0,0 +1,171 @@
+import threading
+import tiktoken
+from langchain_core.documents import Document
+
+
+class EnsambladorContexto:
+    """
+    Arma el contexto de la cadena "stuff" dentro de un presupuesto de tokens (tiktoken).
+    Recorre los fragmentos en orden de relevancia, descarta los repetidos, recorta las
+    regiones solapadas con fragmentos ya elegidos (chunk_overlap) y se detiene al llenar
+    el presupuesto. Lleva la cuenta de los tokens usados por consulta.
+    """
+
+    def __init__(self, presupuesto_tokens=2000, modelo="gpt-4o-mini", minimo_tokens=60, minimo_solapamiento=40):
+        """
+        Args:
+            presupuesto_tokens (int): Máximo de tokens de contexto por consulta
+            modelo (str): Modelo del LLM (define la codificación de tiktoken)
+            minimo_tokens (int): Un fragmento se recorta para entrar solo si le quedan al menos estos tokens
+            minimo_solapamiento (int): Caracteres mínimos para considerar solapado el borde de dos fragmentos
+        """
+        self.presupuesto_tokens = presupuesto_tokens
+        self.minimo_tokens = minimo_tokens
+        self.minimo_solapamiento = minimo_solapamiento
+
+        try:
+            self.codificacion = tiktoken.encoding_for_model(modelo)
+        except KeyError:
+            self.codificacion = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # Sin acceso a los archivos BPE: se estima ~4 caracteres por token
+            print(f"⚠️ tiktoken no disponible ({e}), se estimarán los tokens por caracteres")
+            self.codificacion = None
+
+        self._lock = threading.Lock()
+        self._estadisticas = {
+            "consultas": 0, "tokens_contexto": 0, "tokens_prompt": 0, "tokens_respuesta": 0,
+            "fragmentos_descartados": 0, "tokens_solapamiento_eliminados": 0
+        }
+
+    def contar(self, texto):
+        """Número de tokens de un texto"""
+        if self.codificacion is None:
+            return (len(texto) + 3) // 4
+        return len(self.codificacion.encode(texto))
+
+    def _recortar(self, texto, tokens):
+        """Primeros `tokens` tokens del texto"""
+        if self.codificacion is None:
+            return texto[:tokens * 4]
+        return self.codificacion.decode(self.codificacion.encode(texto)[:tokens])
+
+    def _quitar_solapamiento(self, texto, elegidos):
+        """
+        Quita del texto el inicio/final que ya aparece al final/inicio de un fragmento elegido
+        (la región compartida por chunk_overlap).
+
+        Returns:
+            str: Texto sin solapamiento ("" si está contenido por completo en otro fragmento)
+        """
+        m = self.minimo_solapamiento
+        for otro in elegidos:
+            if texto in otro:
+                return ""
+            if len(texto) < m or len(otro) < m:
+                continue
+            # Inicio del texto == final del otro
+            inicio = otro.find(texto[:m])
+            while inicio != -1:
+                if texto.startswith(otro[inicio:]):
+                    texto = texto[len(otro) - inicio:]
+                    break
+                inicio = otro.find(texto[:m], inicio + 1)
+            # Final del texto == inicio del otro
+            fin = texto.find(otro[:m])
+            while fin != -1:
+                if otro.startswith(texto[fin:]):
+                    texto = texto[:fin]
+                    break
+                fin = texto.find(otro[:m], fin + 1)
+        return texto.strip()
+
+    def ensamblar(self, documentos, presupuesto_tokens=None):
+        """
+        Args:
+            documentos (list): Documents en orden de relevancia
+            presupuesto_tokens (int): Presupuesto para esta consulta (por defecto el configurado)
+
+        Returns:
+            tuple: (documentos que entran en el presupuesto, dict de uso de tokens)
+        """
+        presupuesto = presupuesto_tokens or self.presupuesto_tokens
+        elegidos = []
+        textos = []
+        usados = 0
+        solapamiento = 0
+
+        for documento in documentos:
+            restante = presupuesto - usados
+            if restante < self.minimo_tokens:
+                break
+
+            texto = self._quitar_solapamiento(documento.page_content, textos)
+            if not texto:
+                solapamiento += self.contar(documento.page_content)
+                continue
+            if len(texto) < len(documento.page_content):
+                solapamiento += self.contar(documento.page_content) - self.contar(texto)
+
+            tokens = self.contar(texto)
+            if tokens > restante:
+                texto = self._recortar(texto, restante)
+                tokens = self.contar(texto)
+
+            textos.append(texto)
+            elegidos.append(Document(id=documento.id, page_content=texto, metadata=documento.metadata))
+            usados += tokens
+
+        uso = {
+            "presupuesto": presupuesto,
+            "tokens_contexto": usados,
+            "fragmentos_recuperados": len(documentos),
+            "fragmentos_usados": len(elegidos),
+            "tokens_solapamiento_eliminados": solapamiento
+        }
+        with self._lock:
+            self._estadisticas["tokens_contexto"] += usados
+            self._estadisticas["fragmentos_descartados"] += len(documentos) - len(elegidos)
+            self._estadisticas["tokens_solapamiento_eliminados"] += solapamiento
+        return elegidos, uso
+
+    def registrar(self, uso, prompt, salida):
+        """
+        Completa el uso de tokens de una consulta con los del prompt y la respuesta.
+        Usa usage_metadata del LLM cuando viene en la salida; si no, cuenta con tiktoken.
+
+        Args:
+            uso (dict): Uso devuelto por ensamblar() (o {} sin recuperación)
+            prompt (str): Prompt enviado al LLM
+            salida: AIMessage de la respuesta (o el texto, en streaming)
+
+        Returns:
+            dict: Uso de tokens de la consulta
+        """
+        metadata = getattr(salida, "usage_metadata", None) or {}
+        texto = getattr(salida, "content", salida) or ""
+        uso = {
+            **uso,
+            "tokens_prompt": metadata.get("input_tokens") or self.contar(prompt),
+            "tokens_respuesta": metadata.get("output_tokens") or self.contar(texto)
+        }
+        with self._lock:
+            self._estadisticas["consultas"] += 1
+            self._estadisticas["tokens_prompt"] += uso["tokens_prompt"]
+            self._estadisticas["tokens_respuesta"] += uso["tokens_respuesta"]
+        print(f"🔢 Tokens: prompt {uso['tokens_prompt']} (contexto {uso.get('tokens_contexto', 0)}), "
+              f"respuesta {uso['tokens_respuesta']}")
+        return uso
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Totales y promedios de tokens por consulta
+        """
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+        consultas = estadisticas["consultas"]
+        estadisticas["presupuesto_tokens"] = self.presupuesto_tokens
+        estadisticas["promedio_tokens_prompt"] = round(estadisticas["tokens_prompt"] / consultas, 1) if consultas else 0.0
+        estadisticas["tiktoken"] = self.codificacion is not None
+        return estadisticas
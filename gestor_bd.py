@@ -1,10 +1,18 @@
 import os
+import sys
 import json
 import pickle
+import uuid
+import numpy as np
+import shutil
+import hashlib
+import tempfile
+import faiss
+from contextlib import contextmanager
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain.chains import RetrievalQA
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_core.prompts import PromptTemplate
 from pathlib import Path
@@ -12,9 +20,23 @@ import psycopg2
 from psycopg2.extras import execute_values
 import re
 import requests
+from ingesta_embeddings import IngestorEmbeddings
+from pool_conexiones import PoolConexiones
+from cache_embeddings import EmbeddingsConCache
+from ingesta_corpus import listar_fuentes, documentos_corpus
+from divisor_estructural import DivisorEstructural
+from almacen_compartido import escribir_almacen, existe_almacen, abrir_almacen
+from indices_faiss import ConstructorIndices, informe_recall_latencia, TIPOS_INDICE
+from base_vectorial_postgres import BaseVectorialPostgres
+
+# Formato binario de los embeddings en la columna BYTEA (float32 little-endian)
+FORMATO_FLOAT32 = np.dtype('<f4')
+
+# Clave del advisory lock de PostgreSQL que serializa la construcción de la base entre procesos
+CLAVE_BLOQUEO_CONSTRUCCION = 724301
 
 class GestorBaseDatos:
-    def __init__(self):
+    def __init__(self, vectores=None, inicializar=True):
         # Configuración PostgreSQL
         self.configuracion_bd = {
             'dbname': 'BDHACKATHON', 
@@ -28,79 +50,301 @@ class GestorBaseDatos:
         # Rutas de archivos - CORRECCIÓN: documento_leyes debe ser un archivo, no una carpeta
         self.BASE_DIR = Path(__file__).resolve().parent
         self.documento_leyes = self.BASE_DIR / 'base_conocimiento_childfund.txt'
+        # Directorio con varias guías (PDF o texto); si no existe se usa solo documento_leyes
+        self.directorio_corpus = Path(os.getenv('DIRECTORIO_CORPUS', self.BASE_DIR / 'corpus'))
+        self.directorio_snapshots = Path(os.getenv('DIRECTORIO_SNAPSHOTS_FAISS', self.BASE_DIR / 'snapshots_faiss'))
+        # Índice y fragmentos memory-mapped desde el snapshot, compartidos por todos los workers
+        self.almacen_compartido = os.getenv('FAISS_COMPARTIDO', '1') == '1'
+        # Tipo de índice FAISS: flat (exacto), ivf_flat, ivf_pq o hnsw
+        self.constructor_indices = ConstructorIndices(
+            tipo=os.getenv('FAISS_TIPO_INDICE', 'flat'),
+            nlist=int(os.getenv('FAISS_NLIST', '0')) or None,
+            pq_m=int(os.getenv('FAISS_PQ_M', '0')) or None,
+            pq_bits=int(os.getenv('FAISS_PQ_BITS', '8')),
+            hnsw_m=int(os.getenv('FAISS_HNSW_M', '32')),
+            nprobe=int(os.getenv('FAISS_NPROBE', '16')),
+            ef_search=int(os.getenv('FAISS_EF_SEARCH', '64')),
+            minimo_vectores=int(os.getenv('FAISS_MINIMO_APROXIMADO', '1000'))
+        )
+        # Backend de recuperación: faiss (índice en memoria/snapshot) o postgres (búsqueda en la BD)
+        self.recuperador = os.getenv('RECUPERADOR_BACKEND', 'faiss')
+        if self.recuperador not in ('faiss', 'postgres'):
+            raise ValueError(f"RECUPERADOR_BACKEND desconocido: {self.recuperador} (opciones: faiss, postgres)")
+        self.config_postgres_vectorial = {
+            'usar_pgvector': os.getenv('PGVECTOR', '1') == '1',
+            'ef_search': int(os.getenv('PGVECTOR_EF_SEARCH', '40'))
+        }
         
         # Clave API para OpenAI embeddings - CORRECCIÓN: Usar variable de entorno o configuración
         self.CLAVE_API = os.getenv('OPENAI_API_KEY', '')
+        
+        # Proveedor de embeddings (None = OpenAIEmbeddings). Permite inyectar uno local para pruebas
+        self.vectores = vectores
+        
+        # Caché persistente de embeddings (memoria + tabla cache_embeddings)
+        self.usar_cache_embeddings = os.getenv('CACHE_EMBEDDINGS', '1') == '1'
+        self.max_cache_embeddings_memoria = int(os.getenv('CACHE_EMBEDDINGS_MEMORIA', '5000'))
+        
+        # Configuración de la ingesta por lotes de embeddings
+        self.config_ingesta = {
+            'tamano_lote': int(os.getenv('INGESTA_TAMANO_LOTE', '64')),
+            'lotes_concurrentes': int(os.getenv('INGESTA_LOTES_CONCURRENTES', '4')),
+            'lotes_por_segundo': float(os.getenv('INGESTA_LOTES_POR_SEGUNDO', '5')),
+            'reintentos': 3,
+            'espera_base': 1.0
+        }
+        # Fragmentación por página y módulo (caracteres)
+        self.config_fragmentos = {
+            'tamano': int(os.getenv('FRAGMENTO_TAMANO', '2000')),
+            'solapamiento': int(os.getenv('FRAGMENTO_SOLAPAMIENTO', '150'))
+        }
+        # Procesos para extraer páginas de los PDFs (None = núcleos disponibles)
+        self.procesos_extraccion = int(os.getenv('INGESTA_PROCESOS', '0')) or None
+
+        # Pool de conexiones compartido por todas las operaciones
+        self.pool = PoolConexiones(
+            self.configuracion_bd,
+            minimo=int(os.getenv('BD_POOL_MIN', '1')),
+            maximo=int(os.getenv('BD_POOL_MAX', '10')),
+            timeout_espera=float(os.getenv('BD_POOL_TIMEOUT', '10'))
+        )
 
-        # Auto-inicialización de BD
-        self._inicializar_bd()
+        # Auto-inicialización de BD (inicializar=False la difiere, p. ej. al arrancar el servidor)
+        if inicializar:
+            self._inicializar_bd()
     
-    def obtener_conexion_BaseDatos(self):
-        """Establece una conexión a la base de datos PostgreSQL."""
+    def conexion(self):
+        """
+        Context manager que presta una conexión del pool PostgreSQL.
+        
+        Uso:
+            with self.conexion() as conn:
+                ...
+        """
+        return self.pool.conexion()
+    
+    def estadisticas_pool(self):
+        """Estadísticas del pool de conexiones"""
+        return self.pool.estadisticas()
+    
+    def obtener_embeddings(self):
+        """
+        Devuelve el proveedor de embeddings configurado (OpenAI por defecto), envuelto
+        en la caché persistente para que ingesta y consultas reutilicen los vectores
+        """
+        if self.vectores is None:
+            self.vectores = OpenAIEmbeddings(
+                api_key=self.CLAVE_API,
+                model="text-embedding-ada-002"
+            )
+        if self.usar_cache_embeddings and not isinstance(self.vectores, EmbeddingsConCache):
+            self.vectores = EmbeddingsConCache(
+                self.vectores, self, max_memoria=self.max_cache_embeddings_memoria
+            )
+        return self.vectores
+    
+    def estadisticas_cache_embeddings(self):
+        """Estadísticas de la caché de embeddings (None si está desactivada)"""
+        vectores = self.obtener_embeddings()
+        return vectores.estadisticas() if isinstance(vectores, EmbeddingsConCache) else None
+    
+    def modelo_embeddings(self):
+        """Nombre del modelo de embeddings en uso (se guarda en cada fila)"""
+        return getattr(self.obtener_embeddings(), 'model', None) or 'text-embedding-ada-002'
+    
+    @staticmethod
+    def codificar_embedding(embedding):
+        """Serializa un embedding como buffer float32 little-endian"""
+        return np.asarray(embedding, dtype=FORMATO_FLOAT32).tobytes()
+    
+    @staticmethod
+    def _decodificar_metadata(id_frag, metadata_json):
+        """Convierte la columna metadata (JSONB o texto) a diccionario"""
+        if not metadata_json:
+            return {}
         try:
-            # Configurar codificación antes de conectar
-            import os
-            os.environ['PGCLIENTENCODING'] = 'UTF8'
-            
-            print(f"🔗 Intentando conectar a: {self.configuracion_bd}")
-            
-            # Modificar configuración para manejar mejor la codificación
-            config_conexion = self.configuracion_bd.copy()
-            config_conexion['options'] = '-c client_encoding=UTF8'
-            
-            conn = psycopg2.connect(**config_conexion)
+            if isinstance(metadata_json, dict):
+                return metadata_json
+            return json.loads(metadata_json if isinstance(metadata_json, str) else str(metadata_json))
+        except Exception as e:
+            print(f"⚠️ Error al procesar metadata para fragmento {id_frag}: {e}")
+            return {}
+    
+    @staticmethod
+    def hash_fragmento(contenido, metadata):
+        """Hash de contenido de un fragmento (texto + metadata); también es su id en FAISS"""
+        return hashlib.sha256(
+            json.dumps([contenido, metadata or {}], sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+    
+    def _construir_faiss(self, textos, matriz, metadatas, ids=None):
+        """
+        Construye el vectorstore FAISS a partir de una matriz float32 (n x dimensión)
+        sin convertir los vectores a listas de Python. El tipo de índice (y su
+        entrenamiento) lo define FAISS_TIPO_INDICE.
+        """
+        indice = self.constructor_indices.construir(matriz)
+        
+        ids = ids or [str(uuid.uuid4()) for _ in textos]
+        docstore = InMemoryDocstore({
+            id_doc: Document(id=id_doc, page_content=texto, metadata=metadata)
+            for id_doc, texto, metadata in zip(ids, textos, metadatas)
+        })
+        
+        return FAISS(
+            embedding_function=self.obtener_embeddings(),
+            index=indice,
+            docstore=docstore,
+            index_to_docstore_id=dict(enumerate(ids))
+        )
+    
+    def migrar_embeddings_pickle(self, tamano_lote=500):
+        """
+        Migración única: convierte las filas con embeddings en pickle al formato
+        float32 little-endian, registrando dimensión y modelo.
+        
+        Returns:
+            int: Número de filas migradas (-1 si hubo error)
+        """
+        migradas = 0
+        try:
+            with self.conexion() as conn:
+                cursor_lectura = conn.cursor(name='migracion_embeddings')
+                cursor_lectura.itersize = tamano_lote
+                cursor_lectura.execute(
+                    "SELECT id, embedding FROM fragmentos_leyes_bolivianas "
+                    "WHERE formato_embedding = 'pickle' AND embedding IS NOT NULL ORDER BY id"
+                )
+                cursor = conn.cursor()
+                modelo = self.modelo_embeddings()
             
-            # Configurar la codificación después de conectar
-            conn.set_client_encoding('UTF8')
+                while True:
+                    filas = cursor_lectura.fetchmany(tamano_lote)
+                    if not filas:
+                        break
+                
+                    datos = []
+                    for id_frag, embedding_bytes in filas:
+                        try:
+                            # Formato heredado: solo se deserializa aquí, una vez
+                            vector = pickle.loads(bytes(embedding_bytes))
+                            datos.append((id_frag, psycopg2.Binary(self.codificar_embedding(vector)), len(vector), modelo))
+                        except Exception as e:
+                            print(f"⚠️ Error al migrar embedding del fragmento {id_frag}: {e}")
+                
+                    execute_values(
+                        cursor,
+                        """
+                        UPDATE fragmentos_leyes_bolivianas AS f
+                        SET embedding = v.embedding, dimension = v.dimension,
+                            modelo_embedding = v.modelo, formato_embedding = 'float32'
+                        FROM (VALUES %s) AS v(id, embedding, dimension, modelo)
+                        WHERE f.id = v.id
+                        """,
+                        datos,
+                        template="(%s, %s::bytea, %s, %s)"
+                    )
+                    migradas += len(datos)
             
-            print("✅ Conexión PostgreSQL exitosa")
-            return conn
+                conn.commit()
+            if migradas:
+                print(f"🔁 {migradas} embeddings migrados de pickle a float32")
+            return migradas
+        
         except Exception as e:
-            print(f"❌ Error al conectar a PostgreSQL: {e}")
-            print(f"🔍 Tipo de error: {type(e)}")
-            return None
+            print(f"❌ Error migrando embeddings pickle: {e}")
+            return -1
+    
+    def completar_hashes_contenido(self):
+        """
+        Calcula hash_contenido para las filas creadas antes de la reindexación incremental.
+        
+        Returns:
+            int: Número de filas actualizadas (-1 si hubo error)
+        """
+        try:
+            with self.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, contenido, metadata FROM fragmentos_leyes_bolivianas WHERE hash_contenido IS NULL")
+                datos = [
+                    (id_frag, self.hash_fragmento(contenido, self._decodificar_metadata(id_frag, metadata)))
+                    for id_frag, contenido, metadata in cursor.fetchall()
+                ]
+                if datos:
+                    execute_values(
+                        cursor,
+                        """
+                        UPDATE fragmentos_leyes_bolivianas AS f
+                        SET hash_contenido = v.hash
+                        FROM (VALUES %s) AS v(id, hash)
+                        WHERE f.id = v.id
+                        """,
+                        datos
+                    )
+                conn.commit()
+            if datos:
+                print(f"🔁 hash_contenido calculado para {len(datos)} fragmentos")
+            return len(datos)
+        
+        except Exception as e:
+            print(f"❌ Error calculando hashes de contenido: {e}")
+            return -1
     
     def _inicializar_bd(self):
         """Inicialización automática de la base de datos"""
         print("🚀 Inicializando base de datos PostgreSQL...")
         
-        # Verificar conexión
-        conn = self.obtener_conexion_BaseDatos()
-        if not conn:
-            print("❌ Sin conexión a PostgreSQL")
-            return False
-        
         try:
-            cursor = conn.cursor()
+            with self.conexion() as conn:
+                cursor = conn.cursor()
+                
+                # Crear tabla para fragmentos de texto si no existe
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS fragmentos_leyes_bolivianas (
+                        id SERIAL PRIMARY KEY,
+                        contenido TEXT NOT NULL,
+                        embedding BYTEA,
+                        metadata JSONB,
+                        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+                """)
+            
+                # Formato binario de embeddings: float32 + dimensión + modelo.
+                # Las filas existentes sin formato son pickle heredado.
+                cursor.execute("""
+                    ALTER TABLE fragmentos_leyes_bolivianas
+                        ADD COLUMN IF NOT EXISTS dimension INTEGER,
+                        ADD COLUMN IF NOT EXISTS modelo_embedding TEXT,
+                        ADD COLUMN IF NOT EXISTS formato_embedding TEXT NOT NULL DEFAULT 'pickle';
+                """)
+                
+                # Hash de contenido para la reindexación incremental
+                cursor.execute("""
+                    ALTER TABLE fragmentos_leyes_bolivianas
+                        ADD COLUMN IF NOT EXISTS hash_contenido TEXT;
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_fragmentos_leyes_bolivianas_hash
+                    ON fragmentos_leyes_bolivianas(hash_contenido);
+                """)
             
-            # Crear tabla para fragmentos de texto si no existe
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS fragmentos_leyes_bolivianas (
-                    id SERIAL PRIMARY KEY,
-                    contenido TEXT NOT NULL,
-                    embedding BYTEA,
-                    metadata JSONB,
-                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            # Crear índice para mejor rendimiento
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_fragmentos_leyes_bolivianas_fecha 
-                ON fragmentos_leyes_bolivianas(fecha_creacion);
-            """)
+                # Crear índice para mejor rendimiento
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_fragmentos_leyes_bolivianas_fecha 
+                    ON fragmentos_leyes_bolivianas(fecha_creacion);
+                """)
             
-            conn.commit()
+                conn.commit()
             print("✅ Base de datos inicializada correctamente")
+            
+            # Migrar filas heredadas en pickle y completar hashes (no hacen nada si ya no quedan)
+            self.migrar_embeddings_pickle()
+            self.completar_hashes_contenido()
             return True
             
         except Exception as e:
             print(f"❌ Error al inicializar la base de datos: {e}")
-            conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
     
     def verificar_base_datos_lista(self):
         """
@@ -110,19 +354,11 @@ class GestorBaseDatos:
             dict: Estado de la base de datos con detalles
         """
         try:
-            conn = self.obtener_conexion_BaseDatos()
-            if not conn:
-                return {"lista": False, "mensaje": "Sin conexión a BD"}
-            
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM fragmentos_leyes_bolivianas")
-            count_fragmentos = cursor.fetchone()[0]
-            
-            # Verificar última actualización
-            cursor.execute("SELECT MAX(fecha_creacion) FROM fragmentos_leyes_bolivianas")
-            ultima_actualizacion = cursor.fetchone()[0]
-            
-            conn.close()
+            with self.conexion() as conn:
+                cursor = conn.cursor()
+                # Conteo y última actualización en una sola consulta
+                cursor.execute("SELECT COUNT(*), MAX(fecha_creacion) FROM fragmentos_leyes_bolivianas")
+                count_fragmentos, ultima_actualizacion = cursor.fetchone()
             
             estado = {
                 "lista": count_fragmentos > 0,
@@ -143,6 +379,58 @@ class GestorBaseDatos:
                 "mensaje": f"Error al verificar base de datos: {str(e)}"
             }
     
+    def _leer_fragmentos_bd(self):
+        """
+        Lee los fragmentos del modelo de embeddings actual desde PostgreSQL
+        
+        Returns:
+            tuple: (ids, textos, metadatas, matriz float32) o None si no hay fragmentos
+        """
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, contenido, embedding, metadata, dimension, hash_contenido
+                FROM fragmentos_leyes_bolivianas
+                WHERE formato_embedding = 'float32' AND modelo_embedding = %s AND embedding IS NOT NULL
+                ORDER BY id
+                """,
+                (self.modelo_embeddings(),)
+            )
+            resultados = cursor.fetchall()
+        
+        if not resultados:
+            print(f"⚠️ No se encontraron fragmentos en PostgreSQL para el modelo {self.modelo_embeddings()}")
+            return None
+        
+        # Todos los vectores de un modelo comparten dimensión
+        dimension = resultados[0][4]
+        validos = [fila for fila in resultados if fila[4] == dimension and len(fila[2]) == dimension * 4]
+        if len(validos) != len(resultados):
+            print(f"⚠️ Se descartaron {len(resultados) - len(validos)} fragmentos con dimensión inconsistente")
+        
+        # El hash de contenido es el id en FAISS: un solo vector por contenido
+        vistos = set()
+        unicos = []
+        for fila in validos:
+            id_doc = fila[5] or f"fila-{fila[0]}"
+            if id_doc not in vistos:
+                vistos.add(id_doc)
+                unicos.append(fila)
+        validos = unicos
+        
+        # Una sola concatenación de los buffers y decodificación directa a una matriz contigua
+        matriz = np.frombuffer(
+            b''.join(fila[2] for fila in validos),
+            dtype=FORMATO_FLOAT32
+        ).reshape(len(validos), dimension)
+        
+        texts = [fila[1] for fila in validos]
+        metadatas = [self._decodificar_metadata(fila[0], fila[3]) for fila in validos]
+        
+        ids = [fila[5] or f"fila-{fila[0]}" for fila in validos]
+        return ids, texts, metadatas, matriz
+    
     def cargar_fragmentos_desde_bd(self):
         """
         Carga todos los fragmentos desde PostgreSQL y reconstruye FAISS
@@ -151,66 +439,13 @@ class GestorBaseDatos:
             FAISS vectorstore o None si hay error
         """
         try:
-            conn = self.obtener_conexion_BaseDatos()
-            if not conn:
+            fragmentos = self._leer_fragmentos_bd()
+            if fragmentos is None:
                 return None
-                    
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, contenido, embedding, metadata FROM fragmentos_leyes_bolivianas ORDER BY id")
-            resultados = cursor.fetchall()
-            conn.close()
-            
-            if not resultados:
-                print("⚠️ No se encontraron fragmentos en PostgreSQL")
-                return None
-            
-            # Preparar datos para FAISS
-            texts = []
-            embeddings_list = []
-            metadatas = []
-            
-            for id_frag, contenido, embedding_bytes, metadata_json in resultados:
-                # Deserializar el embedding
-                if embedding_bytes:
-                    try:
-                        embedding = pickle.loads(embedding_bytes)
-                        embeddings_list.append(embedding)
-                        texts.append(contenido)
-                        
-                        # Procesar metadata
-                        metadata = {}
-                        if metadata_json:
-                            try:
-                                if isinstance(metadata_json, str):
-                                    metadata = json.loads(metadata_json)
-                                elif isinstance(metadata_json, dict):
-                                    metadata = metadata_json
-                                else:
-                                    metadata = json.loads(str(metadata_json))
-                            except Exception as e:
-                                print(f"⚠️ Error al procesar metadata para fragmento {id_frag}: {e}")
-                        
-                        metadatas.append(metadata)
-                        
-                    except Exception as e:
-                        print(f"⚠️ Error al deserializar embedding para fragmento {id_frag}: {e}")
-            
-            if not texts or not embeddings_list:
-                print("❌ No se pudieron cargar embeddings válidos")
-                return None
-            
-            # Crear objeto de embeddings de OpenAI
-            vectores = OpenAIEmbeddings(
-                api_key=self.CLAVE_API,
-                model="text-embedding-ada-002"
-            )
+            ids, texts, metadatas, matriz = fragmentos
             
-            # Crear la base de conocimiento utilizando from_embeddings
-            base_conocimiento = FAISS.from_embeddings(
-                text_embeddings=list(zip(texts, embeddings_list)),
-                embedding=vectores,
-                metadatas=metadatas if metadatas else None
-            )
+            # Crear la base de conocimiento directamente desde la matriz
+            base_conocimiento = self._construir_faiss(texts, matriz, metadatas, ids)
             
             print(f"📚 Base de conocimiento reconstruida exitosamente desde PostgreSQL con {len(texts)} fragmentos")
             return base_conocimiento
@@ -219,147 +454,524 @@ class GestorBaseDatos:
             print(f"❌ ERROR al cargar fragmentos desde PostgreSQL: {e}")
             return None
     
-    def procesar_y_guardar_documentos(self):
+    def fuentes_corpus(self):
         """
-        Procesa el archivo base_conocimiento_childfund.txt y guarda los fragmentos en PostgreSQL
+        Archivos del corpus: los PDF y textos de directorio_corpus o, si no hay,
+        el archivo base_conocimiento_childfund.txt
         
         Returns:
-            bool: True si se procesó correctamente, False en caso contrario
+            list: Rutas de las fuentes
         """
-        try:
-            print("🔄 Procesando documentos para crear fragmentos...")
+        if self.directorio_corpus.is_dir():
+            fuentes = listar_fuentes(self.directorio_corpus)
+            if fuentes:
+                return fuentes
+        return [self.documento_leyes] if self.documento_leyes.exists() else []
+    
+    def _fragmentar_corpus(self):
+        """
+        Extrae las páginas de todas las fuentes en paralelo (pool de procesos) y las
+        divide en fragmentos a medida que llegan. Páginas y encabezados de módulo son
+        límites duros; archivo, página y sección quedan en la metadata.
+        
+        Returns:
+            generator: Fragmentos (Documents) o None si no hay fuentes
+        """
+        fuentes = self.fuentes_corpus()
+        if not fuentes:
+            print(f"❌ No se encontraron fuentes en {self.directorio_corpus} ni el archivo {self.documento_leyes}")
+            print("⚠️ Por favor, añade las guías (PDF o texto) al directorio del corpus.")
+            return None
+        
+        print(f"🔄 Procesando {len(fuentes)} fuentes para crear fragmentos...")
+        divisor = DivisorEstructural(**self.config_fragmentos)
+        return divisor.dividir(documentos_corpus(fuentes, procesos=self.procesos_extraccion))
+    
+    def _sincronizar_fragmentos(self, fragmentos):
+        """
+        Sincroniza la tabla con los fragmentos por hash de contenido: los que no cambiaron
+        conservan su embedding, solo los nuevos se embeben e insertan y los que ya no
+        están en el corpus se eliminan. Todo en una transacción.
+        
+        Args:
+            fragmentos (iterable): Fragmentos del corpus (puede ser un generador)
+        
+        Returns:
+            dict: "agregados" [(Document con id = hash, embedding)], "eliminados" [hash],
+                  "sin_cambios" (int) y "hashes" (conjunto de hashes del corpus actual)
+        """
+        modelo = self.modelo_embeddings()
+        
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, hash_contenido FROM fragmentos_leyes_bolivianas
+                WHERE formato_embedding = 'float32' AND modelo_embedding = %s AND embedding IS NOT NULL
+                ORDER BY id
+                """,
+                (modelo,)
+            )
+            existentes, duplicados = {}, []
+            for id_frag, hash_contenido in cursor.fetchall():
+                if hash_contenido in existentes:
+                    duplicados.append(id_frag)
+                else:
+                    existentes[hash_contenido] = id_frag
             
-            # CORRECCIÓN: Verificar que existe el archivo directamente
-            if not self.documento_leyes.exists():
-                print(f"❌ No se encontró el archivo: {self.documento_leyes}")
-                print("⚠️ Por favor, añade el archivo 'base_conocimiento_childfund.txt' en el directorio del proyecto.")
-                return False
+            hashes = set()
+            agregados = []
             
-            # Cargar el archivo
-            textos = []
-            try:
-                # Intentar múltiples codificaciones
-                codificaciones = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
-                contenido = None
-                
-                for encoding in codificaciones:
-                    try:
-                        with open(self.documento_leyes, 'r', encoding=encoding, errors='replace') as archivo:
-                            contenido = archivo.read()
-                            print(f"📖 Archivo cargado con codificación: {encoding}")
-                            break
-                    except UnicodeDecodeError:
+            # Los fragmentos llegan en streaming: solo los nuevos pasan a la ingesta.
+            # Un solo fragmento por contenido; el id del Document es su hash
+            def nuevos():
+                for fragmento in fragmentos:
+                    hash_contenido = self.hash_fragmento(fragmento.page_content, fragmento.metadata)
+                    if hash_contenido in hashes:
                         continue
-                
-                if contenido is None:
-                    # Último recurso: leer como binario y decodificar forzadamente
-                    with open(self.documento_leyes, 'rb') as archivo:
-                        contenido_bytes = archivo.read()
-                        contenido = contenido_bytes.decode('utf-8', errors='replace')
-                        print("📖 Archivo cargado con decodificación forzada")
-                
-                # Limpiar caracteres problemáticos
-                import re
-                contenido = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\xff]', '', contenido)
-                contenido = contenido.replace('\ufffd', '')  # Remover caracteres de reemplazo
-                
-                textos.append(
-                    Document(
-                        page_content=contenido,
-                        metadata={"source": "base_conocimiento_childfund.txt"}
+                    hashes.add(hash_contenido)
+                    if hash_contenido not in existentes:
+                        yield Document(
+                            id=hash_contenido, page_content=fragmento.page_content, metadata=fragmento.metadata
+                        )
+            
+            # Cada lote terminado se inserta directamente
+            def guardar_lote(lote, embeddings):
+                datos = [
+                    (
+                        fragmento.page_content,
+                        psycopg2.Binary(self.codificar_embedding(embedding)),
+                        len(embedding),
+                        modelo,
+                        json.dumps(fragmento.metadata),
+                        fragmento.id
                     )
+                    for fragmento, embedding in zip(lote, embeddings)
+                ]
+                execute_values(
+                    cursor,
+                    "INSERT INTO fragmentos_leyes_bolivianas "
+                    "(contenido, embedding, dimension, modelo_embedding, metadata, hash_contenido, formato_embedding) VALUES %s",
+                    datos,
+                    template="(%s, %s, %s, %s, %s, %s, 'float32')"
                 )
-                print(f"📖 Archivo base_conocimiento_childfund.txt cargado y limpiado exitosamente")
-                
-            except Exception as e:
-                print(f"❌ Error al cargar el archivo base_conocimiento_childfund.txt: {e}")
-                return False
+                agregados.extend(zip(lote, embeddings))
+            
+            print(f"💾 Generando embeddings de los fragmentos nuevos por lotes de {self.config_ingesta['tamano_lote']}...")
+            ingestor = IngestorEmbeddings(self.obtener_embeddings(), **self.config_ingesta)
+            ingestor.procesar(nuevos(), guardar_lote)
+            if not hashes:
+                # Un corpus sin texto extraíble no debe vaciar la tabla
+                raise ValueError("Las fuentes del corpus no produjeron fragmentos")
+
+            # Fragmentos eliminados, duplicados y filas sin embedding utilizable para el modelo actual
+            eliminados = [h for h in existentes if h not in hashes]
+            cursor.execute(
+                """
+                DELETE FROM fragmentos_leyes_bolivianas
+                WHERE id = ANY(%s)
+                   OR NOT (formato_embedding = 'float32' AND modelo_embedding = %s AND embedding IS NOT NULL)
+                """,
+                ([existentes[h] for h in eliminados] + duplicados, modelo)
+            )
+            print(f"🔄 Reindexación: {len(agregados)} nuevos, {len(eliminados)} eliminados, "
+                  f"{len(hashes) - len(agregados)} sin cambios")
             
-            if len(textos) == 0:
-                print("❌ No se pudo cargar el archivo base_conocimiento_childfund.txt correctamente.")
+            conn.commit()
+        
+        return {
+            "agregados": agregados,
+            "eliminados": eliminados,
+            "sin_cambios": len(hashes) - len(agregados),
+            "hashes": hashes
+        }
+    
+    def procesar_y_guardar_documentos(self):
+        """
+        Procesa las fuentes del corpus y sincroniza los fragmentos en PostgreSQL
+        (solo se embeben los fragmentos nuevos o modificados)
+        
+        Returns:
+            bool: True si se procesó correctamente, False en caso contrario
+        """
+        try:
+            fragmentos = self._fragmentar_corpus()
+            if fragmentos is None:
                 return False
             
-            # Configurar el divisor de texto
-            divisor_texto = RecursiveCharacterTextSplitter(
-                chunk_size=1500,          # tamaño de fragmento (caracteres)
-                chunk_overlap=300,        # solapamiento entre fragmentos
-                separators=[
-                    "\n\n",              # separación fuerte por párrafos
-                    "\n",                # saltos de línea
-                    ". ",                # fin de oración
-                    "? ",
-                    "! ",
-                    "; ",
-                    ", "
-                ],
-                length_function=len,
-                is_separator_regex=False  # usamos separadores simples, no regex
+            cambios = self._sincronizar_fragmentos(fragmentos)
+            print(f"✅ {len(cambios['agregados']) + cambios['sin_cambios']} fragmentos sincronizados en PostgreSQL")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error al procesar y guardar documentos: {e}")
+            return False
+    
+    def aplicar_cambios_faiss(self, base_conocimiento, cambios):
+        """
+        Aplica los cambios de _sincronizar_fragmentos sobre una copia del índice FAISS
+        (delete + add) sin reconstruirlo. La base original no se modifica, así que las
+        consultas en curso siguen usando la versión anterior hasta el reemplazo.
+        Los índices IVF se parchean con remove_ids/add_with_ids sobre los centroides ya
+        entrenados; HNSW no admite borrados y se reconstruye completo.
+        
+        Returns:
+            FAISS vectorstore parcheado o None si el índice no admite el parche
+        """
+        ivf = faiss.try_extract_index_ivf(base_conocimiento.index)
+        if ivf is None and not isinstance(base_conocimiento.index, faiss.IndexFlat):
+            print(f"ℹ️ El índice {type(base_conocimiento.index).__name__} no admite borrados, "
+                  "se reconstruirá completo desde PostgreSQL")
+            return None
+        
+        try:
+            # El docstore compartido es de solo lectura: la copia parcheada vive en memoria
+            # hasta que se guarda el snapshot nuevo
+            nueva = FAISS(
+                embedding_function=self.obtener_embeddings(),
+                # Copia propia vía serialización: clone_index comparte el almacenamiento memory-mapped
+                index=faiss.deserialize_index(faiss.serialize_index(base_conocimiento.index)),
+                docstore=InMemoryDocstore({
+                    base_conocimiento.index_to_docstore_id[posicion]: documento
+                    for posicion, documento in self._documentos_base(base_conocimiento)
+                }),
+                index_to_docstore_id=dict(base_conocimiento.index_to_docstore_id)
             )
             
-            # Dividir en fragmentos
-            fragmentos = divisor_texto.split_documents(textos)
-            print(f"📄 Se han creado {len(fragmentos)} fragmentos de texto")
+            presentes = set(nueva.index_to_docstore_id.values())
+            eliminar = [h for h in cambios["eliminados"] if h in presentes]
+            agregados = [(documento, embedding) for documento, embedding in cambios["agregados"]
+                         if documento.id not in presentes]
             
-            # Crear embeddings
-            vectores = OpenAIEmbeddings(
-                api_key=self.CLAVE_API,
-                model="text-embedding-ada-002"
-            )
+            if ivf is None:
+                # IndexFlat compacta las posiciones al borrar; FAISS.delete renumera el mapa
+                if eliminar:
+                    nueva.delete(ids=eliminar)
+                inicio = nueva.index.ntotal
+                if agregados:
+                    nueva.index.add(np.asarray([embedding for _, embedding in agregados], dtype=np.float32))
+            else:
+                # IVF conserva los ids al borrar: el mapa posición -> id queda con huecos
+                faiss.extract_index_ivf(nueva.index).set_direct_map_type(faiss.DirectMap.Hashtable)
+                posiciones = {id_doc: posicion for posicion, id_doc in nueva.index_to_docstore_id.items()}
+                if eliminar:
+                    nueva.index.remove_ids(np.array([posiciones[h] for h in eliminar], dtype=np.int64))
+                    nueva.docstore.delete(eliminar)
+                    for h in eliminar:
+                        del nueva.index_to_docstore_id[posiciones[h]]
+                inicio = max(posiciones.values(), default=-1) + 1
+                if agregados:
+                    nueva.index.add_with_ids(
+                        np.asarray([embedding for _, embedding in agregados], dtype=np.float32),
+                        np.arange(inicio, inicio + len(agregados), dtype=np.int64)
+                    )
             
-            # Guardar fragmentos en PostgreSQL
-            conn = self.obtener_conexion_BaseDatos()
-            if not conn:
-                return False
+            if agregados:
+                nueva.docstore.add({documento.id: documento for documento, _ in agregados})
+                nueva.index_to_docstore_id.update(
+                    {inicio + i: documento.id for i, (documento, _) in enumerate(agregados)}
+                )
             
-            cursor = conn.cursor()
+            # Índices cargados con ids que no son hashes (snapshots anteriores) no se pueden parchear
+            if set(nueva.index_to_docstore_id.values()) != cambios["hashes"]:
+                print("⚠️ El índice FAISS no coincide con el corpus, se reconstruirá")
+                return None
             
-            # Limpiar tabla existente
-            cursor.execute("TRUNCATE TABLE fragmentos_leyes_bolivianas RESTART IDENTITY")
-            print("🔄 Tabla fragmentos_leyes_bolivianas limpiada, insertando nuevos fragmentos...")
+            self.constructor_indices.ajustar(nueva.index)
+            print(f"🩹 Índice FAISS parcheado: +{len(agregados)} / -{len(eliminar)} (total {nueva.index.ntotal})")
+            return nueva
+        
+        except Exception as e:
+            print(f"⚠️ No se pudo parchear el índice FAISS, se reconstruirá: {e}")
+            return None
+    
+    def reindexar(self, base_conocimiento=None):
+        """
+        Reindexación incremental del corpus: sincroniza PostgreSQL por hash de contenido
+        y parchea el índice FAISS en memoria (o lo carga si no se pasa uno).
+        La sincronización y el snapshot se hacen bajo el mismo advisory lock que la
+        construcción inicial, así que no se cruza con otro proceso que ingiere o reindexa.
+        
+        Returns:
+            tuple: (base_conocimiento, resumen) con base_conocimiento None si hubo error
+        """
+        fragmentos = self._fragmentar_corpus()
+        if fragmentos is None:
+            return None, None
+        
+        with self.bloqueo_construccion():
+            return self._aplicar_reindexacion(base_conocimiento, fragmentos)
+    
+    def _aplicar_reindexacion(self, base_conocimiento, fragmentos):
+        """
+        Sincroniza los fragmentos con PostgreSQL y publica el índice resultante
+        (se llama con bloqueo_construccion() tomado).
+        
+        Returns:
+            tuple: (base_conocimiento, resumen)
+        """
+        cambios = self._sincronizar_fragmentos(fragmentos)
+        resumen = {
+            "agregados": len(cambios["agregados"]),
+            "eliminados": len(cambios["eliminados"]),
+            "sin_cambios": cambios["sin_cambios"],
+            "parcheado": False
+        }
+        
+        if base_conocimiento is not None and not cambios["agregados"] and not cambios["eliminados"]:
+            return base_conocimiento, resumen
+        
+        if self.recuperador == 'postgres':
+            # Los fragmentos ya están en la BD: solo falta copiar los vectores nuevos a pgvector
+            return self.base_vectorial_postgres(), resumen
+        
+        nueva = self.aplicar_cambios_faiss(base_conocimiento, cambios) if base_conocimiento is not None else None
+        if nueva is None:
+            return self.cargar_base_conocimiento(), resumen
+        
+        resumen["parcheado"] = True
+        version = self._version_corpus()
+        if version and self.guardar_snapshot(nueva, version) and self.almacen_compartido:
+            nueva = self.cargar_snapshot(version) or nueva
+        return nueva, resumen
+    
+    def _version_corpus(self):
+        """
+        Calcula la versión del corpus a partir del número de filas, el id máximo
+        y la última fecha_creacion de fragmentos_leyes_bolivianas.
+        
+        Returns:
+            str: Hash corto de la versión o None si no hay conexión
+        """
+        try:
+            with self.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT COUNT(*), COALESCE(MAX(id), 0), MAX(fecha_creacion) FROM fragmentos_leyes_bolivianas"
+                )
+                total, id_maximo, ultima_fecha = cursor.fetchone()
+                firma = (f"{total}|{id_maximo}|{ultima_fecha.isoformat() if ultima_fecha else ''}|"
+                         f"{self.modelo_embeddings()}|{self.constructor_indices.firma()}")
+                return hashlib.sha1(firma.encode('utf-8')).hexdigest()[:16]
+        except Exception as e:
+            print(f"⚠️ No se pudo calcular la versión del corpus: {e}")
+            return None
+    
+    @staticmethod
+    def _documentos_base(base_conocimiento):
+        """
+        Returns:
+            list: [(posición en el índice, Document)] en orden de posición
+        """
+        return [
+            (posicion, base_conocimiento.docstore.search(id_doc))
+            for posicion, id_doc in sorted(base_conocimiento.index_to_docstore_id.items())
+        ]
+    
+    @staticmethod
+    def _leer_indice(ruta_indice):
+        """
+        Lee index.faiss memory-mapped y de solo lectura: los workers que cargan el mismo
+        snapshot comparten las páginas del archivo en la caché del sistema operativo.
+        """
+        for banderas in (faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY):
+            try:
+                return faiss.read_index(str(ruta_indice), banderas)
+            except Exception:
+                continue
+        # Tipos de índice sin soporte de mmap: lectura normal
+        return faiss.read_index(str(ruta_indice))
+    
+    def cargar_snapshot(self, version):
+        """
+        Carga el índice FAISS y el docstore guardados en disco para una versión del corpus.
+        El índice se abre memory-mapped; con FAISS_COMPARTIDO los fragmentos también se leen
+        bajo demanda desde archivos memory-mapped en lugar de cargar docstore.json.
+        
+        Returns:
+            FAISS vectorstore o None si no existe snapshot para esa versión
+        """
+        directorio = self.directorio_snapshots / version
+        ruta_indice = directorio / 'index.faiss'
+        ruta_docstore = directorio / 'docstore.json'
+        if not ruta_indice.exists() or not ruta_docstore.exists():
+            return None
+        
+        try:
+            indice = self.constructor_indices.ajustar(self._leer_indice(ruta_indice))
             
-            # Preparar datos para inserción masiva
-            datos = []
-            for fragmento in fragmentos:
-                # Generar embedding para el fragmento
-                embedding = vectores.embed_query(fragmento.page_content)
-                embedding_bytes = pickle.dumps(embedding)
-                
-                datos.append((
-                    fragmento.page_content,
-                    psycopg2.Binary(embedding_bytes),
-                    json.dumps(fragmento.metadata)
-                ))
+            if self.almacen_compartido and existe_almacen(directorio):
+                docstore, index_to_docstore_id = abrir_almacen(directorio)
+                origen = "compartido (memory-mapped)"
+            else:
+                with open(ruta_docstore, 'r', encoding='utf-8') as archivo:
+                    registros = json.load(archivo)
+                docstore = InMemoryDocstore({
+                    r['id']: Document(id=r['id'], page_content=r['contenido'], metadata=r['metadata'])
+                    for r in registros
+                })
+                index_to_docstore_id = {r.get('posicion', i): r['id'] for i, r in enumerate(registros)}
+                origen = "cargado desde disco"
             
-            print(f"💾 Insertando {len(datos)} fragmentos en PostgreSQL...")
+            if len(index_to_docstore_id) != indice.ntotal:
+                raise ValueError(f"{indice.ntotal} vectores para {len(index_to_docstore_id)} fragmentos")
             
-            # Insertar todos los fragmentos
-            execute_values(
-                cursor,
-                "INSERT INTO fragmentos_leyes_bolivianas (contenido, embedding, metadata) VALUES %s",
-                datos,
-                template="(%s, %s, %s)"
+            base_conocimiento = FAISS(
+                embedding_function=self.obtener_embeddings(),
+                index=indice,
+                docstore=docstore,
+                index_to_docstore_id=index_to_docstore_id
             )
+            print(f"💽 Snapshot FAISS {version} {origen} con {indice.ntotal} fragmentos")
+            return base_conocimiento
+        
+        except Exception as e:
+            print(f"⚠️ Snapshot FAISS {version} inválido, se reconstruirá: {e}")
+            return None
+    
+    def guardar_snapshot(self, base_conocimiento, version):
+        """
+        Guarda el índice FAISS y el docstore en disco de forma atómica y elimina
+        los snapshots de versiones anteriores. Con FAISS_COMPARTIDO escribe además los
+        fragmentos en archivos planos para abrirlos memory-mapped.
+        
+        Returns:
+            bool: True si se guardó correctamente
+        """
+        try:
+            self.directorio_snapshots.mkdir(parents=True, exist_ok=True)
+            destino = self.directorio_snapshots / version
+            temporal = Path(tempfile.mkdtemp(prefix=f'.{version}-', dir=self.directorio_snapshots))
             
-            # Verificar que se guardaron correctamente
-            cursor.execute("SELECT COUNT(*) FROM fragmentos_leyes_bolivianas")
-            count = cursor.fetchone()[0]
+            faiss.write_index(base_conocimiento.index, str(temporal / 'index.faiss'))
             
-            conn.commit()
-            conn.close()
+            registros = [
+                (posicion, Document(
+                    id=base_conocimiento.index_to_docstore_id[posicion],
+                    page_content=documento.page_content, metadata=documento.metadata
+                ))
+                for posicion, documento in self._documentos_base(base_conocimiento)
+            ]
+            with open(temporal / 'docstore.json', 'w', encoding='utf-8') as archivo:
+                json.dump([
+                    {'posicion': posicion, 'id': d.id, 'contenido': d.page_content, 'metadata': d.metadata}
+                    for posicion, d in registros
+                ], archivo, ensure_ascii=False)
             
-            print(f"✅ {count} fragmentos guardados exitosamente en PostgreSQL")
-            return True
+            if self.almacen_compartido:
+                escribir_almacen(temporal, registros)
+            
+            if destino.exists():
+                shutil.rmtree(destino)
+            os.replace(temporal, destino)
             
+            # Solo se conserva la versión actual
+            for antiguo in self.directorio_snapshots.iterdir():
+                if antiguo.is_dir() and antiguo.name != version and not antiguo.name.startswith('.'):
+                    shutil.rmtree(antiguo, ignore_errors=True)
+            
+            print(f"💽 Snapshot FAISS {version} guardado en {destino}")
+            return True
+        
         except Exception as e:
-            print(f"❌ Error al procesar y guardar documentos: {e}")
-            if 'conn' in locals() and conn:
-                conn.rollback()
-                conn.close()
+            print(f"⚠️ No se pudo guardar el snapshot FAISS: {e}")
+            if 'temporal' in locals():
+                shutil.rmtree(temporal, ignore_errors=True)
             return False
     
+    def cargar_base_conocimiento(self):
+        """
+        Carga la base de conocimiento desde el snapshot en disco si está al día con
+        PostgreSQL; si no, la reconstruye desde la BD y guarda un snapshot nuevo.
+        Con RECUPERADOR_BACKEND=postgres no se copia nada: se busca en la propia BD.
+        
+        Returns:
+            FAISS vectorstore o None si hay error
+        """
+        if self.recuperador == 'postgres':
+            return self.base_vectorial_postgres()
+        
+        version = self._version_corpus()
+        if version:
+            base_conocimiento = self.cargar_snapshot(version)
+            if base_conocimiento is not None:
+                return base_conocimiento
+            print(f"🔄 Snapshot FAISS desactualizado o inexistente (versión {version}), reconstruyendo desde PostgreSQL...")
+        
+        base_conocimiento = self.cargar_fragmentos_desde_bd()
+        if base_conocimiento is not None and version and self.guardar_snapshot(base_conocimiento, version):
+            if self.almacen_compartido:
+                # Se usa la copia memory-mapped del snapshot y se suelta la construida en memoria
+                return self.cargar_snapshot(version) or base_conocimiento
+        return base_conocimiento
+    
+    def base_vectorial_postgres(self):
+        """
+        Base de conocimiento que busca en PostgreSQL (pgvector o recorrido por lotes)
+        
+        Returns:
+            BaseVectorialPostgres o None si hay error
+        """
+        try:
+            return BaseVectorialPostgres(self, **self.config_postgres_vectorial).preparar()
+        except Exception as e:
+            print(f"❌ ERROR al preparar la búsqueda vectorial en PostgreSQL: {e}")
+            return None
+    
+    def estadisticas_indice(self, base_conocimiento):
+        """
+        Returns:
+            dict: Tipo configurado y parámetros del índice FAISS en uso
+        """
+        if base_conocimiento is None:
+            return None
+        if isinstance(base_conocimiento, BaseVectorialPostgres):
+            return base_conocimiento.estadisticas()
+        estadisticas = ConstructorIndices.estadisticas(base_conocimiento.index)
+        estadisticas["configurado"] = self.constructor_indices.tipo
+        return estadisticas
+    
+    def informe_indices(self, tipos=None, k=10, num_consultas=200):
+        """
+        Informe recall-vs-latencia de cada tipo de índice contra la búsqueda exacta,
+        sobre los embeddings actuales de PostgreSQL.
+        
+        Returns:
+            list: Filas del informe (ver informe_recall_latencia) o None si no hay fragmentos
+        """
+        fragmentos = self._leer_fragmentos_bd()
+        if fragmentos is None:
+            return None
+        config = self.constructor_indices
+        filas = informe_recall_latencia(
+            fragmentos[3], tipos=tipos or TIPOS_INDICE, k=k, num_consultas=num_consultas,
+            nlist=config.nlist, pq_m=config.pq_m, pq_bits=config.pq_bits, hnsw_m=config.hnsw_m,
+            ef_construction=config.ef_construction
+        )
+        for fila in filas:
+            print(f"📊 {fila}")
+        return filas
+    
+    @contextmanager
+    def bloqueo_construccion(self):
+        """
+        Advisory lock de PostgreSQL compartido por todos los procesos: solo uno ingiere
+        el corpus y construye el snapshot a la vez; el resto espera y luego lo carga.
+        """
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT pg_advisory_lock(%s)", (CLAVE_BLOQUEO_CONSTRUCCION,))
+            try:
+                yield
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (CLAVE_BLOQUEO_CONSTRUCCION,))
+                conn.commit()
+    
     def obtener_base_conocimiento(self):
         """
-        Obtiene la base de conocimiento FAISS, cargándola desde BD o procesando documentos si es necesario
+        Obtiene la base de conocimiento FAISS, cargándola desde BD o procesando documentos si es necesario.
+        Con varios workers, el primero construye el snapshot y los demás cargan ese mismo
+        snapshot (memory-mapped) en lugar de construir cada uno el suyo.
         
         Returns:
             FAISS vectorstore o None si hay error
@@ -367,19 +979,30 @@ class GestorBaseDatos:
         # Verificar estado de la base de datos
         estado = self.verificar_base_datos_lista()
         
-        if estado["lista"]:
-            # Si hay fragmentos en BD, cargarlos
-            print("📚 Cargando base de conocimiento desde PostgreSQL...")
-            return self.cargar_fragmentos_desde_bd()
-        else:
-            # Si no hay fragmentos, procesarlos desde archivo
-            print("📄 Base de datos vacía, procesando documentos...")
-            if self.procesar_y_guardar_documentos():
-                # Después de procesar, cargar la base de conocimiento
-                return self.cargar_fragmentos_desde_bd()
+        # Ruta rápida: ya hay un snapshot al día construido por este u otro proceso
+        if estado["lista"] and self.recuperador == 'faiss':
+            version = self._version_corpus()
+            base_conocimiento = self.cargar_snapshot(version) if version else None
+            if base_conocimiento is not None:
+                return base_conocimiento
+        
+        with self.bloqueo_construccion():
+            # Otro proceso pudo terminar la ingesta mientras se esperaba el lock
+            estado = self.verificar_base_datos_lista()
+            
+            if estado["lista"]:
+                # Si hay fragmentos en BD, cargarlos
+                print("📚 Cargando base de conocimiento desde PostgreSQL...")
+                return self.cargar_base_conocimiento()
             else:
-                print("❌ No se pudieron procesar los documentos")
-                return None
+                # Si no hay fragmentos, procesarlos desde archivo
+                print("📄 Base de datos vacía, procesando documentos...")
+                if self.procesar_y_guardar_documentos():
+                    # Después de procesar, cargar la base de conocimiento
+                    return self.cargar_base_conocimiento()
+                else:
+                    print("❌ No se pudieron procesar los documentos")
+                    return None
     
     def limpiar_base_datos(self):
         """
@@ -389,23 +1012,16 @@ class GestorBaseDatos:
             bool: True si se limpió correctamente
         """
         try:
-            conn = self.obtener_conexion_BaseDatos()
-            if not conn:
-                return False
-            
-            cursor = conn.cursor()
-            cursor.execute("TRUNCATE TABLE fragmentos_leyes_bolivianas RESTART IDENTITY CASCADE")
-            conn.commit()
-            conn.close()
+            with self.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute("TRUNCATE TABLE fragmentos_leyes_bolivianas RESTART IDENTITY CASCADE")
+                conn.commit()
             
             print("🧹 Base de datos limpiada exitosamente")
             return True
             
         except Exception as e:
             print(f"❌ Error al limpiar la base de datos: {e}")
-            if 'conn' in locals() and conn:
-                conn.rollback()
-                conn.close()
             return False
 
 # CORRECCIÓN: Cambiar nombre de clase de ejemplo
@@ -413,6 +1029,11 @@ if __name__ == "__main__":
     # Crear instancia del gestor de BD
     gestor_bd = GestorBaseDatos()
     
+    # python gestor_bd.py informe_indices → recall@10 y latencia de cada tipo de índice contra flat
+    if "informe_indices" in sys.argv[1:]:
+        gestor_bd.informe_indices()
+        sys.exit(0)
+    
     # Verificar estado
     estado = gestor_bd.verificar_base_datos_lista()
     print("Estado de la BD:", estado)
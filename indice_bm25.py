@@ -0,0 +1,272 @@
+import json
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+import numpy as np
+
+# Palabras vacías del español que no aportan a la búsqueda léxica
+PALABRAS_VACIAS = frozenset("""
+a al algo ante como con contra cual cuando de del desde donde durante e el ella ellas ellos en entre era es esa
+ese eso esta este esto estos estas fue ha hay la las le les lo los mas me mi mis muy ni no nos o os para pero
+por que quien se sea ser si sin sobre su sus tambien te tiene tu tus u un una uno unos unas y ya yo
+""".split())
+
+_PATRON_TERMINO = re.compile(r"[a-z0-9]+")
+
+
+class IndiceBM25:
+    """
+    Índice invertido BM25 sobre los fragmentos de la base de conocimiento.
+    El texto se normaliza con NormalizadorOracion (modismos, minúsculas) y sin tildes,
+    así que siglas y nombres propios (NIT, SEGIP, "unipersonal") se encuentran por
+    coincidencia exacta. Los pesos BM25 de cada posting se precalculan al construir,
+    de modo que buscar es solo sumar arrays de NumPy.
+
+    Los postings se guardan en arrays planos (vocabulario ordenado, inicio de cada lista,
+    fragmentos y pesos) que pueden escribirse junto al snapshot y abrirse memory-mapped:
+    las postings apuntan al orden del fragmento en el docstore y el texto se resuelve
+    bajo demanda, así que cada worker no guarda copia de los fragmentos.
+    """
+
+    def __init__(self, normalizador=None, k1=1.5, b=0.75, cobertura_minima=0.8, margen=1.5, minimo_terminos=2):
+        """
+        Args:
+            normalizador (NormalizadorOracion): Normalizador de modismos (None = solo minúsculas)
+            k1 (float): Saturación de la frecuencia del término
+            b (float): Normalización por longitud del fragmento
+            cobertura_minima (float): Fracción de términos de la consulta que debe contener el mejor resultado
+                                      para considerarlo decisivo
+            margen (float): Cuántas veces debe superar el mejor puntaje al segundo para ser decisivo
+            minimo_terminos (int): Términos conocidos mínimos en la consulta para decidir sin vectores
+        """
+        self.normalizador = normalizador
+        self.k1 = k1
+        self.b = b
+        self.cobertura_minima = cobertura_minima
+        self.margen = margen
+        self.minimo_terminos = minimo_terminos
+
+        self._total = 0
+        self._documento = None
+        self._terminos = np.zeros(0, dtype="S1")
+        self._inicios = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._pesos = np.zeros(0, dtype=np.float32)
+        self._lock = threading.Lock()
+        self._estadisticas = {"busquedas": 0, "decisivas": 0}
+
+    def _normalizar(self, textos):
+        if self.normalizador is not None:
+            textos = self.normalizador.normalizar_lote(list(textos))
+        else:
+            textos = [texto.lower() for texto in textos]
+        return [
+            "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+            for texto in textos
+        ]
+
+    def tokenizar(self, textos):
+        """
+        Returns:
+            list: Lista de términos por texto
+        """
+        return [
+            [termino for termino in _PATRON_TERMINO.findall(texto)
+             if termino not in PALABRAS_VACIAS and (len(termino) > 1 or termino.isdigit())]
+            for texto in self._normalizar(textos)
+        ]
+
+    def construir(self, documentos, resolver=None):
+        """
+        Construye el índice invertido.
+
+        Args:
+            documentos (iterable): Documents (fragmentos) de la base de conocimiento
+            resolver (callable): orden -> Document; None = conservar la lista de Documents
+
+        Returns:
+            IndiceBM25: El propio índice
+        """
+        documentos = list(documentos)
+        terminos_por_doc = self.tokenizar([documento.page_content for documento in documentos])
+        longitudes = [len(terminos) for terminos in terminos_por_doc]
+
+        crudos = defaultdict(lambda: ([], []))
+        for indice, terminos in enumerate(terminos_por_doc):
+            for termino, frecuencia in Counter(terminos).items():
+                docs, frecuencias = crudos[termino]
+                docs.append(indice)
+                frecuencias.append(frecuencia)
+
+        total = len(longitudes)
+        longitudes = np.array(longitudes, dtype=np.float32)
+        promedio = float(longitudes.mean()) if total and longitudes.mean() > 0 else 1.0
+
+        vocabulario = sorted(crudos)
+        inicios = np.zeros(len(vocabulario) + 1, dtype=np.int64)
+        todos_docs, todos_pesos = [], []
+        for posicion, termino in enumerate(vocabulario):
+            docs, frecuencias = crudos[termino]
+            docs = np.array(docs, dtype=np.int32)
+            tf = np.array(frecuencias, dtype=np.float32)
+            idf = np.log1p((total - len(docs) + 0.5) / (len(docs) + 0.5))
+            norma = self.k1 * (1 - self.b + self.b * longitudes[docs] / promedio)
+            todos_docs.append(docs)
+            todos_pesos.append((idf * tf * (self.k1 + 1) / (tf + norma)).astype(np.float32))
+            inicios[posicion + 1] = inicios[posicion] + len(docs)
+
+        ancho = max((len(termino) for termino in vocabulario), default=1)
+        self._publicar(
+            total,
+            resolver or documentos.__getitem__,
+            np.array([termino.encode("ascii") for termino in vocabulario], dtype=f"S{ancho}"),
+            inicios,
+            np.concatenate(todos_docs) if todos_docs else np.zeros(0, dtype=np.int32),
+            np.concatenate(todos_pesos) if todos_pesos else np.zeros(0, dtype=np.float32)
+        )
+        print(f"🔤 Índice BM25 construido: {total} fragmentos, {len(vocabulario)} términos")
+        return self
+
+    def _publicar(self, total, documento, terminos, inicios, docs, pesos):
+        with self._lock:
+            self._total = total
+            self._documento = documento
+            self._terminos = terminos
+            self._inicios = inicios
+            self._docs = docs
+            self._pesos = pesos
+
+    def guardar(self, directorio):
+        """
+        Escribe los arrays del índice en un directorio (junto al snapshot FAISS).
+
+        Args:
+            directorio (Path): Directorio de destino (debe existir)
+        """
+        directorio = Path(directorio)
+        with self._lock:
+            np.save(directorio / "terminos.npy", self._terminos)
+            np.save(directorio / "inicios.npy", self._inicios)
+            np.save(directorio / "docs.npy", self._docs)
+            np.save(directorio / "pesos.npy", self._pesos)
+            parametros = {"total": self._total, "k1": self.k1, "b": self.b}
+        with open(directorio / "parametros.json", "w", encoding="utf-8") as archivo:
+            json.dump(parametros, archivo)
+
+    def abrir(self, directorio, resolver):
+        """
+        Abre un índice guardado con guardar() en modo memory-mapped.
+
+        Args:
+            directorio (Path): Directorio con los arrays del índice
+            resolver (callable): orden -> Document (p. ej. DocstoreCompartido.documento)
+
+        Returns:
+            IndiceBM25: El propio índice, o None si el índice guardado no corresponde a k1/b
+        """
+        directorio = Path(directorio)
+        with open(directorio / "parametros.json", "r", encoding="utf-8") as archivo:
+            parametros = json.load(archivo)
+        if parametros["k1"] != self.k1 or parametros["b"] != self.b:
+            return None
+
+        terminos = np.load(directorio / "terminos.npy", mmap_mode="r")
+        self._publicar(
+            parametros["total"], resolver, terminos,
+            np.load(directorio / "inicios.npy", mmap_mode="r"),
+            np.load(directorio / "docs.npy", mmap_mode="r"),
+            np.load(directorio / "pesos.npy", mmap_mode="r")
+        )
+        print(f"🔤 Índice BM25 abierto (memory-mapped): {parametros['total']} fragmentos, {len(terminos)} términos")
+        return self
+
+    def _posting(self, terminos, termino):
+        """Rango de la lista de postings del término o None si no está en el vocabulario"""
+        clave = termino.encode("ascii")
+        if len(clave) > terminos.dtype.itemsize:
+            return None
+        posicion = int(np.searchsorted(terminos, clave))
+        if posicion < len(terminos) and terminos[posicion] == clave:
+            return posicion
+        return None
+
+    def buscar(self, consulta, k=12):
+        """
+        Args:
+            consulta (str): Texto de la consulta
+            k (int): Máximo de resultados
+
+        Returns:
+            tuple: ([(Document, puntaje)] ordenados de mayor a menor, decisivo (bool))
+        """
+        with self._lock:
+            total, documento, terminos_indice = self._total, self._documento, self._terminos
+            inicios, docs_indice, pesos_indice = self._inicios, self._docs, self._pesos
+
+        if not total or not len(terminos_indice):
+            return [], False
+        listas = []
+        for termino in dict.fromkeys(self.tokenizar([consulta])[0]):
+            posicion = self._posting(terminos_indice, termino)
+            if posicion is not None:
+                listas.append((inicios[posicion], inicios[posicion + 1]))
+        if not listas:
+            return [], False
+
+        puntajes = np.zeros(total, dtype=np.float32)
+        coincidencias = np.zeros(total, dtype=np.int32)
+        for inicio, fin in listas:
+            docs = docs_indice[inicio:fin]
+            puntajes[docs] += pesos_indice[inicio:fin]
+            coincidencias[docs] += 1
+
+        k = min(k, int(np.count_nonzero(puntajes)))
+        if k == 0:
+            return [], False
+        mejores = np.argpartition(-puntajes, k - 1)[:k]
+        mejores = mejores[np.argsort(-puntajes[mejores], kind="stable")]
+
+        primero = float(puntajes[mejores[0]])
+        segundo = float(puntajes[mejores[1]]) if len(mejores) > 1 else 0.0
+        decisivo = bool(
+            len(listas) >= self.minimo_terminos
+            and coincidencias[mejores[0]] / len(listas) >= self.cobertura_minima
+            and primero >= self.margen * segundo
+        )
+
+        with self._lock:
+            self._estadisticas["busquedas"] += 1
+            self._estadisticas["decisivas"] += int(decisivo)
+        return [(documento(int(i)), float(puntajes[i])) for i in mejores], decisivo
+
+    def estadisticas(self):
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+            estadisticas["fragmentos"] = self._total
+            estadisticas["terminos"] = len(self._terminos)
+        return estadisticas
+
+
+def fusion_rrf(listas, k=12, constante=60):
+    """
+    Reciprocal Rank Fusion: puntaje = suma de 1 / (constante + posición) en cada lista.
+
+    Args:
+        listas (list): Listas de Documents ordenadas por relevancia
+        k (int): Máximo de resultados
+        constante (int): Constante de RRF (60 es el valor habitual)
+
+    Returns:
+        list: [(Document, puntaje_rrf)] ordenados de mayor a menor
+    """
+    puntajes = {}
+    documentos = {}
+    for lista in listas:
+        for posicion, documento in enumerate(lista, start=1):
+            clave = documento.id or documento.page_content
+            puntajes[clave] = puntajes.get(clave, 0.0) + 1.0 / (constante + posicion)
+            documentos.setdefault(clave, documento)
+    ordenados = sorted(puntajes, key=puntajes.get, reverse=True)[:k]
+    return [(documentos[clave], puntajes[clave]) for clave in ordenados]
@@ -0,0 +1,215 @@
+import math
+import time
+import faiss
+import numpy as np
+
+# Tipos de índice soportados (variable de entorno FAISS_TIPO_INDICE)
+TIPOS_INDICE = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+class ConstructorIndices:
+    """
+    Construye el índice FAISS configurado (flat exacto, IVF-Flat, IVF-PQ o HNSW) a partir
+    de la matriz de embeddings, entrenándolo cuando el tipo lo requiere, y ajusta los
+    parámetros de búsqueda (nprobe en IVF, efSearch en HNSW). Con pocos fragmentos se usa
+    el índice plano: la búsqueda exacta ya es inmediata y los índices aproximados no
+    tendrían datos suficientes para entrenarse.
+    """
+
+    def __init__(self, tipo="flat", nlist=None, pq_m=None, pq_bits=8, hnsw_m=32, ef_construction=200,
+                 nprobe=16, ef_search=64, minimo_vectores=1000):
+        """
+        Args:
+            tipo (str): "flat", "ivf_flat", "ivf_pq" o "hnsw"
+            nlist (int): Listas (centroides) de IVF; None = 4·√n acotado por los datos de entrenamiento
+            pq_m (int): Subcuantizadores de PQ (debe dividir la dimensión); None = el mayor divisor
+                        ≤ 64 con al menos 8 dimensiones por subvector
+            pq_bits (int): Bits máximos por código de PQ (se reducen si faltan datos de entrenamiento)
+            hnsw_m (int): Vecinos por nodo del grafo HNSW
+            ef_construction (int): Amplitud de búsqueda al construir HNSW
+            nprobe (int): Listas IVF visitadas por consulta
+            ef_search (int): Amplitud de búsqueda de HNSW por consulta
+            minimo_vectores (int): Por debajo de este número de vectores se usa el índice plano
+        """
+        if tipo not in TIPOS_INDICE:
+            raise ValueError(f"Tipo de índice FAISS desconocido: {tipo} (opciones: {', '.join(TIPOS_INDICE)})")
+        self.tipo = tipo
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_bits = pq_bits
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.minimo_vectores = minimo_vectores
+
+    def firma(self):
+        """Parámetros que cambian el índice construido (forman parte de la versión del snapshot)"""
+        if self.tipo == "flat":
+            return "flat"
+        if self.tipo == "hnsw":
+            return f"hnsw:{self.hnsw_m}:{self.ef_construction}:{self.minimo_vectores}"
+        return f"{self.tipo}:{self.nlist}:{self.pq_m}:{self.pq_bits}:{self.minimo_vectores}"
+
+    def _nlist(self, total):
+        # ~39 vectores de entrenamiento por centroide, como recomienda FAISS
+        return max(1, min(self.nlist or int(4 * math.sqrt(total)), total // 39))
+
+    def _pq_m(self, dimension):
+        if self.pq_m:
+            if dimension % self.pq_m:
+                raise ValueError(f"pq_m={self.pq_m} no divide la dimensión {dimension}")
+            return self.pq_m
+        return max(m for m in range(1, max(1, min(64, dimension // 8)) + 1) if dimension % m == 0)
+
+    def _pq_bits(self, total):
+        # Cada subcuantizador entrena 2^bits centroides con ~39 vectores por centroide
+        return min(self.pq_bits, int(math.log2(total / 39))) if total >= 39 * 16 else 0
+
+    def descripcion(self, total, dimension):
+        """
+        Returns:
+            str: Cadena de faiss.index_factory para el tipo configurado y el tamaño del corpus
+        """
+        if self.tipo == "flat" or total < self.minimo_vectores:
+            return "Flat"
+        if self.tipo == "hnsw":
+            return f"HNSW{self.hnsw_m}"
+        nlist = self._nlist(total)
+        if nlist < 2 or (self.tipo == "ivf_pq" and self._pq_bits(total) < 4):
+            return "Flat"
+        if self.tipo == "ivf_flat":
+            return f"IVF{nlist},Flat"
+        return f"IVF{nlist},PQ{self._pq_m(dimension)}x{self._pq_bits(total)}"
+
+    def construir(self, matriz):
+        """
+        Crea, entrena y llena el índice.
+
+        Args:
+            matriz (np.ndarray): Embeddings float32 (n x dimensión)
+
+        Returns:
+            faiss.Index: Índice listo para buscar
+        """
+        matriz = np.ascontiguousarray(matriz, dtype=np.float32)
+        total, dimension = matriz.shape
+        descripcion = self.descripcion(total, dimension)
+        if descripcion == "Flat" and self.tipo != "flat":
+            print(f"ℹ️ {total} fragmentos: se usa índice plano en lugar de {self.tipo}")
+
+        inicio = time.perf_counter()
+        indice = faiss.index_factory(dimension, descripcion, faiss.METRIC_L2)
+        if isinstance(indice, faiss.IndexHNSW):
+            indice.hnsw.efConstruction = self.ef_construction
+        if not indice.is_trained:
+            indice.train(matriz)
+        indice.add(matriz)
+
+        ivf = faiss.try_extract_index_ivf(indice)
+        if ivf is not None:
+            # reconstruct() por posición (MMR y snapshots) necesita el mapa directo
+            ivf.make_direct_map()
+
+        self.ajustar(indice)
+        print(f"🧭 Índice FAISS {descripcion} construido con {total} vectores en {time.perf_counter() - inicio:.2f} s")
+        return indice
+
+    def ajustar(self, indice, nprobe=None, ef_search=None):
+        """
+        Aplica los parámetros de búsqueda (no se guardan en el snapshot, se aplican al cargar).
+
+        Returns:
+            faiss.Index: El mismo índice
+        """
+        ivf = faiss.try_extract_index_ivf(indice) if isinstance(indice, faiss.Index) else None
+        if ivf is not None:
+            ivf.nprobe = min(nprobe or self.nprobe, ivf.nlist)
+        if isinstance(indice, faiss.IndexHNSW):
+            indice.hnsw.efSearch = ef_search or self.ef_search
+        return indice
+
+    @staticmethod
+    def estadisticas(indice):
+        """
+        Returns:
+            dict: Tipo, vectores y parámetros de búsqueda del índice
+        """
+        estadisticas = {"tipo": type(indice).__name__, "vectores": int(indice.ntotal), "dimension": int(indice.d)}
+        ivf = faiss.try_extract_index_ivf(indice) if isinstance(indice, faiss.Index) else None
+        if ivf is not None:
+            estadisticas.update(nlist=int(ivf.nlist), nprobe=int(ivf.nprobe))
+        if isinstance(indice, faiss.IndexHNSW):
+            estadisticas.update(ef_search=int(indice.hnsw.efSearch))
+        return estadisticas
+
+
+def _medir(indice, consultas, k):
+    """Busca las consultas una por una (como llegan al servicio) y mide la latencia media"""
+    posiciones = np.empty((len(consultas), k), dtype=np.int64)
+    inicio = time.perf_counter()
+    for i, consulta in enumerate(consultas):
+        posiciones[i] = indice.search(consulta[None, :], k)[1][0]
+    return posiciones, (time.perf_counter() - inicio) * 1000 / len(consultas)
+
+
+def informe_recall_latencia(matriz, tipos=TIPOS_INDICE, k=10, num_consultas=200, barrido_nprobe=(1, 4, 16, 64),
+                            barrido_ef_search=(16, 32, 64, 128), semilla=0, **config):
+    """
+    Compara recall@k y latencia de cada tipo de índice contra la búsqueda exacta (flat).
+    Las consultas son fragmentos del propio corpus elegidos al azar.
+
+    Args:
+        matriz (np.ndarray): Embeddings float32 (n x dimensión)
+        tipos (tuple): Tipos de índice a evaluar
+        k (int): Vecinos por consulta
+        num_consultas (int): Consultas de prueba
+        barrido_nprobe (tuple): Valores de nprobe a evaluar en los índices IVF
+        barrido_ef_search (tuple): Valores de efSearch a evaluar en HNSW
+        semilla (int): Semilla para elegir las consultas
+        **config: Parámetros adicionales para ConstructorIndices (nlist, pq_m, ...)
+
+    Returns:
+        list: Una fila por índice y parámetro con recall, latencia, memoria y tiempo de construcción
+    """
+    matriz = np.ascontiguousarray(matriz, dtype=np.float32)
+    generador = np.random.default_rng(semilla)
+    consultas = matriz[generador.choice(len(matriz), size=min(num_consultas, len(matriz)), replace=False)]
+    k = min(k, len(matriz))
+
+    filas = []
+    exactos = None
+    for tipo in ["flat"] + [t for t in tipos if t != "flat"]:
+        constructor = ConstructorIndices(tipo, minimo_vectores=0, **config)
+        try:
+            inicio = time.perf_counter()
+            indice = constructor.construir(matriz)
+            construccion = time.perf_counter() - inicio
+        except Exception as e:
+            filas.append({"tipo": tipo, "error": str(e)})
+            continue
+
+        memoria = faiss.serialize_index(indice).size / 2 ** 20
+        if faiss.try_extract_index_ivf(indice) is not None:
+            barrido = [{"nprobe": v} for v in barrido_nprobe]
+        elif isinstance(indice, faiss.IndexHNSW):
+            barrido = [{"ef_search": v} for v in barrido_ef_search]
+        else:
+            barrido = [{}]
+
+        for parametros in barrido:
+            constructor.ajustar(indice, **parametros)
+            posiciones, latencia = _medir(indice, consultas, k)
+            if exactos is None:
+                exactos = posiciones
+            aciertos = sum(len(np.intersect1d(p, e)) for p, e in zip(posiciones, exactos))
+            filas.append({
+                "tipo": tipo,
+                "indice": constructor.descripcion(len(matriz), matriz.shape[1]),
+                "parametros": parametros,
+                f"recall@{k}": round(aciertos / (k * len(consultas)), 4),
+                "latencia_ms": round(latencia, 3),
+                "memoria_mb": round(memoria, 2),
+                "construccion_s": round(construccion, 2)
+            })
+    return filas
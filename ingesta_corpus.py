@@ -0,0 +1,157 @@
+import os
+import re
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import pdfplumber
+from langchain_core.documents import Document
+
+EXTENSIONES_CORPUS = ('.pdf', '.txt', '.md')
+
+# Marcador de página que escribe rasterizador.pdf_a_txt_simple
+PATRON_PAGINA = re.compile(r"\n*===== PÁGINA (\d+) =====\n*")
+
+CODIFICACIONES = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
+
+
+def limpiar_texto(texto):
+    """
+    Elimina caracteres de control (C0/C1) y de reemplazo. Las letras acentuadas
+    (Latin-1, \xa0-\xff) se conservan: sin ellas no se reconocen encabezados como "Módulo".
+    """
+    texto = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', texto)
+    return texto.replace('\ufffd', '')
+
+
+def leer_texto(ruta):
+    """Lee un archivo de texto probando varias codificaciones"""
+    for encoding in CODIFICACIONES:
+        try:
+            with open(ruta, 'r', encoding=encoding) as archivo:
+                return archivo.read()
+        except UnicodeDecodeError:
+            continue
+    with open(ruta, 'rb') as archivo:
+        return archivo.read().decode('utf-8', errors='replace')
+
+
+def paginas_de_texto(texto):
+    """
+    Divide un texto extraído en páginas usando los marcadores "===== PÁGINA N =====".
+    Sin marcadores, todo el texto es una sola página (número None).
+
+    Returns:
+        list: [(numero_pagina, texto)]
+    """
+    partes = PATRON_PAGINA.split(texto)
+    if len(partes) == 1:
+        return [(None, texto)]
+    paginas = [(None, partes[0])] if partes[0].strip() else []
+    paginas += [(int(numero), contenido) for numero, contenido in zip(partes[1::2], partes[2::2])]
+    return paginas
+
+
+def _extraer_tarea(tarea):
+    """
+    Trabajo de un proceso del pool: extrae un rango de páginas de un PDF
+    o todas las páginas de un archivo de texto.
+
+    Returns:
+        list: [(numero_pagina, texto)]
+    """
+    ruta, inicio, fin = tarea
+    if inicio is None:
+        return paginas_de_texto(leer_texto(ruta))
+
+    with pdfplumber.open(ruta) as pdf:
+        return [(numero + 1, pdf.pages[numero].extract_text() or "") for numero in range(inicio, fin)]
+
+
+def listar_fuentes(directorio):
+    """Archivos PDF y de texto del directorio del corpus (en orden estable)"""
+    return sorted(
+        ruta for ruta in Path(directorio).iterdir()
+        if ruta.is_file() and ruta.suffix.lower() in EXTENSIONES_CORPUS
+    )
+
+
+def _contar_paginas(ruta):
+    """Trabajo de un proceso del pool: número de páginas de un PDF"""
+    with pdfplumber.open(ruta) as pdf:
+        return len(pdf.pages)
+
+
+def _tareas(fuentes, paginas, paginas_por_tarea):
+    """
+    Reparte los PDFs en rangos de páginas para que un PDF grande use varios procesos.
+
+    Args:
+        fuentes (list): Rutas del corpus
+        paginas (dict): Número de páginas de cada PDF (contadas en el pool)
+        paginas_por_tarea (int): Páginas por rango
+    """
+    tareas = []
+    for ruta in fuentes:
+        if ruta.suffix.lower() == '.pdf':
+            total = paginas[ruta]
+            tareas += [(ruta, inicio, min(inicio + paginas_por_tarea, total))
+                       for inicio in range(0, total, paginas_por_tarea)]
+        else:
+            tareas.append((ruta, None, None))
+    return tareas
+
+
+def extraer_paginas(fuentes, procesos=None, paginas_por_tarea=8):
+    """
+    Extrae las páginas de todas las fuentes con un pool de procesos.
+    Las páginas se entregan en orden (fuente, página) a medida que terminan,
+    sin esperar a que se extraiga todo el corpus.
+
+    El pool usa el contexto "spawn": el proceso padre puede tener hilos (servidor,
+    pool de conexiones) y un fork los copiaría en un estado inconsistente. Cada worker
+    vuelve a importar el script principal, que por eso no debe tener efectos al
+    importarse (app.py solo inicia el servicio con iniciar_servicio()). Los PDFs
+    también se abren solo en los workers, incluido el conteo de páginas; si el corpus
+    es solo de archivos de texto no se crea el pool.
+
+    Yields:
+        tuple: (ruta, numero_pagina, texto sin limpiar)
+    """
+    fuentes = [Path(ruta) for ruta in fuentes]
+    if not fuentes:
+        return
+
+    pdfs = [ruta for ruta in fuentes if ruta.suffix.lower() == '.pdf']
+    if not pdfs:
+        # Solo archivos de texto: leerlos no justifica levantar procesos
+        for ruta in fuentes:
+            for numero, texto in _extraer_tarea((ruta, None, None)):
+                yield ruta, numero, texto
+        return
+
+    procesos = procesos or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=procesos,
+                             mp_context=multiprocessing.get_context("spawn")) as ejecutor:
+        paginas = dict(zip(pdfs, ejecutor.map(_contar_paginas, pdfs)))
+        tareas = _tareas(fuentes, paginas, paginas_por_tarea)
+        for (ruta, _, _), paginas_tarea in zip(tareas, ejecutor.map(_extraer_tarea, tareas)):
+            for numero, texto in paginas_tarea:
+                yield ruta, numero, texto
+
+
+def documentos_corpus(fuentes, procesos=None, paginas_por_tarea=8):
+    """
+    Páginas del corpus como Documents con metadata por fuente
+    ("source"/"archivo" y "pagina"), omitiendo las páginas vacías.
+
+    Yields:
+        Document: Una página limpia
+    """
+    for ruta, numero, texto in extraer_paginas(fuentes, procesos, paginas_por_tarea):
+        texto = limpiar_texto(texto)
+        if not texto.strip():
+            continue
+        yield Document(
+            page_content=texto,
+            metadata={"source": ruta.name, "archivo": ruta.name, "pagina": numero}
+        )
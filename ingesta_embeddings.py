@@ -0,0 +1,141 @@
+import time
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LimitadorTasa:
+    """
+    Limitador simple por intervalo mínimo entre llamadas (thread-safe).
+    """
+
+    def __init__(self, llamadas_por_segundo=None):
+        self.intervalo = 1.0 / llamadas_por_segundo if llamadas_por_segundo else 0.0
+        self._siguiente = 0.0
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que se permita la siguiente llamada"""
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            espera = self._siguiente - ahora
+            self._siguiente = max(ahora, self._siguiente) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+def reintentar_con_espera(funcion, reintentos=3, espera_base=1.0, descripcion="operación"):
+    """
+    Ejecuta una función reintentando con espera exponencial si lanza excepción.
+
+    Args:
+        funcion (callable): Función sin argumentos a ejecutar
+        reintentos (int): Número máximo de reintentos tras el primer intento
+        espera_base (float): Segundos de espera antes del primer reintento
+        descripcion (str): Texto para los mensajes de log
+
+    Returns:
+        El valor devuelto por la función
+    """
+    intento = 0
+    while True:
+        try:
+            return funcion()
+        except Exception as e:
+            if intento >= reintentos:
+                raise
+            espera = espera_base * (2 ** intento)
+            print(f"⚠️ Error en {descripcion} (intento {intento + 1}/{reintentos + 1}): {e}. Reintentando en {espera:.1f}s...")
+            time.sleep(espera)
+            intento += 1
+
+
+class IngestorEmbeddings:
+    """
+    Pipeline de ingesta por lotes: genera embeddings con embed_documents en lotes
+    concurrentes (limitados y con reintentos) y entrega cada lote terminado, en orden,
+    a una función de guardado para no acumular todo el corpus en memoria.
+    """
+
+    def __init__(self, vectores, tamano_lote=64, lotes_concurrentes=4,
+                 lotes_por_segundo=None, reintentos=3, espera_base=1.0, progreso=None):
+        """
+        Args:
+            vectores: Objeto de embeddings con método embed_documents(textos)
+            tamano_lote (int): Fragmentos por llamada a embed_documents
+            lotes_concurrentes (int): Máximo de lotes en vuelo a la vez
+            lotes_por_segundo (float): Límite de tasa de llamadas (None = sin límite)
+            reintentos (int): Reintentos por lote ante errores
+            espera_base (float): Espera inicial del backoff exponencial
+            progreso (callable): Función progreso(fragmentos_listos, total)
+        """
+        self.vectores = vectores
+        self.tamano_lote = max(1, int(tamano_lote))
+        self.lotes_concurrentes = max(1, int(lotes_concurrentes))
+        self.limitador = LimitadorTasa(lotes_por_segundo)
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.progreso = progreso or self._progreso_por_defecto
+
+    @staticmethod
+    def _progreso_por_defecto(listos, total):
+        print(f"🧮 Embeddings generados: {listos}/{total if total is not None else '?'}")
+
+    def _embeber_lote(self, textos):
+        """Genera los embeddings de un lote respetando el límite de tasa"""
+        def llamada():
+            self.limitador.esperar()
+            return self.vectores.embed_documents(textos)
+
+        embeddings = reintentar_con_espera(
+            llamada,
+            reintentos=self.reintentos,
+            espera_base=self.espera_base,
+            descripcion=f"lote de {len(textos)} embeddings"
+        )
+        if len(embeddings) != len(textos):
+            raise ValueError(f"Se esperaban {len(textos)} embeddings y se recibieron {len(embeddings)}")
+        return embeddings
+
+    def procesar(self, fragmentos, guardar_lote):
+        """
+        Genera los embeddings de todos los fragmentos y llama a guardar_lote(fragmentos, embeddings)
+        por cada lote terminado, en el mismo orden de entrada.
+
+        Args:
+            fragmentos (iterable[Document]): Fragmentos a procesar; puede ser un generador,
+                que se consume por lotes a medida que avanza la ingesta
+            guardar_lote (callable): Recibe la lista de fragmentos del lote y sus embeddings
+
+        Returns:
+            int: Número de fragmentos procesados
+        """
+        total = len(fragmentos) if hasattr(fragmentos, '__len__') else None
+        iterador = iter(fragmentos)
+        lotes = iter(lambda: list(islice(iterador, self.tamano_lote)), [])
+        listos = 0
+        en_vuelo = deque()
+
+        with ThreadPoolExecutor(max_workers=self.lotes_concurrentes) as ejecutor:
+            for lote in lotes:
+                en_vuelo.append((lote, ejecutor.submit(self._embeber_lote, [f.page_content for f in lote])))
+
+                # Ventana acotada: se consume el lote más antiguo antes de enviar más
+                if len(en_vuelo) >= self.lotes_concurrentes:
+                    listos += self._consumir(en_vuelo.popleft(), guardar_lote)
+                    self.progreso(listos, total)
+
+            while en_vuelo:
+                listos += self._consumir(en_vuelo.popleft(), guardar_lote)
+                self.progreso(listos, total)
+
+        return listos
+
+    @staticmethod
+    def _consumir(pendiente, guardar_lote):
+        lote, futuro = pendiente
+        guardar_lote(lote, futuro.result())
+        return len(lote)
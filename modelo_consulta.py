@@ -3,6 +3,10 @@ import json
 import pickle
 import os
 import io
+import asyncio
+import threading
+import shutil
+import tempfile
 from datetime import datetime
 from openai import OpenAI
 from langchain_community.vectorstores import FAISS
@@ -10,10 +14,150 @@ from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain.chains import RetrievalQA
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate, format_document
+from cache_recuperacion import CacheRecuperacion
+from ensamblador_contexto import EnsambladorContexto
+from indice_bm25 import IndiceBM25, fusion_rrf
+from almacen_compartido import DocstoreCompartido
+from base_vectorial_postgres import BaseVectorialPostgres
+from adaptador_contexto_boliviano import NormalizadorOracion
+from versiones_base import VersionesBase, RecargasBase
+
+# Template del agente con contexto de conversación. La conversación previa se pasa
+# como variable en tiempo de ejecución ({conversacion}) para poder reutilizar la cadena.
+TEMPLATE_AMIGO_LEGAL = """
+# ===== IDENTIDAD DEL AGENTE =====
+Eres "Amigo Legal", un agente especializado en leyes de tránsito bolivianas. Tu función es analizar consultas legales y proporcionar respuestas precisas basadas en tu base de conocimiento RAG.
+# ===== PERSONALIDAD Y COMPORTAMIENTO =====
+- 🗣️ CONVERSACIONAL: Hablas como un amigo cercano que domina leyes 
+- 📱 CHAT-OPTIMIZADO: Respuestas concisas para WhatsApp/Telegram (máximo 150 palabras)
+- 🛡️ PROTECTOR: Tu prioridad es defender los derechos del usuario aunque sea culpable o inocente
+- 📚 PRECISO: Solo usas información verificada del contexto RAG
+- ⚡ EFICIENTE: Detectas automáticamente el tipo de situación
+
+# ===== VARIABLES DE ENTRADA =====
+CONVERSACIÓN PREVIA: {conversacion}
+INFORMACIÓN LEGAL DISPONIBLE: {context}
+CONSULTA ACTUAL: {question}
+
+# ===== PROTOCOLO DE ANÁLISIS AUTOMÁTICO =====
+ANTES de responder, analiza automáticamente basándote en la CONSULTA ACTUAL y CONVERSACIÓN PREVIA:
+1. ¿Es EMERGENCIA ACTIVA? (usuario con policía AHORA, palabras clave: "me paró", "están aquí", "ahora mismo", "urgente")
+2. ¿Es MULTA RECIBIDA? (ya tiene papeleta, palabras clave: "me multaron", "tengo multa", "cuánto pagar")
+3. ¿Es CONSULTA PREVENTIVA? (pregunta general, palabras clave: "puedo", "es legal", "qué pasa si")
+4. ¿Es SEGUIMIENTO? (continúa conversación anterior, CONVERSACIÓN PREVIA no vacía)
+
+# ===== FUENTES DE INFORMACIÓN =====
+- PRIMARIA: INFORMACIÓN LEGAL DISPONIBLE del contexto RAG
+- RESTRICCIÓN: Si contexto no tiene información específica, deriva a SEGIP (800-XX-XXXX)
+
+# ===== FORMATO DE RESPUESTA AUTOMÁTICA =====
+Analiza la situación según las variables de entrada y responde automáticamente con el formato correspondiente:
+
+## 🚨 SI DETECTAS EMERGENCIA ACTIVA:
+**🚨 TU SITUACIÓN LEGAL**
+[Diagnóstico directo basado en INFORMACIÓN LEGAL DISPONIBLE: qué está pasando según la ley]
+
+**🛡️ TUS DERECHOS AHORA**
+• [Derecho principal - Art. X extraído del contexto]
+• [Lo que NO pueden hacer - Art. Z del contexto]
+• ⏰ [Tiempo límite que tienes según contexto]
+
+**💬 DI ESTO EXACTAMENTE**
+"[Frase textual específica para defenderte basada en INFORMACIÓN LEGAL DISPONIBLE]"
+
+**💰 MULTA/CONSECUENCIAS**
+• 💵 Monto: Bs. [cantidad exacta del contexto]
+• 🚗 ¿Retienen vehículo?: [SÍ/NO - cuándo según contexto]
+• 📅 Plazo: [días específicos del contexto]
+
+**⚠️ SI SE PONEN DIFÍCILES**
+📞 Denuncia: [número específico del contexto]
+📖 Ley aplicable: [cita exacta de INFORMACIÓN LEGAL DISPONIBLE]
+---
+
+## 💸 SI DETECTAS MULTA RECIBIDA:
+**📋 TU MULTA - QUÉ DICE LA LEY**
+[Base legal de la infracción según INFORMACIÓN LEGAL DISPONIBLE]
+
+**💰 DETALLES DE TU SANCIÓN**
+• 💵 Monto: Bs. [cantidad específica del contexto]
+• ⏰ Plazo para pagar: [días exactos del contexto]
+• 🏃‍♂️ Descuento pronto pago: [porcentaje si aparece en contexto]
+
+**🏢 DÓNDE PAGAR**
+[Lugares específicos según INFORMACIÓN LEGAL DISPONIBLE]
+
+**⚖️ PUEDES APELAR SI**
+[Condiciones específicas del contexto]
+
+**⚠️ CONSECUENCIAS SI NO PAGAS**
+[Recargos y procedimientos según contexto]
+📖 Base legal: [artículo específico de INFORMACIÓN LEGAL DISPONIBLE]
+---
+
+## ❓ SI DETECTAS CONSULTA PREVENTIVA:
+**📖 QUÉ DICE LA LEY**
+[Explicación directa según INFORMACIÓN LEGAL DISPONIBLE]
+
+**🛡️ TUS DERECHOS**
+• [Derecho 1 - Art. X del contexto]
+• [Derecho 2 - Art. Y del contexto]
+
+**📋 PROCEDIMIENTO CORRECTO**
+1️⃣ [Paso principal según contexto]
+2️⃣ [Dónde consultar/ir según contexto]
+
+**💸 MULTA SI LO HACES MAL**
+💵 Bs. [monto del contexto] - [artículo específico de INFORMACIÓN LEGAL DISPONIBLE]
+
+**💡 CONSEJO PRÁCTICO**
+[Tip útil basado en contexto]
+📚 Referencia legal: [ley específica de INFORMACIÓN LEGAL DISPONIBLE]
+---
+
+## 🔄 SI DETECTAS SEGUIMIENTO (CONVERSACIÓN PREVIA no vacía):
+**🔄 CONTINUANDO TU CONSULTA**
+[Respuesta específica basada en INFORMACIÓN LEGAL DISPONIBLE y CONVERSACIÓN PREVIA]
+
+**ℹ️ INFORMACIÓN ADICIONAL**
+[Datos relevantes del contexto relacionados con la CONVERSACIÓN PREVIA]
+
+**❓ ¿ALGO MÁS SOBRE ESTO?**
+[Pregunta para mantener conversación basada en el hilo previo]
+📖 Ref: [artículo aplicable de INFORMACIÓN LEGAL DISPONIBLE]
+
+# ===== RESTRICCIONES CRÍTICAS =====
+- MÁXIMO 150 palabras por respuesta
+- SOLO información de INFORMACIÓN LEGAL DISPONIBLE (contexto RAG proporcionado)
+- SIEMPRE cita fuente exacta del contexto: "Art. XXX", "Ley XXX", "D.S. XXX"
+- Montos SIEMPRE en "Bs." (bolivianos) como aparecen en el contexto
+- Si INFORMACIÓN LEGAL DISPONIBLE no tiene información específica: "Consulta en SEGIP: 800-XX-XXXX"
+- PROHIBIDO inventar leyes, artículos o montos no presentes en el contexto
+- Lenguaje coloquial boliviano pero profesional
+
+# ===== MANEJO DE ERRORES =====
+Si INFORMACIÓN LEGAL DISPONIBLE está vacía o no contiene información relevante para la CONSULTA ACTUAL:
+"🤷‍♂️ Hermano, esa consulta específica no la tengo en mi base legal actual. 📞 Te recomiendo consultar directamente en SEGIP (800-XX-XXXX) o la oficina de tránsito de tu municipio. ❓ ¿Puedo ayudarte con algo más general sobre tránsito?"
+
+# ===== INSTRUCCIÓN FINAL =====
+Detecta automáticamente el tipo de consulta basándote en:
+1. CONSULTA ACTUAL (palabras clave y contexto)
+2. CONVERSACIÓN PREVIA (si no está vacía, es seguimiento)
+3. INFORMACIÓN LEGAL DISPONIBLE (determina qué responder)
+Responde INMEDIATAMENTE con el formato correspondiente sin explicar por qué elegiste determinado formato.
+"""
+
+# Configuración por defecto del retriever MMR
+CONFIG_RETRIEVER_MMR = {
+    "k": 12,
+    "fetch_k": 20,
+    "lambda_mult": 0.7,
+    "score_threshold": 0.4
+}
 
 class AgenteIA:
-    def __init__(self, gestor_bd):
+    def __init__(self, gestor_bd, normalizador=None, inicializar=True):
         # Configuración API OpenAI
         self.api_key = ""
         self.endpoint = 'https://api.openai.com/v1/chat/completions'
@@ -33,30 +177,75 @@ class AgenteIA:
         # Variables para QA
         self.llm = None
         self.qa = None
-        self.base_conocimiento = None
+        
+        # Base de conocimiento versionada: las consultas fijan la versión vigente y una
+        # recarga publica la nueva de forma atómica sin interrumpirlas
+        self.versiones = VersionesBase()
+        self.recargas = RecargasBase()
+        self.reindexaciones = RecargasBase()
+        self._lock_recarga = threading.Lock()
+        
+        # Registro de cadenas QA ya construidas (template + retriever)
+        self._registro_qa = {}
+        self._lock_registro_qa = threading.Lock()
+        
+        # Caché LRU de búsquedas en FAISS (clave: embedding de la consulta)
+        self.cache_recuperacion = CacheRecuperacion(
+            max_entradas=int(os.getenv('CACHE_RECUPERACION_MAX', '2000'))
+        )
+        
+        # Contexto de la cadena "stuff" limitado por presupuesto de tokens
+        self.ensamblador_contexto = EnsambladorContexto(
+            presupuesto_tokens=int(os.getenv('CONTEXTO_PRESUPUESTO_TOKENS', '2000'))
+        )
+        
+        # Índice léxico BM25 construido junto con FAISS; se fusiona con la búsqueda vectorial (RRF)
+        self.normalizador = normalizador or NormalizadorOracion()
+        self.recuperacion_hibrida = os.getenv('RECUPERACION_HIBRIDA', '1') == '1'
+        # Si el resultado léxico es decisivo se omite el embedding remoto de la consulta
+        self.omitir_embedding_decisivo = os.getenv('BM25_OMITIR_EMBEDDING', '1') == '1'
         
         # Template del prompt con contexto de conversación
         self.template_con_contexto = """
 
         """
 
-        # Inicializar sistema
-        self.inicializar_sistema()
+        # Inicializar sistema (inicializar=False lo deja para un arranque en segundo plano)
+        if inicializar:
+            self.inicializar_sistema()
+    
+    @property
+    def base_conocimiento(self):
+        """Índice FAISS de la versión vigente (None si aún no hay ninguna)"""
+        version = self.versiones.actual
+        return version.base_conocimiento if version else None
+    
+    @property
+    def indice_bm25(self):
+        """Índice BM25 de la versión vigente (None si aún no hay ninguna)"""
+        version = self.versiones.actual
+        return version.indice_bm25 if version else None
     
     def inicializar_sistema(self):
-        """Inicializa el sistema completo de QA"""
+        """
+        Inicializa el sistema completo de QA. La base nueva se construye aparte y se
+        publica al final: mientras tanto las consultas siguen usando la versión anterior,
+        y si la carga falla la versión anterior sigue vigente.
+        """
         try:
-            print("⚡ Inicializando sistema de consultas legales...")
-            
-            # 1. Cargar base de conocimiento
-            print("📚 Cargando base de conocimiento...")
-            self.base_conocimiento = self.gestor_bd.obtener_base_conocimiento()
-            
-            if not self.base_conocimiento:
-                print("❌ Error: No se pudo cargar la base de conocimiento")
-                return False
-            
-            print("✅ Base de conocimiento cargada exitosamente")
+            with self._lock_recarga:
+                print("⚡ Inicializando sistema de consultas legales...")
+                
+                # 1. Cargar base de conocimiento
+                print("📚 Cargando base de conocimiento...")
+                base_conocimiento = self.gestor_bd.obtener_base_conocimiento()
+                
+                if not base_conocimiento:
+                    print("❌ Error: No se pudo cargar la base de conocimiento")
+                    return False
+                
+                print("✅ Base de conocimiento cargada exitosamente")
+                self._publicar_base(base_conocimiento)
             
             # 2. Configurar sistema QA
             print("🔧 Configurando sistema QA...")
@@ -72,6 +261,123 @@ class AgenteIA:
             print(f"❌ Error inicializando sistema: {e}")
             return False
     
+    def iniciar_recarga(self, al_terminar=None):
+        """
+        Recarga completa (inicializar_sistema) en segundo plano.
+        
+        Args:
+            al_terminar (callable): Se llama tras publicar la nueva versión
+            
+        Returns:
+            tuple: (id de la recarga, True si se inició ahora o False si ya había una en curso)
+        """
+        return self.recargas.iniciar(self.inicializar_sistema, al_terminar)
+    
+    def estado_recarga(self, recarga_id):
+        """Estado de una recarga iniciada con iniciar_recarga() (None si no existe)"""
+        return self.recargas.estado(recarga_id)
+    
+    def iniciar_reindexacion(self, al_cambiar=None):
+        """
+        Reindexación incremental (reindexar) en segundo plano.
+        
+        Args:
+            al_cambiar (callable): Se llama si la reindexación agregó o eliminó fragmentos
+            
+        Returns:
+            tuple: (id de la reindexación, True si se inició ahora o False si ya había una en curso)
+        """
+        def tarea():
+            resumen = self.reindexar()
+            if resumen and (resumen["agregados"] or resumen["eliminados"]) and al_cambiar is not None:
+                al_cambiar()
+            return resumen
+        
+        return self.reindexaciones.iniciar(tarea)
+    
+    def estado_reindexacion(self, reindexacion_id):
+        """Estado de una reindexación iniciada con iniciar_reindexacion() (None si no existe)"""
+        return self.reindexaciones.estado(reindexacion_id)
+    
+    def reindexar(self):
+        """
+        Reindexación incremental: solo se embeben los fragmentos nuevos o modificados
+        y el índice FAISS se parchea sobre una copia que se publica como versión nueva.
+        
+        Returns:
+            dict: Resumen (agregados, eliminados, sin_cambios, parcheado) o None si hubo error
+        """
+        try:
+            with self._lock_recarga:
+                actual = self.base_conocimiento
+                base_conocimiento, resumen = self.gestor_bd.reindexar(actual)
+                if base_conocimiento is None:
+                    print("❌ Error: No se pudo reindexar la base de conocimiento")
+                    return None
+                
+                if base_conocimiento is not actual:
+                    self._publicar_base(base_conocimiento)
+            
+            print(f"✅ Reindexación completada: {resumen}")
+            return resumen
+        
+        except Exception as e:
+            print(f"❌ Error reindexando: {e}")
+            return None
+    
+    def _publicar_base(self, base_conocimiento):
+        """Construye el índice BM25 de la base y la publica como versión vigente"""
+        self.versiones.publicar(base_conocimiento, self._crear_indice_lexico(base_conocimiento))
+        # Las cadenas del registro y las búsquedas guardadas apuntan a la versión anterior
+        self.invalidar_cadenas()
+        self.cache_recuperacion.invalidar()
+    
+    def _crear_indice_lexico(self, base):
+        """
+        Índice BM25 con los mismos fragmentos (e ids) que el índice FAISS
+        
+        Returns:
+            IndiceBM25: Índice construido (vacío si la recuperación híbrida está desactivada o falla)
+        """
+        indice = IndiceBM25(self.normalizador)
+        if not self.recuperacion_hibrida:
+            return indice
+        if isinstance(base, BaseVectorialPostgres):
+            # Sin copia local de los fragmentos no hay índice léxico: solo búsqueda vectorial
+            print("ℹ️ Recuperación en PostgreSQL: se omite el índice BM25")
+            return indice
+        try:
+            if isinstance(base.docstore, DocstoreCompartido):
+                return self._indice_lexico_compartido(indice, base.docstore)
+            return indice.construir(
+                base.docstore.search(id_doc) for _, id_doc in sorted(base.index_to_docstore_id.items())
+            )
+        except Exception as e:
+            print(f"⚠️ No se pudo construir el índice BM25, se usará solo búsqueda vectorial: {e}")
+            return IndiceBM25(self.normalizador)
+    
+    def _indice_lexico_compartido(self, indice, docstore):
+        """
+        Índice BM25 guardado junto al snapshot y abierto memory-mapped: el primer worker
+        lo construye y lo publica en el directorio del snapshot; el resto lo abre.
+        Los textos se resuelven desde el docstore compartido.
+        """
+        directorio = docstore.directorio / "bm25"
+        if (directorio / "parametros.json").exists() and indice.abrir(directorio, docstore.documento) is not None:
+            return indice
+        
+        indice.construir((docstore.documento(orden) for orden in range(len(docstore))), resolver=docstore.documento)
+        temporal = tempfile.mkdtemp(prefix=".bm25-", dir=docstore.directorio)
+        try:
+            indice.guardar(temporal)
+            os.replace(temporal, directorio)
+        except OSError:
+            # Otro worker lo publicó primero (o el snapshot es de solo lectura)
+            shutil.rmtree(temporal, ignore_errors=True)
+        if (directorio / "parametros.json").exists():
+            indice.abrir(directorio, docstore.documento)
+        return indice
+    
     def configurar_qa(self):
         """Configura el sistema de preguntas y respuestas"""
         try:
@@ -94,149 +400,25 @@ class AgenteIA:
             print(f"❌ Error configurando QA: {e}")
             return False
     
-    def crear_qa_con_template(self, conversacion=""):
-        """Crea una instancia de QA con un template específico"""
+    def crear_qa_con_template(self, template=TEMPLATE_AMIGO_LEGAL, search_type="mmr", search_kwargs=None):
+        """
+        Crea una instancia de QA con un template específico.
+        Usar obtener_qa() para reutilizar la cadena ya construida.
+        """
         try:
-            # Construir el template sin f-strings para evitar conflictos
-            template_con_contexto = """
-                # ===== IDENTIDAD DEL AGENTE =====
-                Eres "Amigo Legal", un agente especializado en leyes de tránsito bolivianas. Tu función es analizar consultas legales y proporcionar respuestas precisas basadas en tu base de conocimiento RAG.
-                # ===== PERSONALIDAD Y COMPORTAMIENTO =====
-                - 🗣️ CONVERSACIONAL: Hablas como un amigo cercano que domina leyes 
-                - 📱 CHAT-OPTIMIZADO: Respuestas concisas para WhatsApp/Telegram (máximo 150 palabras)
-                - 🛡️ PROTECTOR: Tu prioridad es defender los derechos del usuario aunque sea culpable o inocente
-                - 📚 PRECISO: Solo usas información verificada del contexto RAG
-                - ⚡ EFICIENTE: Detectas automáticamente el tipo de situación
-
-                # ===== VARIABLES DE ENTRADA =====
-                CONVERSACIÓN PREVIA: """ + conversacion + """
-                INFORMACIÓN LEGAL DISPONIBLE: {context}
-                CONSULTA ACTUAL: {question}
-
-                # ===== PROTOCOLO DE ANÁLISIS AUTOMÁTICO =====
-                ANTES de responder, analiza automáticamente basándote en la CONSULTA ACTUAL y CONVERSACIÓN PREVIA:
-                1. ¿Es EMERGENCIA ACTIVA? (usuario con policía AHORA, palabras clave: "me paró", "están aquí", "ahora mismo", "urgente")
-                2. ¿Es MULTA RECIBIDA? (ya tiene papeleta, palabras clave: "me multaron", "tengo multa", "cuánto pagar")
-                3. ¿Es CONSULTA PREVENTIVA? (pregunta general, palabras clave: "puedo", "es legal", "qué pasa si")
-                4. ¿Es SEGUIMIENTO? (continúa conversación anterior, CONVERSACIÓN PREVIA no vacía)
-
-                # ===== FUENTES DE INFORMACIÓN =====
-                - PRIMARIA: INFORMACIÓN LEGAL DISPONIBLE del contexto RAG
-                - RESTRICCIÓN: Si contexto no tiene información específica, deriva a SEGIP (800-XX-XXXX)
-
-                # ===== FORMATO DE RESPUESTA AUTOMÁTICA =====
-                Analiza la situación según las variables de entrada y responde automáticamente con el formato correspondiente:
-                
-                ## 🚨 SI DETECTAS EMERGENCIA ACTIVA:
-                **🚨 TU SITUACIÓN LEGAL**
-                [Diagnóstico directo basado en INFORMACIÓN LEGAL DISPONIBLE: qué está pasando según la ley]
-                
-                **🛡️ TUS DERECHOS AHORA**
-                • [Derecho principal - Art. X extraído del contexto]
-                • [Lo que NO pueden hacer - Art. Z del contexto]
-                • ⏰ [Tiempo límite que tienes según contexto]
-                
-                **💬 DI ESTO EXACTAMENTE**
-                "[Frase textual específica para defenderte basada en INFORMACIÓN LEGAL DISPONIBLE]"
-                
-                **💰 MULTA/CONSECUENCIAS**
-                • 💵 Monto: Bs. [cantidad exacta del contexto]
-                • 🚗 ¿Retienen vehículo?: [SÍ/NO - cuándo según contexto]
-                • 📅 Plazo: [días específicos del contexto]
-                
-                **⚠️ SI SE PONEN DIFÍCILES**
-                📞 Denuncia: [número específico del contexto]
-                📖 Ley aplicable: [cita exacta de INFORMACIÓN LEGAL DISPONIBLE]
-                ---
-                
-                ## 💸 SI DETECTAS MULTA RECIBIDA:
-                **📋 TU MULTA - QUÉ DICE LA LEY**
-                [Base legal de la infracción según INFORMACIÓN LEGAL DISPONIBLE]
-                
-                **💰 DETALLES DE TU SANCIÓN**
-                • 💵 Monto: Bs. [cantidad específica del contexto]
-                • ⏰ Plazo para pagar: [días exactos del contexto]
-                • 🏃‍♂️ Descuento pronto pago: [porcentaje si aparece en contexto]
-                
-                **🏢 DÓNDE PAGAR**
-                [Lugares específicos según INFORMACIÓN LEGAL DISPONIBLE]
-                
-                **⚖️ PUEDES APELAR SI**
-                [Condiciones específicas del contexto]
-                
-                **⚠️ CONSECUENCIAS SI NO PAGAS**
-                [Recargos y procedimientos según contexto]
-                📖 Base legal: [artículo específico de INFORMACIÓN LEGAL DISPONIBLE]
-                ---
-                
-                ## ❓ SI DETECTAS CONSULTA PREVENTIVA:
-                **📖 QUÉ DICE LA LEY**
-                [Explicación directa según INFORMACIÓN LEGAL DISPONIBLE]
-                
-                **🛡️ TUS DERECHOS**
-                • [Derecho 1 - Art. X del contexto]
-                • [Derecho 2 - Art. Y del contexto]
-                
-                **📋 PROCEDIMIENTO CORRECTO**
-                1️⃣ [Paso principal según contexto]
-                2️⃣ [Dónde consultar/ir según contexto]
-                
-                **💸 MULTA SI LO HACES MAL**
-                💵 Bs. [monto del contexto] - [artículo específico de INFORMACIÓN LEGAL DISPONIBLE]
-                
-                **💡 CONSEJO PRÁCTICO**
-                [Tip útil basado en contexto]
-                📚 Referencia legal: [ley específica de INFORMACIÓN LEGAL DISPONIBLE]
-                ---
-                
-                ## 🔄 SI DETECTAS SEGUIMIENTO (CONVERSACIÓN PREVIA no vacía):
-                **🔄 CONTINUANDO TU CONSULTA**
-                [Respuesta específica basada en INFORMACIÓN LEGAL DISPONIBLE y CONVERSACIÓN PREVIA]
-                
-                **ℹ️ INFORMACIÓN ADICIONAL**
-                [Datos relevantes del contexto relacionados con la CONVERSACIÓN PREVIA]
-                
-                **❓ ¿ALGO MÁS SOBRE ESTO?**
-                [Pregunta para mantener conversación basada en el hilo previo]
-                📖 Ref: [artículo aplicable de INFORMACIÓN LEGAL DISPONIBLE]
-                
-                # ===== RESTRICCIONES CRÍTICAS =====
-                - MÁXIMO 150 palabras por respuesta
-                - SOLO información de INFORMACIÓN LEGAL DISPONIBLE (contexto RAG proporcionado)
-                - SIEMPRE cita fuente exacta del contexto: "Art. XXX", "Ley XXX", "D.S. XXX"
-                - Montos SIEMPRE en "Bs." (bolivianos) como aparecen en el contexto
-                - Si INFORMACIÓN LEGAL DISPONIBLE no tiene información específica: "Consulta en SEGIP: 800-XX-XXXX"
-                - PROHIBIDO inventar leyes, artículos o montos no presentes en el contexto
-                - Lenguaje coloquial boliviano pero profesional
-                
-                # ===== MANEJO DE ERRORES =====
-                Si INFORMACIÓN LEGAL DISPONIBLE está vacía o no contiene información relevante para la CONSULTA ACTUAL:
-                "🤷‍♂️ Hermano, esa consulta específica no la tengo en mi base legal actual. 📞 Te recomiendo consultar directamente en SEGIP (800-XX-XXXX) o la oficina de tránsito de tu municipio. ❓ ¿Puedo ayudarte con algo más general sobre tránsito?"
-                
-                # ===== INSTRUCCIÓN FINAL =====
-                Detecta automáticamente el tipo de consulta basándote en:
-                1. CONSULTA ACTUAL (palabras clave y contexto)
-                2. CONVERSACIÓN PREVIA (si no está vacía, es seguimiento)
-                3. INFORMACIÓN LEGAL DISPONIBLE (determina qué responder)
-                Responde INMEDIATAMENTE con el formato correspondiente sin explicar por qué elegiste determinado formato.
-            """
+            search_kwargs = search_kwargs or CONFIG_RETRIEVER_MMR
 
             prompt = PromptTemplate(
-                template=template_con_contexto,
-                input_variables=["context", "question"]
+                template=template,
+                input_variables=["context", "question", "conversacion"]
             )
             
             qa = RetrievalQA.from_chain_type(
                 llm=self.llm,
                 chain_type="stuff",
                 retriever=self.base_conocimiento.as_retriever(
-                    search_type="mmr",   
-                    search_kwargs={
-                        "k": 12,                    
-                        "fetch_k": 20,              
-                        "lambda_mult": 0.7,        
-                        "score_threshold": 0.4      
-                    }
+                    search_type=search_type,
+                    search_kwargs=dict(search_kwargs)
                 ),
                 return_source_documents=True,
                 chain_type_kwargs={
@@ -250,99 +432,465 @@ class AgenteIA:
             print(f"❌ Error creando QA: {e}")
             return None
 
-    def procesar_consulta_con_contexto(self, pregunta, conversacion=""):
+    def obtener_qa(self, template=TEMPLATE_AMIGO_LEGAL, search_type="mmr", search_kwargs=None):
+        """
+        Devuelve la cadena QA del registro, construyéndola solo la primera vez
+        para cada combinación de template y configuración del retriever.
+        """
+        search_kwargs = search_kwargs or CONFIG_RETRIEVER_MMR
+        clave = (template, search_type, tuple(sorted(search_kwargs.items())))
+
+        qa = self._registro_qa.get(clave)
+        if qa is not None:
+            return qa
+
+        with self._lock_registro_qa:
+            qa = self._registro_qa.get(clave)
+            if qa is None:
+                qa = self.crear_qa_con_template(template, search_type, search_kwargs)
+                if qa is not None:
+                    self._registro_qa[clave] = qa
+                    print(f"🧩 Cadena QA registrada ({len(self._registro_qa)} en registro)")
+            return qa
+
+    def invalidar_cadenas(self):
+        """Vacía el registro de cadenas QA (se reconstruyen en la próxima consulta)"""
+        with self._lock_registro_qa:
+            self._registro_qa = {}
+        print("🧹 Registro de cadenas QA invalidado")
+
+    def _buscar_por_vector(self, version, vector, search_type="mmr", search_kwargs=None):
+        """
+        Busca en el FAISS de una versión fijada (MMR o similitud) pasando por la caché de recuperación.
+        
+        Returns:
+            list: [(Document, score)] con score = distancia L2 (menor es más cercano)
+        """
+        search_kwargs = search_kwargs or CONFIG_RETRIEVER_MMR
+        clave = self.cache_recuperacion.clave(vector, search_type, search_kwargs, version.numero)
+        resultados = self.cache_recuperacion.obtener(clave)
+        if resultados is not None:
+            return resultados
+        
+        vector = [float(v) for v in vector]
+        if search_type == "mmr":
+            resultados = version.base_conocimiento.max_marginal_relevance_search_with_score_by_vector(
+                vector,
+                k=search_kwargs.get("k", 4),
+                fetch_k=search_kwargs.get("fetch_k", 20),
+                lambda_mult=search_kwargs.get("lambda_mult", 0.5)
+            )
+        else:
+            resultados = version.base_conocimiento.similarity_search_with_score_by_vector(
+                vector, k=search_kwargs.get("k", 4)
+            )
+        resultados = [(documento, float(score)) for documento, score in resultados]
+        self.cache_recuperacion.guardar(clave, resultados)
+        return resultados
+
+    @staticmethod
+    def _formato_recuperacion(resultados):
+        return [
+            {"id": documento.id, "score": round(score, 6), "metadata": documento.metadata}
+            for documento, score in resultados
+        ]
+
+    def recuperar(self, consulta, search_type="mmr", search_kwargs=None, embedding_consulta=None):
+        """
+        Solo la etapa de recuperación, sin llamar al LLM.
+        
+        Args:
+            consulta (str): Texto a buscar (se ignora si se pasa embedding_consulta)
+            search_type (str): "mmr" o "similarity"
+            search_kwargs (dict): k, fetch_k, lambda_mult (por defecto CONFIG_RETRIEVER_MMR)
+            embedding_consulta (list): Embedding ya calculado (opcional)
+            
+        Returns:
+            list: {"id", "score", "metadata"} por fragmento, en orden de recuperación
+        """
+        if embedding_consulta is None:
+            embedding_consulta = self.gestor_bd.obtener_embeddings().embed_query(consulta)
+        with self.versiones.usar() as version:
+            return self._formato_recuperacion(
+                self._buscar_por_vector(version, embedding_consulta, search_type, search_kwargs)
+            )
+
+    async def arecuperar(self, consulta, search_type="mmr", search_kwargs=None, embedding_consulta=None):
+        """Versión asíncrona de recuperar() (embedding con aembed_query)"""
+        if embedding_consulta is None:
+            embedding_consulta = await self.gestor_bd.obtener_embeddings().aembed_query(consulta)
+        with self.versiones.usar() as version:
+            resultados = await asyncio.to_thread(
+                self._buscar_por_vector, version, embedding_consulta, search_type, search_kwargs
+            )
+        return self._formato_recuperacion(resultados)
+
+    def _buscar_lexico(self, version, consulta, k):
+        """
+        Búsqueda BM25 de la etapa híbrida.
+        
+        Returns:
+            tuple: (Documents léxicos en orden, True si se puede omitir la búsqueda vectorial)
+        """
+        if not self.recuperacion_hibrida:
+            return [], False
+        resultados, decisivo = version.indice_bm25.buscar(consulta, k)
+        return [documento for documento, _ in resultados], decisivo and self.omitir_embedding_decisivo
+
+    def consulta_lexica_decisiva(self, consulta, search_kwargs=None):
+        """
+        Comprueba con BM25, antes de calcular ningún embedding (caché semántica o
+        recuperación), si la consulta tiene un resultado léxico decisivo.
+
+        Returns:
+            bool: True si la recuperación no necesitará la búsqueda vectorial
+        """
+        if not (self.recuperacion_hibrida and self.omitir_embedding_decisivo):
+            return False
+        k = (search_kwargs or CONFIG_RETRIEVER_MMR).get("k", 4)
+        try:
+            with self.versiones.usar() as version:
+                return self._buscar_lexico(version, consulta, k)[1]
+        except RuntimeError:
+            return False
+
+    @staticmethod
+    def _fusionar(vectoriales, lexicos, k):
+        if not lexicos:
+            return vectoriales
+        return [documento for documento, _ in fusion_rrf([vectoriales, lexicos], k=k)]
+
+    def _recuperar_documentos(self, qa, consulta, embedding_consulta=None, consulta_lexica=None):
+        """
+        Recuperación híbrida: BM25 sobre consulta_lexica (o la consulta) fusionado por RRF
+        con la búsqueda vectorial del retriever de la cadena, ajustado al presupuesto de
+        tokens. Si el resultado léxico es decisivo se omite la búsqueda vectorial (y el
+        embedding de la consulta). Si se recibe el embedding (p. ej. de la caché semántica)
+        no se vuelve a embeber.
+        
+        Returns:
+            tuple: (documentos del contexto, dict de uso de tokens del contexto)
+        """
+        k = qa.retriever.search_kwargs.get("k", 4)
+        # La versión queda fijada hasta terminar la recuperación aunque se publique otra
+        with self.versiones.usar() as version:
+            lexicos, decisivo = self._buscar_lexico(version, consulta_lexica or consulta, k)
+            if decisivo:
+                print("🔤 Resultado léxico decisivo: se omite la búsqueda vectorial")
+                return self.ensamblador_contexto.ensamblar(lexicos)
+            
+            if embedding_consulta is None:
+                embedding_consulta = self.gestor_bd.obtener_embeddings().embed_query(consulta)
+            resultados = self._buscar_por_vector(
+                version, embedding_consulta, qa.retriever.search_type, qa.retriever.search_kwargs
+            )
+        return self.ensamblador_contexto.ensamblar(
+            self._fusionar([documento for documento, _ in resultados], lexicos, k)
+        )
+
+    async def _arecuperar_documentos(self, qa, consulta, embedding_consulta=None, consulta_lexica=None):
+        """Versión asíncrona de _recuperar_documentos"""
+        k = qa.retriever.search_kwargs.get("k", 4)
+        with self.versiones.usar() as version:
+            lexicos, decisivo = await asyncio.to_thread(self._buscar_lexico, version, consulta_lexica or consulta, k)
+            if decisivo:
+                print("🔤 Resultado léxico decisivo: se omite la búsqueda vectorial")
+                return self.ensamblador_contexto.ensamblar(lexicos)
+            
+            if embedding_consulta is None:
+                embedding_consulta = await self.gestor_bd.obtener_embeddings().aembed_query(consulta)
+            resultados = await asyncio.to_thread(
+                self._buscar_por_vector, version, embedding_consulta, qa.retriever.search_type, qa.retriever.search_kwargs
+            )
+        return self.ensamblador_contexto.ensamblar(
+            self._fusionar([documento for documento, _ in resultados], lexicos, k)
+        )
+
+    def _llm_con_limite(self, max_tokens=None):
+        """LLM configurado o, con max_tokens, el mismo LLM con otro límite de respuesta"""
+        return self.llm if max_tokens is None else self.llm.bind(max_tokens=max_tokens)
+
+    def _ejecutar_qa(self, qa, consulta, conversacion="", embedding_consulta=None, consulta_lexica=None,
+                     max_tokens=None):
+        """
+        Ejecuta una cadena QA del registro: arma el prompt "stuff" con el contexto
+        ajustado al presupuesto de tokens, pasando la conversación como variable del prompt.
+        """
+        documentos, uso = self._recuperar_documentos(qa, consulta, embedding_consulta, consulta_lexica)
+        prompt = self._prompt_para_documentos(qa, documentos, consulta, conversacion)
+        salida = self._llm_con_limite(max_tokens).invoke(prompt)
+        return {
+            "result": salida.content,
+            "source_documents": documentos,
+            "uso_tokens": self.ensamblador_contexto.registrar(uso, prompt, salida)
+        }
+
+    async def _aejecutar_qa(self, qa, consulta, conversacion="", embedding_consulta=None, consulta_lexica=None,
+                            max_tokens=None):
+        """Versión asíncrona de _ejecutar_qa (embeddings y LLM con el cliente async)"""
+        documentos, uso = await self._arecuperar_documentos(qa, consulta, embedding_consulta, consulta_lexica)
+        prompt = self._prompt_para_documentos(qa, documentos, consulta, conversacion)
+        salida = await self._llm_con_limite(max_tokens).ainvoke(prompt)
+        return {
+            "result": salida.content,
+            "source_documents": documentos,
+            "uso_tokens": self.ensamblador_contexto.registrar(uso, prompt, salida)
+        }
+
+    def _ejecutar_directo(self, consulta, max_tokens=None):
+        """Llama al LLM con la consulta tal cual, sin embedding ni recuperación de contexto"""
+        salida = self._llm_con_limite(max_tokens).invoke(consulta)
+        return {
+            "result": salida.content,
+            "source_documents": [],
+            "uso_tokens": self.ensamblador_contexto.registrar({}, consulta, salida)
+        }
+
+    async def _aejecutar_directo(self, consulta, max_tokens=None):
+        salida = await self._llm_con_limite(max_tokens).ainvoke(consulta)
+        return {
+            "result": salida.content,
+            "source_documents": [],
+            "uso_tokens": self.ensamblador_contexto.registrar({}, consulta, salida)
+        }
+
+    def _preparar_consulta(self, pregunta, conversacion="", usar_recuperacion=True):
+        """
+        Valida el sistema y la entrada, y arma la consulta para la cadena QA.
+        Con usar_recuperacion=False no se necesita la cadena QA (qa es None).
+        
+        Returns:
+            tuple: (error, qa, consulta_completa). Si error no es None, es la respuesta a devolver
+        """
+        # Verificar que el sistema esté listo
+        if self.llm is None:
+            print("⚠️ Sistema LLM no configurado, intentando reconfigurar...")
+            if not self.configurar_qa():
+                return {
+                    "estado": "error",
+                    "mensaje": "No se pudo configurar el sistema LLM",
+                    "data": None
+                }, None, None
+        
+        # Validar entrada
+        if not pregunta or not pregunta.strip():
+            return {
+                "estado": "error",
+                "mensaje": "La pregunta no puede estar vacía",
+                "data": None
+            }, None, None
+        
+        print(f"🔍 Procesando consulta con contexto: {pregunta[:50]}...")
+        
+        # Obtener QA del registro (se construye solo la primera vez)
+        qa = self.obtener_qa() if usar_recuperacion else None
+        
+        if qa is None and usar_recuperacion:
+            return {
+                "estado": "error",
+                "mensaje": "Error configurando el sistema de consultas",
+                "data": None
+            }, None, None
+        
+        # Construir consulta - conversación siempre opcional
+        if conversacion and conversacion.strip():
+            # CON contexto previo
+            consulta_completa = f"CONVERSACIÓN PREVIA:\n{conversacion}\n\nCONSULTA ACTUAL:\n{pregunta}"
+            print(f"📝 Procesando CON contexto previo")
+        else:
+            # SIN contexto previo
+            consulta_completa = f"CONSULTA:\n{pregunta}"
+            print(f"🆕 Procesando SIN contexto previo")
+        
+        return None, qa, consulta_completa
+
+    @staticmethod
+    def _respuesta_exitosa(resultado):
+        respuesta = resultado.get('result', '')
+        documentos = resultado.get('source_documents', [])
+        
+        print(f"✅ Consulta procesada - {len(documentos)} documentos encontrados")
+        
+        return {
+            "estado": "success",
+            "mensaje": "Consulta procesada correctamente",
+            "data": respuesta,
+            "uso_tokens": resultado.get('uso_tokens')
+        }
+
+    @staticmethod
+    def _respuesta_error(e):
+        print(f"❌ Error procesando consulta: {e}")
+        return {
+            "estado": "error",
+            "mensaje": "Error interno del servidor",
+            "data": None,
+            "error_details": str(e)
+        }
+
+    def procesar_consulta_con_contexto(self, pregunta, conversacion="", embedding_consulta=None, usar_recuperacion=True,
+                                       consulta_lexica=None, max_tokens=None):
         """
         Procesa una consulta considerando el contexto de conversación previa
         
         Args:
             pregunta (str): La pregunta actual del usuario
             conversacion (str): El historial de conversación previa
+            embedding_consulta (list): Embedding ya calculado para la recuperación (opcional)
+            usar_recuperacion (bool): False para prompts autocontenidos que no necesitan contexto RAG
+            consulta_lexica (str): Texto para la búsqueda BM25 (p. ej. solo la pregunta, sin el template)
+            max_tokens (int): Límite de tokens de la respuesta para esta consulta (None = el del LLM)
             
         Returns:
             dict: Respuesta con estado, mensaje y data
         """
         try:
-            # Verificar que el sistema esté listo
-            if self.llm is None:
-                print("⚠️ Sistema LLM no configurado, intentando reconfigurar...")
-                if not self.configurar_qa():
-                    return {
-                        "estado": "error",
-                        "mensaje": "No se pudo configurar el sistema LLM",
-                        "data": None
-                    }
+            error, qa, consulta_completa = self._preparar_consulta(pregunta, conversacion, usar_recuperacion)
+            if error:
+                return error
             
-            # Validar entrada
-            if not pregunta or not pregunta.strip():
-                return {
-                    "estado": "error",
-                    "mensaje": "La pregunta no puede estar vacía",
-                    "data": None
-                }
+            if usar_recuperacion:
+                resultado = self._ejecutar_qa(
+                    qa, consulta_completa, conversacion, embedding_consulta, consulta_lexica, max_tokens
+                )
+            else:
+                resultado = self._ejecutar_directo(consulta_completa, max_tokens)
+            return self._respuesta_exitosa(resultado)
+            
+        except Exception as e:
+            return self._respuesta_error(e)
+    
+    async def aprocesar_consulta_con_contexto(self, pregunta, conversacion="", embedding_consulta=None, usar_recuperacion=True,
+                                              consulta_lexica=None, max_tokens=None):
+        """
+        Versión asíncrona de procesar_consulta_con_contexto: usa ainvoke, de modo que
+        muchas llamadas al LLM pueden estar en vuelo en un mismo proceso.
+        
+        Returns:
+            dict: Respuesta con estado, mensaje y data
+        """
+        try:
+            error, qa, consulta_completa = self._preparar_consulta(pregunta, conversacion, usar_recuperacion)
+            if error:
+                return error
             
-            print(f"🔍 Procesando consulta con contexto: {pregunta[:50]}...")
+            if usar_recuperacion:
+                resultado = await self._aejecutar_qa(
+                    qa, consulta_completa, conversacion, embedding_consulta, consulta_lexica, max_tokens
+                )
+            else:
+                resultado = await self._aejecutar_directo(consulta_completa, max_tokens)
+            return self._respuesta_exitosa(resultado)
             
-            # Decidir qué template usar
-            usar_contexto = conversacion and conversacion.strip()
-            # template = self.template_con_contexto if usar_contexto else self.template_simple
-            template = self.template_con_contexto
+        except Exception as e:
+            return self._respuesta_error(e)
+    
+    def _prompt_para_documentos(self, qa, documentos, consulta, conversacion=""):
+        """Arma el prompt final de la cadena "stuff" con los documentos recuperados"""
+        cadena_stuff = qa.combine_documents_chain
+        contexto = cadena_stuff.document_separator.join(
+            format_document(documento, cadena_stuff.document_prompt) for documento in documentos
+        )
+        prompt = cadena_stuff.llm_chain.prompt
+        entradas = {
+            cadena_stuff.document_variable_name: contexto,
+            "question": consulta,
+            "conversacion": conversacion or ""
+        }
+        return prompt.format(**{k: v for k, v in entradas.items() if k in prompt.input_variables})
 
+    def transmitir_consulta(self, pregunta, conversacion="", embedding_consulta=None, consulta_lexica=None):
+        """
+        Procesa una consulta emitiendo los tokens del LLM a medida que llegan.
+        
+        Yields:
+            dict: {"token": str} por cada fragmento y, al final, la respuesta
+                  completa con el mismo formato que procesar_consulta_con_contexto
+        """
+        try:
+            error, qa, consulta_completa = self._preparar_consulta(pregunta, conversacion)
+            if error:
+                yield error
+                return
             
-            # Crear QA con el template apropiado
-            qa = self.crear_qa_con_template(conversacion)
+            documentos, uso = self._recuperar_documentos(qa, consulta_completa, embedding_consulta, consulta_lexica)
+            prompt = self._prompt_para_documentos(qa, documentos, consulta_completa, conversacion)
             
-            if qa is None:
-                return {
-                    "estado": "error",
-                    "mensaje": "Error configurando el sistema de consultas",
-                    "data": None
-                }
+            partes = []
+            for fragmento in self.llm.stream(prompt):
+                if fragmento.content:
+                    partes.append(fragmento.content)
+                    yield {"token": fragmento.content}
             
-            # Construir consulta - conversación siempre opcional
-            if conversacion and conversacion.strip():
-                # CON contexto previo
-                consulta_completa = f"CONVERSACIÓN PREVIA:\n{conversacion}\n\nCONSULTA ACTUAL:\n{pregunta}"
-                print(f"📝 Procesando CON contexto previo")
-            else:
-                # SIN contexto previo
-                consulta_completa = f"CONSULTA:\n{pregunta}"
-                print(f"🆕 Procesando SIN contexto previo")
+            respuesta = "".join(partes)
+            yield self._respuesta_exitosa({
+                "result": respuesta,
+                "source_documents": documentos,
+                "uso_tokens": self.ensamblador_contexto.registrar(uso, prompt, respuesta)
+            })
+        
+        except Exception as e:
+            yield self._respuesta_error(e)
 
-            # Ejecutar consulta (siempre igual)
-            resultado = qa.invoke({"query": consulta_completa})
-            
-            respuesta = resultado.get('result', '')
-            documentos = resultado.get('source_documents', [])
+    async def atransmitir_consulta(self, pregunta, conversacion="", embedding_consulta=None, consulta_lexica=None):
+        """Versión asíncrona de transmitir_consulta (usa astream)"""
+        try:
+            error, qa, consulta_completa = self._preparar_consulta(pregunta, conversacion)
+            if error:
+                yield error
+                return
             
-            print(f"✅ Consulta procesada - {len(documentos)} documentos encontrados")
+            documentos, uso = await self._arecuperar_documentos(qa, consulta_completa, embedding_consulta, consulta_lexica)
+            prompt = self._prompt_para_documentos(qa, documentos, consulta_completa, conversacion)
             
-            return {
-                "estado": "success",
-                "mensaje": "Consulta procesada correctamente",
-                "data": respuesta,
-            }
+            partes = []
+            async for fragmento in self.llm.astream(prompt):
+                if fragmento.content:
+                    partes.append(fragmento.content)
+                    yield {"token": fragmento.content}
             
+            respuesta = "".join(partes)
+            yield self._respuesta_exitosa({
+                "result": respuesta,
+                "source_documents": documentos,
+                "uso_tokens": self.ensamblador_contexto.registrar(uso, prompt, respuesta)
+            })
+        
         except Exception as e:
-            print(f"❌ Error procesando consulta: {e}")
-            return {
-                "estado": "error",
-                "mensaje": "Error interno del servidor",
-                "data": None,
-                "error_details": str(e)
-            }
-    
-    def consultar_con_contexto(self, pregunta, conversacion=""):
+            yield self._respuesta_error(e)
+
+    def consultar_con_contexto(self, pregunta, conversacion="", usar_recuperacion=True, max_tokens=None):
         """
         Método simplificado para consultas con contexto
         
         Args:
             pregunta (str): La pregunta del usuario
             conversacion (str): El historial de conversación
+            usar_recuperacion (bool): False para omitir embedding y búsqueda en FAISS
+            max_tokens (int): Límite de tokens de la respuesta (None = el del LLM)
             
         Returns:
             str: Respuesta directa o mensaje de error
         """
-        resultado = self.procesar_consulta_con_contexto(pregunta, conversacion)
+        resultado = self.procesar_consulta_con_contexto(
+            pregunta, conversacion, usar_recuperacion=usar_recuperacion, max_tokens=max_tokens
+        )
+        
+        if resultado["estado"] == "success":
+            return resultado["data"]
+        else:
+            return f"❌ Error: {resultado['mensaje']}"
+
+    async def aconsultar_con_contexto(self, pregunta, conversacion="", usar_recuperacion=True, max_tokens=None):
+        """
+        Versión asíncrona de consultar_con_contexto
+        
+        Returns:
+            str: Respuesta directa o mensaje de error
+        """
+        resultado = await self.aprocesar_consulta_con_contexto(
+            pregunta, conversacion, usar_recuperacion=usar_recuperacion, max_tokens=max_tokens
+        )
         
         if resultado["estado"] == "success":
             return resultado["data"]
@@ -360,6 +908,13 @@ class AgenteIA:
         
         return {
             "base_datos": estado_bd,
+            "pool_conexiones": self.gestor_bd.estadisticas_pool(),
+            "cache_recuperacion": self.cache_recuperacion.estadisticas(),
+            "cache_embeddings": self.gestor_bd.estadisticas_cache_embeddings(),
+            "uso_tokens": self.ensamblador_contexto.estadisticas(),
+            "indice_bm25": self.indice_bm25.estadisticas() if self.indice_bm25 else None,
+            "versiones_base": self.versiones.estadisticas(),
+            "indice_faiss": self.gestor_bd.estadisticas_indice(self.base_conocimiento),
             "base_conocimiento_cargada": self.base_conocimiento is not None,
             "llm_configurado": self.llm is not None,
             "sistema_listo": all([
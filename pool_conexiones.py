@@ -0,0 +1,160 @@
+import time
+import threading
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones PostgreSQL thread-safe con verificación de salud y estadísticas.
+    Cuando todas las conexiones están en uso, las peticiones esperan (con timeout)
+    en lugar de fallar inmediatamente.
+    """
+
+    def __init__(self, configuracion_bd, minimo=1, maximo=10, timeout_espera=10.0, verificar_tras=30.0):
+        """
+        Args:
+            configuracion_bd (dict): Parámetros de psycopg2.connect
+            minimo (int): Conexiones abiertas al crear el pool
+            maximo (int): Máximo de conexiones simultáneas
+            timeout_espera (float): Segundos máximos esperando una conexión libre
+            verificar_tras (float): Segundos de inactividad tras los que se hace SELECT 1 antes de entregar
+        """
+        self.configuracion_bd = dict(configuracion_bd)
+        # La codificación se fija una sola vez al abrir cada conexión
+        self.configuracion_bd.pop('client_encoding', None)
+        self.configuracion_bd['options'] = '-c client_encoding=UTF8'
+
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout_espera = timeout_espera
+        self.verificar_tras = verificar_tras
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._disponibles = threading.BoundedSemaphore(maximo)
+        self._ultimo_uso = {}
+
+        self._estadisticas = {
+            "prestamos_total": 0,
+            "en_uso": 0,
+            "descartadas": 0,
+            "esperas_agotadas": 0,
+            "errores_conexion": 0
+        }
+
+    def _obtener_pool(self):
+        """Crea el pool la primera vez que se necesita"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadedConnectionPool(self.minimo, self.maximo, **self.configuracion_bd)
+                    print(f"🏊 Pool PostgreSQL creado (min={self.minimo}, max={self.maximo})")
+        return self._pool
+
+    def _es_saludable(self, conn):
+        """Comprueba que la conexión siga viva (SELECT 1 solo si estuvo inactiva un tiempo)"""
+        if conn.closed:
+            return False
+        inactiva = time.monotonic() - self._ultimo_uso.get(id(conn), 0.0)
+        if inactiva < self.verificar_tras:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _tomar(self):
+        pool = self._obtener_pool()
+        for _ in range(self.maximo + 1):
+            conn = pool.getconn()
+            if self._es_saludable(conn):
+                return conn
+            # Conexión rota: se descarta y el pool abre otra
+            pool.putconn(conn, close=True)
+            self._ultimo_uso.pop(id(conn), None)
+            with self._lock:
+                self._estadisticas["descartadas"] += 1
+        raise psycopg2.OperationalError("No se pudo obtener una conexión saludable del pool")
+
+    def _devolver(self, conn):
+        # No devolver conexiones con transacciones abiertas
+        if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+        self._ultimo_uso[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=bool(conn.closed))
+
+    @contextmanager
+    def conexion(self):
+        """
+        Presta una conexión del pool. Si el bloque lanza una excepción se hace rollback.
+
+        Uso:
+            with pool.conexion() as conn:
+                cursor = conn.cursor()
+                ...
+                conn.commit()
+        """
+        if not self._disponibles.acquire(timeout=self.timeout_espera):
+            with self._lock:
+                self._estadisticas["esperas_agotadas"] += 1
+            raise psycopg2.OperationalError(
+                f"Pool PostgreSQL agotado: sin conexión libre tras {self.timeout_espera}s"
+            )
+
+        try:
+            try:
+                conn = self._tomar()
+            except Exception:
+                with self._lock:
+                    self._estadisticas["errores_conexion"] += 1
+                raise
+
+            with self._lock:
+                self._estadisticas["prestamos_total"] += 1
+                self._estadisticas["en_uso"] += 1
+            try:
+                yield conn
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                with self._lock:
+                    self._estadisticas["en_uso"] -= 1
+                self._devolver(conn)
+        finally:
+            self._disponibles.release()
+
+    def estadisticas(self):
+        """
+        Devuelve las estadísticas del pool
+
+        Returns:
+            dict: Configuración, conexiones en uso y contadores
+        """
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+        estadisticas.update({
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "inicializado": self._pool is not None,
+            "abiertas": len(self._pool._pool) + len(self._pool._used) if self._pool else 0
+        })
+        return estadisticas
+
+    def cerrar(self):
+        """Cierra todas las conexiones del pool"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._ultimo_uso.clear()
@@ -0,0 +1,149 @@
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ProcesadorLotes:
+    """
+    Procesa muchos perfiles contra el LLM en una sola petición:
+    valida todos los campos requeridos antes de llamar al modelo, reparte las
+    llamadas con concurrencia acotada y devuelve un resultado o error por elemento.
+    Opcionalmente agrupa varios perfiles en un mismo prompt.
+    """
+
+    def __init__(self, campos_requeridos, armar_prompt, parsear_salida,
+                 armar_prompt_agrupado=None, concurrencia=8, max_elementos=500):
+        """
+        Args:
+            campos_requeridos (list): Campos que debe tener cada elemento
+            armar_prompt (callable): datos -> prompt de un solo elemento
+            parsear_salida (callable): salida del LLM -> dict
+            armar_prompt_agrupado (callable): lista de datos -> prompt con varios elementos
+            concurrencia (int): Máximo de llamadas simultáneas al LLM
+            max_elementos (int): Tamaño máximo del lote
+        """
+        self.campos_requeridos = campos_requeridos
+        self.armar_prompt = armar_prompt
+        self.parsear_salida = parsear_salida
+        self.armar_prompt_agrupado = armar_prompt_agrupado
+        self.concurrencia = concurrencia
+        self.max_elementos = max_elementos
+
+    def validar(self, elementos):
+        """
+        Valida todos los elementos antes de llamar al LLM.
+
+        Returns:
+            tuple: (validos, errores) donde validos es una lista de (indice, datos)
+                   y errores un dict indice -> mensaje
+        """
+        validos, errores = [], {}
+        for indice, datos in enumerate(elementos):
+            if not isinstance(datos, dict):
+                errores[indice] = "El elemento debe ser un objeto JSON"
+                continue
+            faltantes = [campo for campo in self.campos_requeridos if campo not in datos]
+            if faltantes:
+                errores[indice] = f"Faltan campos requeridos: {', '.join(faltantes)}"
+            else:
+                validos.append((indice, datos))
+        return validos, errores
+
+    @staticmethod
+    def _agrupar(validos, por_prompt):
+        por_prompt = max(1, int(por_prompt or 1))
+        return [validos[i:i + por_prompt] for i in range(0, len(validos), por_prompt)]
+
+    def _parsear_grupo(self, grupo, salida):
+        """
+        Interpreta la salida de un prompt agrupado (lista JSON en el mismo orden).
+        Returns None si no coincide con el grupo, para reintentar uno por uno.
+        """
+        try:
+            resultados = json.loads(salida)
+        except Exception:
+            return None
+        if not isinstance(resultados, list) or len(resultados) != len(grupo):
+            return None
+        return [(indice, {"indice": indice, "estado": "success", "data": resultado})
+                for (indice, _), resultado in zip(grupo, resultados)]
+
+    def _resultado_individual(self, indice, salida):
+        if salida.startswith("Error:") or salida.startswith("❌ Error"):
+            return indice, {"indice": indice, "estado": "error", "mensaje": salida}
+        return indice, {"indice": indice, "estado": "success", "data": self.parsear_salida(salida)}
+
+    def _procesar_grupo(self, grupo, llamar, llamar_agrupado=None):
+        if len(grupo) > 1 and self.armar_prompt_agrupado:
+            prompt = self.armar_prompt_agrupado([d for _, d in grupo])
+            salida = llamar_agrupado(prompt, len(grupo)) if llamar_agrupado else llamar(prompt)
+            resultados = self._parsear_grupo(grupo, salida)
+            if resultados is not None:
+                return resultados
+            print(f"⚠️ Respuesta agrupada inválida para {len(grupo)} perfiles, procesando uno por uno")
+        return [self._resultado_individual(indice, llamar(self.armar_prompt(datos))) for indice, datos in grupo]
+
+    async def _aprocesar_grupo(self, grupo, allamar, semaforo, allamar_agrupado=None):
+        async with semaforo:
+            if len(grupo) > 1 and self.armar_prompt_agrupado:
+                prompt = self.armar_prompt_agrupado([d for _, d in grupo])
+                salida = await (allamar_agrupado(prompt, len(grupo)) if allamar_agrupado else allamar(prompt))
+                resultados = self._parsear_grupo(grupo, salida)
+                if resultados is not None:
+                    return resultados
+                print(f"⚠️ Respuesta agrupada inválida para {len(grupo)} perfiles, procesando uno por uno")
+            salidas = [await allamar(self.armar_prompt(datos)) for _, datos in grupo]
+        return [self._resultado_individual(indice, salida) for (indice, _), salida in zip(grupo, salidas)]
+
+    def _resumen(self, total, errores, procesados):
+        resultados = {indice: {"indice": indice, "estado": "error", "mensaje": mensaje}
+                      for indice, mensaje in errores.items()}
+        resultados.update(dict(procesados))
+        ordenados = [resultados[i] for i in range(total)]
+        exitosos = sum(1 for r in ordenados if r["estado"] == "success")
+        return {
+            "total": total,
+            "exitosos": exitosos,
+            "errores": total - exitosos,
+            "resultados": ordenados
+        }
+
+    def procesar(self, elementos, llamar, por_prompt=1, llamar_agrupado=None):
+        """
+        Procesa el lote con un pool de hilos.
+
+        Args:
+            elementos (list): Datos de cada elemento
+            llamar (callable): prompt -> salida del LLM (str)
+            por_prompt (int): Elementos agrupados por prompt (1 = uno por llamada)
+            llamar_agrupado (callable): (prompt, cantidad) -> salida para los prompts agrupados,
+                p. ej. con un límite de tokens de respuesta proporcional al grupo (None = llamar)
+
+        Returns:
+            dict: total, exitosos, errores y resultados por elemento (en orden)
+        """
+        validos, errores = self.validar(elementos)
+        grupos = self._agrupar(validos, por_prompt)
+
+        procesados = []
+        if grupos:
+            with ThreadPoolExecutor(max_workers=min(self.concurrencia, len(grupos))) as ejecutor:
+                for resultados in ejecutor.map(lambda g: self._procesar_grupo(g, llamar, llamar_agrupado), grupos):
+                    procesados.extend(resultados)
+
+        return self._resumen(len(elementos), errores, procesados)
+
+    async def aprocesar(self, elementos, allamar, por_prompt=1, allamar_agrupado=None):
+        """
+        Versión asíncrona de procesar(): allamar es una corrutina prompt -> salida
+        y allamar_agrupado una corrutina (prompt, cantidad) -> salida
+        """
+        validos, errores = self.validar(elementos)
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        grupos = self._agrupar(validos, por_prompt)
+
+        procesados = []
+        for resultados in await asyncio.gather(*(self._aprocesar_grupo(g, allamar, semaforo, allamar_agrupado) for g in grupos)):
+            procesados.extend(resultados)
+
+        return self._resumen(len(elementos), errores, procesados)
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Los módulos del proyecto están en la raíz del repositorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from adaptador_contexto_boliviano import NormalizadorOracion
+from embeddings_locales import EmbeddingsLocales
+
+
+@pytest.fixture
+def normalizador():
+    return NormalizadorOracion()
+
+
+@pytest.fixture
+def embeddings():
+    """Proveedor local y determinista: las pruebas no llaman a OpenAI"""
+    return EmbeddingsLocales(dimension=64)
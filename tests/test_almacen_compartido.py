@@ -0,0 +1,57 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from almacen_compartido import abrir_almacen, escribir_almacen, existe_almacen
+from indice_bm25 import IndiceBM25
+
+DOCUMENTOS = [
+    Document(id="a", page_content="Registro de comercio en FUNDEMPRESA", metadata={"pagina": 1, "seccion": "Módulo 1"}),
+    Document(id="b", page_content="Cómo calcular el punto de equilibrio ñandú", metadata={"pagina": 2}),
+    Document(id="c", page_content="", metadata={}),
+]
+
+
+def test_ida_y_vuelta(tmp_path, embeddings):
+    # Posiciones con huecos, como tras parchear un índice IVF
+    registros = list(zip([0, 1, 5], DOCUMENTOS))
+    escribir_almacen(tmp_path, registros)
+    assert existe_almacen(tmp_path)
+
+    docstore, index_to_docstore_id = abrir_almacen(tmp_path)
+
+    assert index_to_docstore_id == {0: "a", 1: "b", 5: "c"}
+    assert len(docstore) == 3
+    for documento in DOCUMENTOS:
+        leido = docstore.search(documento.id)
+        assert (leido.id, leido.page_content, leido.metadata) == (documento.id, documento.page_content, documento.metadata)
+        # El texto decodificado produce el mismo embedding que el original
+        assert embeddings.embed_query(leido.page_content) == embeddings.embed_query(documento.page_content)
+    assert docstore.search("no-existe") == "ID no-existe not found."
+
+
+def test_archivos_memory_mapped(tmp_path):
+    escribir_almacen(tmp_path, list(enumerate(DOCUMENTOS)))
+    docstore, _ = abrir_almacen(tmp_path)
+
+    assert isinstance(docstore._textos, np.memmap)
+    assert docstore.documento(1).page_content == DOCUMENTOS[1].page_content
+
+
+def test_almacen_vacio(tmp_path):
+    escribir_almacen(tmp_path, [])
+    docstore, index_to_docstore_id = abrir_almacen(tmp_path)
+    assert len(docstore) == 0
+    assert index_to_docstore_id == {}
+
+
+def test_bm25_resuelve_el_texto_desde_el_almacen(tmp_path, normalizador):
+    escribir_almacen(tmp_path, list(enumerate(DOCUMENTOS)))
+    docstore, _ = abrir_almacen(tmp_path)
+    directorio_bm25 = tmp_path / "bm25"
+    directorio_bm25.mkdir()
+    IndiceBM25(normalizador).construir(DOCUMENTOS, resolver=docstore.documento).guardar(directorio_bm25)
+
+    indice = IndiceBM25(normalizador).abrir(directorio_bm25, docstore.documento)
+    resultados, _ = indice.buscar("punto de equilibrio", k=2)
+    assert resultados[0][0].id == "b"
+    assert resultados[0][0].metadata == {"pagina": 2}
@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pytest
+
+from clasificador_reglas import CAMPOS_CONOCIMIENTOS, CAMPOS_PSICOLOGICOS, ClasificadorReglas, _a_meses, _a_numero
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("1.500 Bs", 1500.0),
+    ("1,500", 1500.0),
+    ("1.500,50", 1500.5),
+    ("1,500.50", 1500.5),
+    ("1.234.567", 1234567.0),
+    ("2,5", 2.5),
+    ("entre 20 y 30", 25.0),
+    ("2 mil", 2000.0),
+    ("ninguno", 0.0),
+    (4, 4.0),
+])
+def test_a_numero(texto, esperado):
+    assert _a_numero(texto) == esperado
+
+
+@pytest.mark.parametrize("texto", ["no tengo idea", "", None, "varios"])
+def test_a_numero_no_reconocido(texto):
+    assert math.isnan(_a_numero(texto))
+
+
+def test_a_meses():
+    assert _a_meses("2 años") == 24
+    assert _a_meses("1 año y 6 meses") == 18
+    assert _a_meses("3 semanas") == 0.75
+    assert _a_meses("8") == 8
+
+
+def _perfil(**cambios):
+    return {
+        "tiempo_funcionamiento": "2 años", "ingresos_mensuales": "4.500 Bs", "numero_clientes": "entre 40 y 60",
+        **{campo: 4 for campo in CAMPOS_CONOCIMIENTOS}, **{campo: "4" for campo in CAMPOS_PSICOLOGICOS},
+        **cambios
+    }
+
+
+def test_negocio_maduro_es_incubadora():
+    resultado = ClasificadorReglas().clasificar(_perfil())
+    assert resultado["clasificacion"] == "INCUBADORA"
+    assert resultado["decidido"]
+    assert resultado["fuente"] == "reglas"
+
+
+def test_sin_ingresos_es_pre_incubadora_aunque_falten_datos():
+    resultado = ClasificadorReglas().clasificar(_perfil(ingresos_mensuales="ninguno", liderazgo="no sé"))
+    assert resultado["clasificacion"] == "PRE-INCUBADORA"
+    assert resultado["decidido"]
+
+
+def test_datos_no_interpretables_quedan_dudosos():
+    resultado = ClasificadorReglas().clasificar(_perfil(numero_clientes="no tengo idea"))
+    assert not resultado["decidido"]
+    assert resultado["puntaje"] is None
+
+
+def test_lote_coincide_con_perfiles_sueltos():
+    clasificador = ClasificadorReglas()
+    perfiles = [_perfil(), _perfil(tiempo_funcionamiento="1 mes"), _perfil(ingresos_mensuales="1,200.50")]
+    columnas = clasificador.columnas(clasificador.puntuar_lote(perfiles))
+
+    assert columnas["total"] == 3
+    for i, perfil in enumerate(perfiles):
+        suelto = clasificador.clasificar(perfil)
+        assert columnas["clasificacion"][i] == suelto["clasificacion"]
+        assert columnas["puntaje"][i] == suelto["puntaje"]
+
+
+def test_puntuar_matrices_acota_escalas():
+    puntajes = ClasificadorReglas().puntuar_matrices(
+        np.full((1, 5), 9.0), np.full((1, 6), 9.0), np.array([[24.0, 5000.0, 50.0]])
+    )
+    assert puntajes["puntaje"][0] == pytest.approx(1.0)
@@ -0,0 +1,55 @@
+from langchain_core.documents import Document
+
+from divisor_estructural import DivisorEstructural
+
+
+def _pagina(texto, numero, archivo="guia.pdf"):
+    return Document(page_content=texto, metadata={"archivo": archivo, "pagina": numero})
+
+
+PARRAFO = "El plan de negocio describe clientes, costos y canales de venta del emprendimiento."
+
+
+def test_los_encabezados_de_modulo_son_limites():
+    texto = f"{PARRAFO}\nMódulo 2: finanzas\n{PARRAFO}\n3"
+    fragmentos = list(DivisorEstructural().dividir([_pagina(texto, 3)]))
+
+    assert [f.metadata["seccion"] for f in fragmentos] == [None, "Módulo 2: Finanzas"]
+    assert fragmentos[0].page_content == PARRAFO
+    # El número de página impreso al final se descarta
+    assert not fragmentos[1].page_content.endswith("3")
+    assert all(f.metadata["pagina"] == 3 for f in fragmentos)
+
+
+def test_titulo_en_la_linea_siguiente():
+    titulo, ocupadas = DivisorEstructural.titulo_modulo(["MÓDULO 4", "MARKETING", PARRAFO], 0)
+    assert (titulo, ocupadas) == ("Módulo 4: Marketing", 2)
+
+
+def test_entradas_del_indice_no_son_encabezados():
+    assert DivisorEstructural.titulo_modulo(["Módulo 1: crecimiento 12"], 0) == (None, 0)
+
+
+def test_la_seccion_se_arrastra_entre_paginas_del_mismo_archivo():
+    paginas = [
+        _pagina(f"Módulo 1: ventas\n{PARRAFO}", 1),
+        _pagina(PARRAFO, 2),
+        _pagina(PARRAFO, 1, archivo="otra.pdf"),
+    ]
+    secciones = [f.metadata["seccion"] for f in DivisorEstructural().dividir(paginas)]
+    assert secciones == ["Módulo 1: Ventas", "Módulo 1: Ventas", None]
+
+
+def test_tramos_largos_se_parten_sin_cruzar_paginas():
+    divisor = DivisorEstructural(tamano=200, solapamiento=20)
+    fragmentos = list(divisor.dividir([_pagina(" ".join([PARRAFO] * 10), 1), _pagina(PARRAFO, 2)]))
+
+    assert all(len(f.page_content) <= 200 for f in fragmentos)
+    assert fragmentos[-1].page_content == PARRAFO
+    assert fragmentos[-1].metadata["pagina"] == 2
+
+
+def test_descarta_tramos_cortos_y_encabezados_repetidos():
+    texto = f"GUÍA - INCUBADORA DE EMPRENDIMIENTOS\n{PARRAFO}"
+    fragmentos = list(DivisorEstructural().dividir([_pagina(texto, 1), _pagina("7", 2)]))
+    assert [f.page_content for f in fragmentos] == [PARRAFO]
@@ -0,0 +1,54 @@
+from langchain_core.documents import Document
+
+from ensamblador_contexto import EnsambladorContexto
+
+
+def _documento(texto, id_doc):
+    return Document(id=id_doc, page_content=texto, metadata={"pagina": 1})
+
+
+TEXTO_A = "Para registrar una empresa unipersonal se necesita el NIT y la matrícula de comercio vigente. " * 3
+TEXTO_B = "Los costos fijos incluyen alquiler, sueldos y servicios básicos del local comercial cada mes. " * 3
+
+
+def test_respeta_el_presupuesto():
+    ensamblador = EnsambladorContexto(presupuesto_tokens=80, minimo_tokens=10)
+    documentos, uso = ensamblador.ensamblar([_documento(TEXTO_A, "a"), _documento(TEXTO_B, "b")])
+
+    assert uso["tokens_contexto"] <= 80
+    assert uso["tokens_contexto"] == sum(ensamblador.contar(d.page_content) for d in documentos)
+    assert uso["fragmentos_recuperados"] == 2
+    assert documentos[0].id == "a"
+
+
+def test_descarta_repetidos_y_contenidos():
+    ensamblador = EnsambladorContexto(presupuesto_tokens=2000)
+    documentos, uso = ensamblador.ensamblar([
+        _documento(TEXTO_A, "a"),
+        _documento(TEXTO_A, "a-copia"),
+        _documento(TEXTO_A[:120], "a-parte"),
+        _documento(TEXTO_B, "b"),
+    ])
+
+    assert [d.id for d in documentos] == ["a", "b"]
+    assert uso["fragmentos_usados"] == 2
+    assert uso["tokens_solapamiento_eliminados"] > 0
+
+
+def test_recorta_el_solapamiento_de_chunk_overlap():
+    ensamblador = EnsambladorContexto(presupuesto_tokens=2000)
+    solapado = TEXTO_A[-60:] + TEXTO_B
+    documentos, _ = ensamblador.ensamblar([_documento(TEXTO_A, "a"), _documento(solapado, "b")])
+
+    assert documentos[1].page_content == TEXTO_B.strip()
+    assert documentos[1].metadata == {"pagina": 1}
+
+
+def test_registrar_suma_prompt_y_respuesta():
+    ensamblador = EnsambladorContexto()
+    _, uso = ensamblador.ensamblar([_documento(TEXTO_A, "a")])
+    uso = ensamblador.registrar(uso, "prompt de prueba", "respuesta")
+
+    assert uso["tokens_prompt"] == ensamblador.contar("prompt de prueba")
+    assert uso["tokens_respuesta"] == ensamblador.contar("respuesta")
+    assert ensamblador.estadisticas()["consultas"] == 1
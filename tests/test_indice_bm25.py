@@ -0,0 +1,69 @@
+import pytest
+from langchain_core.documents import Document
+
+from indice_bm25 import IndiceBM25, fusion_rrf
+
+FRAGMENTOS = [
+    Document(id="nit", page_content="Para sacar el NIT hay que ir al Servicio de Impuestos Nacionales con el carnet."),
+    Document(id="segip", page_content="El SEGIP emite la cédula de identidad que piden todos los trámites."),
+    Document(id="unipersonal", page_content="Una empresa unipersonal se registra en FUNDEMPRESA con la matrícula de comercio."),
+    Document(id="costos", page_content="Los costos fijos y variables definen el precio de venta del producto."),
+    Document(id="lucas", page_content="Ahorrar dinero cada mes permite reinvertir en el negocio."),
+]
+
+
+@pytest.fixture
+def indice(normalizador):
+    return IndiceBM25(normalizador).construir(FRAGMENTOS)
+
+
+def test_tokeniza_sin_tildes_ni_palabras_vacias(normalizador):
+    assert IndiceBM25(normalizador).tokenizar(["La cédula del SEGIP"]) == [["cedula", "segip"]]
+
+
+def test_encuentra_siglas_por_coincidencia_exacta(indice):
+    resultados, _ = indice.buscar("requisitos del SEGIP", k=3)
+    assert resultados[0][0].id == "segip"
+    assert [puntaje for _, puntaje in resultados] == sorted((p for _, p in resultados), reverse=True)
+
+
+def test_modismos_normalizados_en_la_consulta(indice):
+    # "lucas" -> "dinero"
+    resultados, _ = indice.buscar("ahorrar lucas", k=1)
+    assert resultados[0][0].id == "lucas"
+
+
+def test_resultado_decisivo(indice):
+    _, decisivo = indice.buscar("empresa unipersonal matrícula comercio", k=3)
+    assert decisivo
+    _, decisivo = indice.buscar("precio", k=3)
+    assert not decisivo
+
+
+def test_sin_coincidencias(indice):
+    assert indice.buscar("zzz yyy", k=3) == ([], False)
+    assert IndiceBM25().buscar("nit") == ([], False)
+
+
+def test_guardar_y_abrir(indice, normalizador, tmp_path):
+    indice.guardar(tmp_path)
+    abierto = IndiceBM25(normalizador).abrir(tmp_path, FRAGMENTOS.__getitem__)
+
+    assert abierto.buscar("sacar NIT impuestos", k=3) == indice.buscar("sacar NIT impuestos", k=3)
+    # Otros parámetros de BM25 obligan a reconstruir
+    assert IndiceBM25(normalizador, k1=2.0).abrir(tmp_path, FRAGMENTOS.__getitem__) is None
+
+
+def test_fusion_rrf():
+    a, b, c = FRAGMENTOS[:3]
+    fusion = fusion_rrf([[a, b, c], [b, a]], k=2)
+
+    assert [documento.id for documento, _ in fusion] == ["nit", "segip"]
+    assert fusion[0][1] == pytest.approx(1 / 61 + 1 / 62)
+
+
+def test_fusion_rrf_sin_id_usa_el_contenido():
+    x = Document(page_content="mismo texto")
+    fusion = fusion_rrf([[x], [Document(page_content="mismo texto")]])
+    assert len(fusion) == 1
+    assert fusion[0][1] == pytest.approx(2 / 61)
@@ -0,0 +1,64 @@
+import pytest
+from langchain_core.documents import Document
+
+from ingesta_embeddings import IngestorEmbeddings, reintentar_con_espera
+
+
+def _fragmentos(n):
+    return [Document(page_content=f"fragmento {i} sobre registro de empresas") for i in range(n)]
+
+
+def test_procesa_por_lotes_en_orden(embeddings):
+    guardados = []
+    ingestor = IngestorEmbeddings(embeddings, tamano_lote=4, lotes_concurrentes=3, progreso=lambda *_: None)
+
+    total = ingestor.procesar(_fragmentos(10), lambda lote, vectores: guardados.append((lote, vectores)))
+
+    assert total == 10
+    assert [len(lote) for lote, _ in guardados] == [4, 4, 2]
+    assert embeddings.llamadas == 3
+    textos = [f.page_content for lote, _ in guardados for f in lote]
+    assert textos == [f"fragmento {i} sobre registro de empresas" for i in range(10)]
+    for lote, vectores in guardados:
+        assert vectores == embeddings.embed_documents([f.page_content for f in lote])
+
+
+def test_consume_generadores(embeddings):
+    progreso = []
+    ingestor = IngestorEmbeddings(embeddings, tamano_lote=3, lotes_concurrentes=2,
+                                  progreso=lambda listos, total: progreso.append((listos, total)))
+
+    total = ingestor.procesar((f for f in _fragmentos(7)), lambda lote, vectores: None)
+
+    assert total == 7
+    assert progreso[-1] == (7, None)
+
+
+def test_reintenta_lotes_fallidos(embeddings):
+    class EmbeddingsInestables:
+        def __init__(self):
+            self.fallos = 1
+
+        def embed_documents(self, textos):
+            if self.fallos:
+                self.fallos -= 1
+                raise RuntimeError("límite de tasa")
+            return embeddings.embed_documents(textos)
+
+    guardados = []
+    ingestor = IngestorEmbeddings(EmbeddingsInestables(), tamano_lote=5, espera_base=0, progreso=lambda *_: None)
+
+    assert ingestor.procesar(_fragmentos(5), lambda lote, vectores: guardados.append(vectores)) == 5
+    assert len(guardados[0]) == 5
+
+
+def test_reintentar_con_espera_propaga_el_ultimo_error():
+    intentos = []
+
+    def falla():
+        intentos.append(1)
+        raise ValueError("sin conexión")
+
+    with pytest.raises(ValueError):
+        reintentar_con_espera(falla, reintentos=2, espera_base=0)
+    assert len(intentos) == 3
@@ -0,0 +1,29 @@
+def test_reemplaza_modismos_en_minusculas(normalizador):
+    assert normalizador.normalizar_oracion("Gano LUCAS con mi caserito") == "gano dinero con mi cliente frecuente"
+
+
+def test_reemplazo_encadenado_como_el_secuencial(normalizador):
+    # "ropa americana" -> "ropa usada importada" -> "ropa de segunda mano importada"
+    assert normalizador.normalizar_oracion("vendo ropa americana") == "vendo ropa de segunda mano importada"
+
+
+def test_respeta_limites_de_palabra(normalizador):
+    assert normalizador.normalizar_oracion("los lucasianos") == "los lucasianos"
+
+
+def test_lote_equivale_a_oraciones_sueltas(normalizador):
+    textos = ["Necesito platita", "", "quiero hacer caserito", "texto con \x00 separador"]
+    assert normalizador.normalizar_lote(textos) == [normalizador.normalizar_oracion(t) for t in textos]
+    assert normalizador.normalizar_lote([]) == []
+
+
+def test_detalles_registra_los_reemplazos(normalizador):
+    detalles = normalizador.normalizar_con_detalles("Gano Lucas")
+    assert detalles["normalizado"] == "gano dinero"
+    assert detalles["hay_cambios"]
+    assert detalles["reemplazos"] == [{"inicio": 5, "fin": 10, "original": "lucas", "reemplazo": "dinero"}]
+
+def test_conservar_mayusculas(normalizador):
+    assert normalizador.normalizar_oracion("Quiero LUCAS en La Paz", conservar_mayusculas=True) == "Quiero dinero en La Paz"
+    # Los modismos con mayúsculas en el diccionario también se reconocen
+    assert normalizador.normalizar_oracion("Cómo Sacar nit", conservar_mayusculas=True) == "Cómo obtener NIT"
@@ -0,0 +1,173 @@
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class VersionBase:
+    """
+    Versión inmutable de la base de conocimiento: índice FAISS más índice BM25.
+    Nunca se modifica después de publicarse; una recarga publica una versión nueva.
+    """
+
+    def __init__(self, numero, base_conocimiento, indice_bm25):
+        self.numero = numero
+        self.base_conocimiento = base_conocimiento
+        self.indice_bm25 = indice_bm25
+        self.creada = datetime.now().isoformat()
+        self.en_uso = 0
+
+
+class VersionesBase:
+    """
+    Manejador versionado y con conteo de referencias de la base de conocimiento.
+    Cada consulta fija la versión vigente al empezar (usar()) y la suelta al terminar;
+    publicar() reemplaza la versión vigente de forma atómica. Las versiones retiradas
+    se liberan cuando terminan sus consultas en curso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._actual = None
+        self._retiradas = []
+        self._siguiente = 1
+
+    @property
+    def actual(self):
+        return self._actual
+
+    def publicar(self, base_conocimiento, indice_bm25):
+        """
+        Publica una versión nueva como vigente.
+
+        Returns:
+            VersionBase: La versión publicada
+        """
+        with self._lock:
+            version = VersionBase(self._siguiente, base_conocimiento, indice_bm25)
+            self._siguiente += 1
+            anterior, self._actual = self._actual, version
+            if anterior is not None:
+                self._retiradas.append(anterior)
+            self._liberar_retiradas()
+        print(f"🔁 Base de conocimiento v{version.numero} publicada"
+              + (f" (v{anterior.numero} retirada, {anterior.en_uso} consultas en curso)" if anterior else ""))
+        return version
+
+    def _liberar_retiradas(self):
+        """Suelta las versiones retiradas sin consultas en curso (llamar con el lock tomado)"""
+        for version in [v for v in self._retiradas if v.en_uso == 0]:
+            self._retiradas.remove(version)
+            print(f"🧹 Base de conocimiento v{version.numero} liberada")
+
+    @contextmanager
+    def usar(self):
+        """
+        Fija la versión vigente durante el bloque.
+
+        Uso:
+            with versiones.usar() as version:
+                version.base_conocimiento...
+        """
+        with self._lock:
+            version = self._actual
+            if version is None:
+                raise RuntimeError("La base de conocimiento no está disponible")
+            version.en_uso += 1
+        try:
+            yield version
+        finally:
+            with self._lock:
+                version.en_uso -= 1
+                if version is not self._actual:
+                    self._liberar_retiradas()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "version": self._actual.numero if self._actual else None,
+                "publicada": self._actual.creada if self._actual else None,
+                "consultas_en_curso": self._actual.en_uso if self._actual else 0,
+                "retiradas_en_uso": [
+                    {"version": v.numero, "consultas_en_curso": v.en_uso} for v in self._retiradas
+                ]
+            }
+
+
+class RecargasBase:
+    """
+    Recargas de la base de conocimiento en un hilo en segundo plano, identificadas por id.
+    Solo corre una a la vez: si ya hay una en curso se devuelve su id.
+    """
+
+    def __init__(self, max_historial=20):
+        """
+        Args:
+            max_historial (int): Recargas terminadas que se conservan para consultar su estado
+        """
+        self.max_historial = max_historial
+        self._lock = threading.Lock()
+        self._recargas = OrderedDict()
+        self._en_curso = None
+
+    def iniciar(self, funcion, al_terminar=None):
+        """
+        Args:
+            funcion (callable): Reconstruye y publica la base; devuelve True (o un dict con el
+                resumen, que se guarda en "resultado") si tuvo éxito
+            al_terminar (callable): Se llama tras una recarga exitosa (p. ej. invalidar cachés)
+
+        Returns:
+            tuple: (id de la recarga, True si se creó ahora o False si ya había una en curso)
+        """
+        with self._lock:
+            if self._en_curso is not None:
+                return self._en_curso, False
+
+            recarga_id = str(uuid.uuid4())
+            self._recargas[recarga_id] = {
+                "id": recarga_id,
+                "estado": "en_proceso",
+                "inicio": datetime.now().isoformat(),
+                "fin": None,
+                "error": None,
+                "resultado": None
+            }
+            self._en_curso = recarga_id
+            while len(self._recargas) > self.max_historial:
+                self._recargas.popitem(last=False)
+
+        threading.Thread(
+            target=self._ejecutar, args=(recarga_id, funcion, al_terminar),
+            name=f"recarga-{recarga_id[:8]}", daemon=True
+        ).start()
+        return recarga_id, True
+
+    def _ejecutar(self, recarga_id, funcion, al_terminar):
+        estado, error, resultado = "completado", None, None
+        try:
+            resultado = funcion()
+            if not resultado:
+                estado, error = "error", "No se pudo reconstruir la base de conocimiento"
+            elif al_terminar is not None:
+                al_terminar()
+        except Exception as e:
+            estado, error = "error", str(e)
+
+        with self._lock:
+            self._recargas[recarga_id].update(
+                estado=estado, error=error, fin=datetime.now().isoformat(),
+                resultado=resultado if isinstance(resultado, dict) else None
+            )
+            self._en_curso = None
+        print(f"{'✅' if estado == 'completado' else '❌'} Recarga {recarga_id[:8]}: {estado}")
+
+    def estado(self, recarga_id):
+        """
+        Returns:
+            dict: Estado de la recarga o None si no existe
+        """
+        with self._lock:
+            recarga = self._recargas.get(recarga_id)
+            return dict(recarga) if recarga else None